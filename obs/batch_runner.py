@@ -0,0 +1,307 @@
+"""
+Runs the catalog stages (JSON export, verify, TeX export) for many languages, recording each finished stage in a
+SQLite journal so a run that is stopped or crashes can be resumed where it left off.
+
+A failure in one language, including sys.exit() calls, is recorded in the journal and the run continues with the
+next language. Stages that did not finish are run again on the next run, and so are finished stages whose output file
+is missing or was changed since.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from obs.export_to_tex import OBSTexExport
+from obs.frame_store import OBSFrameStore
+from obs.obs_classes import OBS, OBSEncoder
+from obs.pages_ingest import OBSPagesIngester
+from obs.publish import OBSPublisher
+
+
+class OBSBatchJournal(object):
+
+    def __init__(self, file_name):
+        """
+        Opens or creates the journal
+        :param str|unicode file_name:
+        """
+        self.file_name = file_name
+        self.conn = sqlite3.connect(file_name)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS stages ('
+                          'lang TEXT NOT NULL, stage TEXT NOT NULL, status TEXT NOT NULL, output_hash TEXT, '
+                          'error TEXT, attempts INTEGER NOT NULL DEFAULT 0, started REAL, finished REAL, '
+                          'PRIMARY KEY (lang, stage))')
+        try:
+            # journals written before the output file name was recorded
+            self.conn.execute('ALTER TABLE stages ADD COLUMN output TEXT')
+        except sqlite3.OperationalError:
+            pass
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def start(self, lang, stage):
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO stages (lang, stage, status) VALUES (?, ?, ?)',
+                              (lang, stage, 'running'))
+            self.conn.execute('UPDATE stages SET status = ?, error = NULL, attempts = attempts + 1, started = ?, '
+                              'finished = NULL WHERE lang = ? AND stage = ?', ('running', time.time(), lang, stage))
+
+    def finish(self, lang, stage, output_hash, output=None):
+        """
+        :param str|unicode output_hash:
+        :param str|unicode output: The name of the output file, if the stage wrote one
+        """
+        with self.conn:
+            self.conn.execute('UPDATE stages SET status = ?, output_hash = ?, output = ?, finished = ? '
+                              'WHERE lang = ? AND stage = ?', ('done', output_hash, output, time.time(), lang, stage))
+
+    def fail(self, lang, stage, error):
+        with self.conn:
+            self.conn.execute('UPDATE stages SET status = ?, error = ?, finished = ? WHERE lang = ? AND stage = ?',
+                              ('failed', error, time.time(), lang, stage))
+
+    def forget(self, lang, stages):
+        """
+        Removes the records of these stages, so they run again
+        :param str|unicode lang:
+        :param list stages:
+        """
+        with self.conn:
+            self.conn.executemany('DELETE FROM stages WHERE lang = ? AND stage = ?', [(lang, s) for s in stages])
+
+    def get_status(self, lang, stage):
+        """
+        :return: str|unicode 'running', 'done', 'failed' or None if the stage has not started
+        """
+        row = self.conn.execute('SELECT status FROM stages WHERE lang = ? AND stage = ?', (lang, stage)).fetchone()
+        return row[0] if row else None
+
+    def get_output(self, lang, stage):
+        """
+        :return: tuple (output file name or None, output hash), or None if the stage has not started
+        """
+        return self.conn.execute('SELECT output, output_hash FROM stages WHERE lang = ? AND stage = ?',
+                                 (lang, stage)).fetchone()
+
+    def get_rows(self, status=None):
+        """
+        :param str|unicode status: Only the rows with this status
+        :return: list<OrderedDict>
+        """
+        sql = 'SELECT lang, stage, status, output, output_hash, error, attempts, started, finished FROM stages'
+        params = ()
+        if status:
+            sql += ' WHERE status = ?'
+            params = (status,)
+
+        cursor = self.conn.execute(sql + ' ORDER BY lang, stage', params)
+        columns = [c[0] for c in cursor.description]
+        return [OrderedDict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM stages')
+
+
+class OBSBatchRunner(object):
+
+    def __init__(self, journal, stages):
+        """
+        Class constructor
+        :param OBSBatchJournal journal:
+        :param list stages: (name, function) pairs, run in order for each language. Each function is called with the
+                            language code and returns the output file name, the output content, or None.
+        """
+        self.journal = journal
+        self.stages = stages
+
+    @staticmethod
+    def get_hash(output):
+        """
+        Returns the SHA-256 of the output file or content
+        :param output:
+        :return: str|unicode
+        """
+        if output is None:
+            return ''
+
+        sha = hashlib.sha256()
+        if not isinstance(output, bytes) and os.path.isfile(output):
+            with open(output, 'rb') as in_file:
+                for block in iter(lambda: in_file.read(65536), b''):
+                    sha.update(block)
+        else:
+            sha.update(output if isinstance(output, bytes) else output.encode('utf-8'))
+
+        return sha.hexdigest()
+
+    @staticmethod
+    def get_file_name(output):
+        """
+        :return: str|unicode The output, if it is the name of a file, otherwise None
+        """
+        if output is None or isinstance(output, bytes) or not os.path.isfile(output):
+            return None
+
+        return output
+
+    def is_done(self, lang, name):
+        """
+        A stage is done if it finished, and its output file, if it wrote one, is still the one it wrote
+        """
+        if self.journal.get_status(lang, name) != 'done':
+            return False
+
+        file_name, output_hash = self.journal.get_output(lang, name)
+        if file_name:
+            return os.path.isfile(file_name) and OBSBatchRunner.get_hash(file_name) == output_hash
+
+        return True
+
+    def run_language(self, lang):
+        """
+        Runs the unfinished stages of one language, stopping at the first failure
+        :param str|unicode lang:
+        :return: bool True if all the stages are done
+        """
+        names = [name for name, _ in self.stages]
+
+        for index, (name, function) in enumerate(self.stages):
+            if self.is_done(lang, name):
+                continue
+
+            # the output of this stage may change, so the stages after it must run again
+            self.journal.forget(lang, names[index + 1:])
+            self.journal.start(lang, name)
+
+            try:
+                output = function(lang)
+            except (Exception, SystemExit) as e:
+                msg = '{0}: {1}'.format(e.__class__.__name__, e)
+                print('{0} {1} failed: {2}'.format(lang, name, msg))
+                self.journal.fail(lang, name, msg)
+                return False
+
+            self.journal.finish(lang, name, OBSBatchRunner.get_hash(output), OBSBatchRunner.get_file_name(output))
+
+        return True
+
+    def run(self, langs):
+        """
+        Runs the unfinished stages of each language
+        :param list langs:
+        :return: OrderedDict The languages that finished and failed
+        """
+        result = OrderedDict([('finished', []), ('failed', [])])
+        for lang in langs:
+            result['finished' if self.run_language(lang) else 'failed'].append(lang)
+
+        return result
+
+
+class OBSCatalogStages(object):
+
+    def __init__(self, pages_dir, out_dir, max_chapters=0, img_res='360px', checking_level='1', publish_dir=None):
+        """
+        The standard catalog stages: build obs-{lang}.json from the Door43 pages, verify it, and export it to TeX
+        :param str|unicode publish_dir: If given, a last stage publishes the JSON and TeX here, with compressed variants
+        """
+        self.ingester = OBSPagesIngester(pages_dir)
+        self.out_dir = out_dir
+        self.max_chapters = max_chapters
+        self.img_res = img_res
+        self.checking_level = checking_level
+        # shared by the languages, so identical frames are filtered and checked once
+        self.store = OBSFrameStore()
+        self.publisher = OBSPublisher(publish_dir) if publish_dir else None
+
+    def get_stages(self):
+        stages = [('json', self.export_json), ('verify', self.verify), ('tex', self.export_tex)]
+        if self.publisher:
+            stages.append(('publish', self.publish))
+
+        return stages
+
+    def get_json_file(self, lang):
+        return os.path.join(self.out_dir, 'obs-{0}.json'.format(lang))
+
+    def get_tex_file(self, lang):
+        return os.path.join(self.out_dir, 'obs-{0}.tex'.format(lang))
+
+    def export_json(self, lang):
+        """
+        Writes the body JSON, and the front and back matter the TeX stage needs, with the file names used by the API
+        """
+        language = self.ingester.load_language(lang)
+        if language.errors:
+            raise Exception('; '.join(language.errors))
+
+        contents = [language.front_matter, language.back_matter, language.obs]
+        for (entry, _), content in zip(OBSTexExport.json_files, contents):
+            OBSPublisher.write_atomic(os.path.join(self.out_dir, entry.format(lang)),
+                                      json.dumps(content, cls=OBSEncoder, sort_keys=True).encode('utf-8'))
+
+        return self.get_json_file(lang)
+
+    def verify(self, lang):
+        errors = OBS(self.get_json_file(lang)).get_errors()
+        if errors:
+            raise Exception('{0} errors, the first is: {1}'.format(len(errors), errors[0]))
+
+        return None
+
+    def export_tex(self, lang):
+        out_path = self.get_tex_file(lang)
+        with OBSTexExport(lang, out_path, self.max_chapters, self.img_res, self.checking_level,
+                          store=self.store) as exporter:
+            # the JSON written by the json stage, not the published version on the API
+            exporter.copy_json(self.out_dir)
+            OBSPublisher.write_atomic(out_path, exporter.render().encode('utf-8'))
+
+        return out_path
+
+    def publish(self, lang):
+        """
+        Publishes the JSON and TeX of the language, skipping the files that did not change since the last build
+        """
+        for file_name in (self.get_json_file(lang), self.get_tex_file(lang)):
+            self.publisher.publish_file(os.path.basename(file_name), file_name)
+        self.publisher.save()
+
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-p', '--pages-dir', dest='pages_dir', required=True, help='The Door43 pages directory')
+    parser.add_argument('-o', '--output-dir', dest='out_dir', required=True, help='The output directory')
+    parser.add_argument('-j', '--journal', dest='journal', default=None,
+                        help='The journal file, defaults to batch-journal.sqlite in the output directory')
+    parser.add_argument('-l', '--lang', dest='langs', action='append', help='Run only this language')
+    parser.add_argument('-r', '--reset', dest='reset', action='store_true', help='Start over, forgetting past runs')
+    parser.add_argument('--publish-dir', dest='publish_dir', default=None,
+                        help='Publish the JSON and TeX here, with precompressed variants')
+    args = parser.parse_args(sys.argv[1:])
+
+    if not os.path.isdir(args.out_dir):
+        os.makedirs(args.out_dir)
+
+    catalog = OBSCatalogStages(args.pages_dir, args.out_dir, publish_dir=args.publish_dir)
+    batch_journal = OBSBatchJournal(args.journal or os.path.join(args.out_dir, 'batch-journal.sqlite'))
+    if args.reset:
+        batch_journal.reset()
+
+    summary = OBSBatchRunner(batch_journal, catalog.get_stages()).run(args.langs or catalog.ingester.get_languages())
+    batch_journal.close()
+
+    print('Finished: {0}, failed: {1}'.format(len(summary['finished']), len(summary['failed'])))
+    sys.exit(1 if summary['failed'] else 0)
@@ -0,0 +1,284 @@
+"""
+A cache directory shared by all the workers on a machine, with a namespace for each kind of content: "http" for the
+JSON fetched by OBSExportCache and "images" for the results of ImageChecker.
+
+Entries are written to a temp file and renamed into place, so a reader never sees a partial entry and needs no lock.
+Writers take an exclusive fcntl lock on the cache directory while they update the byte count, so processes can share
+it. When the cache is over its byte budget the least recently used entries are removed until it is back under 90% of
+the budget.
+
+The access time of an entry is set when it is read and is used for the LRU order; the modification time is when it
+was written and is used for max_age.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # no file locking on Windows, the cache is then only safe for the threads of one process
+    fcntl = None
+
+
+class OBSCacheManager(object):
+
+    namespace_re = re.compile(r'^[a-z0-9_-]+$')
+    lock_file_name = '.lock'
+    usage_file_name = '.usage'
+    temp_prefix = '.tmp-'
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        """
+        Class constructor
+        :param str|unicode cache_dir: Created if it does not exist
+        :param int max_bytes: The byte budget of all the namespaces together
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {}  # type: dict<str, OrderedDict>
+        self.stats_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+        if not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                # another process created it first
+                if not os.path.isdir(cache_dir):
+                    raise
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Holds the lock of the cache directory, for the threads of this process and for other processes
+        """
+        with self.lock:
+            with open(os.path.join(self.cache_dir, OBSCacheManager.lock_file_name), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def count(self, namespace, name, amount=1):
+        with self.stats_lock:
+            stats = self.stats.setdefault(namespace, OrderedDict([('hits', 0), ('misses', 0), ('writes', 0),
+                                                                  ('evictions', 0)]))
+            stats[name] += amount
+
+    @staticmethod
+    def replace(source, destination):
+        if hasattr(os, 'replace'):
+            os.replace(source, destination)
+        else:
+            # Python 2.7, where rename replaces the destination on POSIX but not on Windows
+            if os.name == 'nt' and os.path.exists(destination):
+                os.remove(destination)
+            os.rename(source, destination)
+
+    def get_path(self, namespace, key):
+        """
+        :param str|unicode namespace: Lower case letters, digits, - and _
+        :param str|unicode key: Any string, like a URL
+        :return: str|unicode The file name of the entry
+        """
+        if not OBSCacheManager.namespace_re.search(namespace):
+            raise ValueError('"{0}" is not a valid cache namespace.'.format(namespace))
+
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, namespace, digest[:2], digest)
+
+    def get(self, namespace, key, max_age=None):
+        """
+        :param str|unicode namespace:
+        :param str|unicode key:
+        :param int max_age: Ignore entries written more than this many seconds ago
+        :return: bytes The content, or None if it is not in the cache
+        """
+        path = self.get_path(namespace, key)
+        now = time.time()
+
+        try:
+            stat = os.stat(path)
+            if max_age is not None and now - stat.st_mtime > max_age:
+                self.count(namespace, 'misses')
+                return None
+
+            with open(path, 'rb') as in_file:
+                content = in_file.read()
+
+        except (IOError, OSError):
+            # not cached, or removed by another process since
+            self.count(namespace, 'misses')
+            return None
+
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            pass
+
+        self.count(namespace, 'hits')
+        return content
+
+    def put(self, namespace, key, content):
+        """
+        Writes an entry, replacing any entry with the same key
+        :param str|unicode namespace:
+        :param str|unicode key:
+        :param bytes content:
+        :return: str|unicode The file name of the entry
+        """
+        path = self.get_path(namespace, key)
+        dir_name = os.path.dirname(path)
+        if not os.path.isdir(dir_name):
+            try:
+                os.makedirs(dir_name)
+            except OSError:
+                if not os.path.isdir(dir_name):
+                    raise
+
+        handle, temp_name = tempfile.mkstemp(prefix=OBSCacheManager.temp_prefix, dir=dir_name)
+        try:
+            with os.fdopen(handle, 'wb') as out_file:
+                out_file.write(content)
+
+            with self.locked():
+                # before the rename, so a missing usage file is not counted with the new entry in it
+                usage = self.read_usage() - (os.path.getsize(path) if os.path.isfile(path) else 0)
+                OBSCacheManager.replace(temp_name, path)
+                usage += len(content)
+                if usage > self.max_bytes:
+                    usage = self.evict(int(self.max_bytes * 0.9))
+                self.write_usage(usage)
+
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+        self.count(namespace, 'writes')
+        return path
+
+    def get_entries(self):
+        """
+        :return: list Of (last use, size, namespace, file name), and the stale temp files separately
+        """
+        entries = []
+        stale = []
+        now = time.time()
+
+        for namespace in os.listdir(self.cache_dir):
+            namespace_dir = os.path.join(self.cache_dir, namespace)
+            if not os.path.isdir(namespace_dir):
+                continue
+
+            for dir_name, _, file_names in os.walk(namespace_dir):
+                for file_name in file_names:
+                    path = os.path.join(dir_name, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+
+                    if file_name.startswith(OBSCacheManager.temp_prefix):
+                        # left by a writer that was killed
+                        if now - stat.st_mtime > 3600:
+                            stale.append(path)
+                        continue
+
+                    entries.append((stat.st_atime, stat.st_size, namespace, path))
+
+        return entries, stale
+
+    def evict(self, target_bytes):
+        """
+        Removes the least recently used entries until the cache is no larger than target_bytes. Call with the lock.
+        :return: int The bytes in the cache afterwards
+        """
+        entries, stale = self.get_entries()
+        for path in stale:
+            os.remove(path)
+
+        usage = sum(size for _, size, _, _ in entries)
+        for _, size, namespace, path in sorted(entries):
+            if usage <= target_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            usage -= size
+            self.count(namespace, 'evictions')
+
+        return usage
+
+    def read_usage(self):
+        try:
+            with open(os.path.join(self.cache_dir, OBSCacheManager.usage_file_name), 'r') as in_file:
+                return int(in_file.read())
+        except (IOError, OSError, ValueError):
+            # missing or damaged, count the files
+            return sum(size for _, size, _, _ in self.get_entries()[0])
+
+    def write_usage(self, usage):
+        file_name = os.path.join(self.cache_dir, OBSCacheManager.usage_file_name)
+        with open(file_name + '.tmp', 'w') as out_file:
+            out_file.write('{0}'.format(usage))
+        OBSCacheManager.replace(file_name + '.tmp', file_name)
+
+    def clear(self, namespace=None):
+        """
+        Removes all the entries, or those of one namespace
+        """
+        with self.locked():
+            for _, _, entry_namespace, path in self.get_entries()[0]:
+                if namespace is None or entry_namespace == namespace:
+                    os.remove(path)
+            self.write_usage(sum(size for _, size, _, _ in self.get_entries()[0]))
+
+    def get_stats(self):
+        """
+        The hits, misses, writes and evictions of this process, and the bytes in the cache
+        :return: OrderedDict
+        """
+        with self.locked():
+            usage = self.read_usage()
+
+        with self.stats_lock:
+            namespaces = OrderedDict((name, OrderedDict(self.stats[name])) for name in sorted(self.stats))
+
+        return OrderedDict([('bytes', usage), ('max_bytes', self.max_bytes), ('namespaces', namespaces)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cache_dir', help='The cache directory')
+    parser.add_argument('-c', '--clear', dest='clear', default=None, help='Remove the entries of this namespace')
+    args = parser.parse_args(sys.argv[1:])
+
+    cache = OBSCacheManager(args.cache_dir)
+    if args.clear:
+        cache.clear(args.clear)
+
+    entry_counts = {}
+    for _, entry_size, entry_namespace, _ in cache.get_entries()[0]:
+        entry_counts.setdefault(entry_namespace, [0, 0])
+        entry_counts[entry_namespace][0] += 1
+        entry_counts[entry_namespace][1] += entry_size
+
+    print(json.dumps(OrderedDict([('bytes', cache.get_stats()['bytes']), ('namespaces', entry_counts)]), indent=2))
@@ -0,0 +1,265 @@
+"""
+Keeps a SQLite index of the OBS manifest.json and status.json files of the catalog, so questions like "which
+languages are at checking level 3 and published after 2016-01-01" are answered without reading every file.
+
+A file is read again only when its size or mtime changed, and its row is rewritten only when its SHA-256 changed.
+Manifests are indexed by their language slug, status files by the name of the directory they are in.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from collections import OrderedDict
+from obs.obs_classes import OBSManifest, OBSStatus
+
+
+class OBSCatalogIndex(object):
+
+    file_kinds = {'manifest.json': 'manifest', 'status.json': 'status'}
+
+    columns = ['path', 'kind', 'mtime', 'size', 'hash', 'lang', 'lang_name', 'checking_level', 'checking_entity',
+               'contributors', 'version', 'source_text', 'source_text_version', 'publish_date', 'modified_at']
+
+    date_re = re.compile(r'^(\d{4})-?(\d\d)-?(\d\d)', re.UNICODE)
+
+    def __init__(self, file_name):
+        """
+        Opens or creates the index
+        :param str|unicode file_name:
+        """
+        self.file_name = file_name
+        self.errors = []
+        self.conn = sqlite3.connect(file_name)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS catalog ('
+                          'path TEXT PRIMARY KEY, kind TEXT NOT NULL, mtime REAL, size INTEGER, hash TEXT, '
+                          'lang TEXT, lang_name TEXT, checking_level INTEGER, checking_entity TEXT, contributors TEXT, '
+                          'version TEXT, source_text TEXT, source_text_version TEXT, publish_date TEXT, '
+                          'modified_at TEXT)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS catalog_lang ON catalog (lang)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS catalog_level_date ON catalog (checking_level, publish_date)')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def get_hash(file_name):
+        sha = hashlib.sha256()
+        with open(file_name, 'rb') as in_file:
+            for block in iter(lambda: in_file.read(65536), b''):
+                sha.update(block)
+
+        return sha.hexdigest()
+
+    @staticmethod
+    def normalize_date(value):
+        """
+        Manifests use 2016-07-28 or 20160728000000, status files use 20160728
+        :param str|unicode value:
+        :return: str|unicode Like 2016-07-28, or '' if the value is not a date
+        """
+        match = OBSCatalogIndex.date_re.search('{0}'.format(value or ''))
+        return '-'.join(match.groups()) if match else ''
+
+    @staticmethod
+    def get_level(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def get_text(value):
+        """
+        Status files may list the contributors and checking entities, like manifests do
+        :return: str|unicode The items joined with ', ', like OBSStatus.from_manifest does
+        """
+        if isinstance(value, (list, tuple)):
+            return ', '.join('{0}'.format(item) for item in value)
+
+        return value
+
+    @staticmethod
+    def read_file(file_name, kind):
+        """
+        Reads the indexed values of one manifest or status file
+        :return: dict
+        """
+        if kind == 'manifest':
+            manifest = OBSManifest(file_name)
+            status = OBSStatus.from_manifest(manifest.__dict__)
+            lang = manifest.language.get('slug', '')
+            lang_name = manifest.language.get('name', '')
+            modified_at = OBSCatalogIndex.normalize_date(manifest.modified_at)
+        else:
+            status = OBSStatus(file_name)
+            lang = os.path.basename(os.path.dirname(os.path.abspath(file_name)))
+            lang_name = ''
+            modified_at = ''
+
+        return {'lang': lang, 'lang_name': lang_name,
+                'checking_level': OBSCatalogIndex.get_level(status.checking_level),
+                'checking_entity': OBSCatalogIndex.get_text(status.checking_entity),
+                'contributors': OBSCatalogIndex.get_text(status.contributors),
+                'version': '{0}'.format(status.version), 'source_text': status.source_text or None,
+                'source_text_version': '{0}'.format(status.source_text_version),
+                'publish_date': OBSCatalogIndex.normalize_date(status.publish_date), 'modified_at': modified_at}
+
+    def update(self, file_name):
+        """
+        Indexes one file, if it changed since it was last indexed
+        :param str|unicode file_name:
+        :return: str|unicode 'added', 'updated', 'unchanged' or 'failed'
+        """
+        path = os.path.abspath(file_name)
+        kind = OBSCatalogIndex.file_kinds[os.path.basename(path)]
+        stat = os.stat(path)
+        row = self.conn.execute('SELECT mtime, size, hash FROM catalog WHERE path = ?', (path,)).fetchone()
+
+        if row and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            return 'unchanged'
+
+        file_hash = OBSCatalogIndex.get_hash(path)
+        if row and row[2] == file_hash:
+            # touched but not changed
+            with self.conn:
+                self.conn.execute('UPDATE catalog SET mtime = ?, size = ? WHERE path = ?',
+                                  (stat.st_mtime, stat.st_size, path))
+            return 'unchanged'
+
+        try:
+            values = OBSCatalogIndex.read_file(path, kind)
+            values.update({'path': path, 'kind': kind, 'mtime': stat.st_mtime, 'size': stat.st_size,
+                           'hash': file_hash})
+            with self.conn:
+                self.conn.execute('INSERT OR REPLACE INTO catalog ({0}) VALUES ({1})'.format(
+                    ', '.join(OBSCatalogIndex.columns), ', '.join('?' * len(OBSCatalogIndex.columns))),
+                    [values[c] for c in OBSCatalogIndex.columns])
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError, IOError, sqlite3.Error) as e:
+            msg = 'Could not index {0}: {1}'.format(path, e)
+            print(msg)
+            self.errors.append(msg)
+
+            # the old row no longer describes the file, so it must not be found by a query
+            with self.conn:
+                self.conn.execute('DELETE FROM catalog WHERE path = ?', (path,))
+            return 'failed'
+
+        return 'updated' if row else 'added'
+
+    def scan(self, root_dir):
+        """
+        Indexes the manifest and status files under root_dir, and removes the rows of files that are gone
+        :param str|unicode root_dir:
+        :return: OrderedDict The number of files added, updated, unchanged, failed and removed
+        """
+        counts = OrderedDict([('added', 0), ('updated', 0), ('unchanged', 0), ('failed', 0), ('removed', 0)])
+        found = set()
+
+        for dir_name, _, file_names in os.walk(root_dir):
+            for file_name in file_names:
+                if file_name in OBSCatalogIndex.file_kinds:
+                    path = os.path.abspath(os.path.join(dir_name, file_name))
+                    found.add(path)
+                    counts[self.update(path)] += 1
+
+        prefix = os.path.join(os.path.abspath(root_dir), '')
+        gone = [row[0] for row in self.conn.execute('SELECT path FROM catalog WHERE substr(path, 1, ?) = ?',
+                                                    (len(prefix), prefix)) if row[0] not in found]
+        with self.conn:
+            self.conn.executemany('DELETE FROM catalog WHERE path = ?', [(path,) for path in gone])
+        counts['removed'] = len(gone)
+
+        return counts
+
+    @staticmethod
+    def get_filter(value, convert, description):
+        """
+        Converts a query value, so a typo raises an error instead of being ignored
+        :return: The converted value, or None if no value was given
+        """
+        if value is None or value == '':
+            return None
+
+        converted = convert(value)
+        if converted is None or converted == '':
+            raise ValueError('"{0}" is not a valid {1}.'.format(value, description))
+
+        return converted
+
+    def query(self, lang=None, kind=None, checking_level=None, min_checking_level=None, version=None,
+              source_text=None, published_after=None, published_before=None):
+        """
+        Returns the rows that match all the given values
+        :param int checking_level: Exactly this level
+        :param int min_checking_level: This level or higher
+        :param str|unicode published_after: A date, like 2016-01-01, not included
+        :param str|unicode published_before: A date, not included
+        :return: list<OrderedDict>
+        :raises ValueError: If a checking level or date cannot be read
+        """
+        conditions = []
+        params = []
+        get_filter = OBSCatalogIndex.get_filter
+
+        for column, operator, value in [
+                ('lang', '=', lang), ('kind', '=', kind),
+                ('checking_level', '=', get_filter(checking_level, OBSCatalogIndex.get_level, 'checking level')),
+                ('checking_level', '>=', get_filter(min_checking_level, OBSCatalogIndex.get_level, 'checking level')),
+                ('version', '=', version), ('source_text', '=', source_text),
+                ('publish_date', '>', get_filter(published_after, OBSCatalogIndex.normalize_date, 'date')),
+                ('publish_date', '<', get_filter(published_before, OBSCatalogIndex.normalize_date, 'date'))]:
+            if value is not None and value != '':
+                conditions.append('{0} {1} ?'.format(column, operator))
+                params.append(value)
+
+        sql = 'SELECT {0} FROM catalog'.format(', '.join(OBSCatalogIndex.columns))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        cursor = self.conn.execute(sql + ' ORDER BY lang, kind', params)
+        return [OrderedDict(zip(OBSCatalogIndex.columns, row)) for row in cursor.fetchall()]
+
+    def get_languages(self, **kwargs):
+        """
+        The languages with a row that matches, takes the same arguments as query
+        :return: list<str>
+        """
+        return sorted(set(row['lang'] for row in self.query(**kwargs)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-i', '--index', dest='index', required=True, help='The index file')
+    parser.add_argument('-s', '--scan', dest='scan_dirs', action='append', help='Update the index from this directory')
+    parser.add_argument('-l', '--lang', dest='lang', default=None, help='Only this language')
+    parser.add_argument('-c', '--checking-level', dest='checking_level', default=None, help='Only this checking level')
+    parser.add_argument('-m', '--min-checking-level', dest='min_checking_level', default=None,
+                        help='Only this checking level or higher')
+    parser.add_argument('-v', '--version', dest='version', default=None, help='Only this version')
+    parser.add_argument('--source', dest='source_text', default=None, help='Only this source language')
+    parser.add_argument('--after', dest='published_after', default=None, help='Only published after this date')
+    parser.add_argument('--before', dest='published_before', default=None, help='Only published before this date')
+    args = parser.parse_args(sys.argv[1:])
+
+    catalog_index = OBSCatalogIndex(args.index)
+    for scan_dir in args.scan_dirs or []:
+        print('{0}: {1}'.format(scan_dir, json.dumps(catalog_index.scan(scan_dir))))
+
+    try:
+        found_rows = catalog_index.query(lang=args.lang, checking_level=args.checking_level,
+                                         min_checking_level=args.min_checking_level, version=args.version,
+                                         source_text=args.source_text, published_after=args.published_after,
+                                         published_before=args.published_before)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        catalog_index.close()
+
+    print(json.dumps(found_rows, indent=2))
@@ -50,3 +50,124 @@ frame_counts = [
     18,
     17
 ]
+
+
+# The tables below are built once, at import, from frame_counts.
+
+try:
+    from types import MappingProxyType
+except ImportError:
+    try:
+        from collections.abc import Mapping
+    except ImportError:
+        from collections import Mapping
+
+    class MappingProxyType(Mapping):
+        """
+        A read-only view of a dictionary, for Python versions before 3.3
+        """
+        def __init__(self, mapping):
+            self._mapping = mapping
+
+        def __getitem__(self, key):
+            return self._mapping[key]
+
+        def __iter__(self):
+            return iter(self._mapping)
+
+        def __len__(self):
+            return len(self._mapping)
+
+        def get(self, key, default=None):
+            return self._mapping.get(key, default)
+
+# imported by get_numpy when it is first needed, None if it is not installed
+numpy = False
+
+# chapter numbers, like '01'
+chapter_numbers = tuple(str(x).zfill(2) for x in range(1, len(frame_counts) + 1))
+
+# the frame ids of each chapter, like '01-01'
+chapter_frame_ids = tuple(tuple('{0}-{1}'.format(number, str(x).zfill(2)) for x in range(1, count + 1))
+                          for number, count in zip(chapter_numbers, frame_counts))
+
+# every frame id, in order
+frame_ids = tuple(frame_id for ids in chapter_frame_ids for frame_id in ids)
+
+# the global index of the first frame of each chapter, followed by the total number of frames
+chapter_offsets = tuple(sum(frame_counts[:x]) for x in range(len(frame_counts) + 1))
+
+total_frames = chapter_offsets[-1]
+
+# frame id -> global index
+frame_indexes = MappingProxyType(dict((frame_id, index) for index, frame_id in enumerate(frame_ids)))
+
+
+def get_frame_index(frame_id):
+    """
+    :param str|unicode frame_id: Like '01-01'
+    :return: int The global index of the frame, or -1 if it is not a valid frame id
+    """
+    return frame_indexes.get(frame_id, -1)
+
+
+def get_frame_id(index):
+    """
+    :param int index: The global index of the frame
+    :return: str|unicode
+    """
+    return frame_ids[index]
+
+
+def get_presence_bitmap(present_ids):
+    """
+    Returns one byte for each frame, 1 if the frame is present
+    :param present_ids: An iterable of frame ids
+    :return: bytearray
+    """
+    bitmap = bytearray(total_frames)
+    for frame_id in present_ids:
+        index = frame_indexes.get(frame_id)
+        if index is not None:
+            bitmap[index] = 1
+    return bitmap
+
+
+def get_numpy():
+    """
+    Imports NumPy the first time it is needed, so importing the frame tables stays cheap
+    :return: The numpy module, or None if it is not installed
+    """
+    global numpy
+
+    if numpy is False:
+        try:
+            import numpy as numpy_module
+        except ImportError:
+            numpy_module = None
+        numpy = numpy_module
+
+    return numpy
+
+
+def get_missing_frames(bitmaps):
+    """
+    Checks the presence bitmaps of many languages at once
+    :param dict bitmaps: Language -> bitmap from get_presence_bitmap
+    :return: dict Language -> list of missing frame ids
+    """
+    langs = list(bitmaps.keys())
+    if not langs:
+        return {}
+
+    numpy_module = get_numpy()
+    if numpy_module is not None:
+        matrix = numpy_module.frombuffer(b''.join(bytes(bitmaps[lang]) for lang in langs), dtype=numpy_module.uint8)
+        rows, columns = numpy_module.nonzero(matrix.reshape(len(langs), total_frames) == 0)
+        missing = dict((lang, []) for lang in langs)
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            missing[langs[row]].append(frame_ids[column])
+        return missing
+
+    return dict((lang, [frame_ids[i] for i, present in enumerate(bytearray(bitmaps[lang])) if not present])
+                for lang in langs)
@@ -0,0 +1,249 @@
+"""
+A packed, memory-mapped container for the text of many OBS languages, so single frames can be read without decoding
+JSON.
+
+Layout, all integers little-endian:
+
+    header      magic 'OBSC', version, language count, slots per language, and the position of each section
+    languages   JSON list of {"language": ..., "direction": ...}
+    offsets     (language count * slots per language + 1) uint64 offsets into the text section
+    text        UTF-8 text of every slot, one after another
+
+Each language has the same fixed slots: the 598 frames in the order of chapters_and_frames.frame_counts, then the
+50 chapter titles, then the 50 chapter refs. Missing text is stored as an empty string.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import glob
+import json
+import mmap
+import random
+import struct
+import sys
+import time
+from collections import OrderedDict
+from obs import chapters_and_frames
+from obs.lazy_obs import LazyOBS
+
+
+class OBSCorpus(object):
+
+    magic = b'OBSC'
+    version = 1
+    header_format = str('<4sHHIIQQQQ')
+    header_size = struct.calcsize(header_format)
+    offset_format = str('<Q')
+    offset_size = struct.calcsize(offset_format)
+
+    chapter_count = len(chapters_and_frames.frame_counts)
+    frame_count = chapters_and_frames.total_frames
+    slot_count = frame_count + 2 * chapter_count
+
+    # the first slot of each chapter's frames
+    chapter_slots = chapters_and_frames.chapter_offsets
+
+    def __init__(self, file_name):
+        """
+        Opens a corpus file for reading.
+        :param str|unicode file_name:
+        """
+        self.in_file = open(file_name, 'rb')
+        self.data = None
+
+        try:
+            # mmap refuses an empty file
+            self.data = mmap.mmap(self.in_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.read_header()
+        except (ValueError, KeyError, TypeError, struct.error):
+            self.close()
+            raise IOError('The file {0} is not a supported OBS corpus.'.format(file_name))
+
+    def read_header(self):
+        """
+        Reads the header and the languages, and checks that every section is inside the file
+        :raises ValueError: If the file is not a corpus, or is truncated
+        """
+        size = len(self.data)
+        if size < OBSCorpus.header_size:
+            raise ValueError('The header is truncated.')
+
+        magic, version, _, lang_count, slot_count, lang_offset, lang_size, self.offsets_offset, self.text_offset = \
+            struct.unpack_from(OBSCorpus.header_format, self.data, 0)
+
+        if magic != OBSCorpus.magic or version != OBSCorpus.version or slot_count != OBSCorpus.slot_count:
+            raise ValueError('Not a corpus file.')
+
+        offsets_end = self.offsets_offset + (lang_count * slot_count + 1) * OBSCorpus.offset_size
+        if lang_offset + lang_size > size or offsets_end > self.text_offset or self.text_offset > size:
+            raise ValueError('A section is truncated.')
+
+        # the last offset is the end of the text section
+        text_size = struct.unpack_from(OBSCorpus.offset_format, self.data, offsets_end - OBSCorpus.offset_size)[0]
+        if self.text_offset + text_size > size:
+            raise ValueError('The text section is truncated.')
+
+        self.languages = json.loads(self.data[lang_offset:lang_offset + lang_size].decode('utf-8'))
+        if len(self.languages) != lang_count:
+            raise ValueError('The language list does not match the header.')
+        self.language_index = dict((lang['language'], i) for i, lang in enumerate(self.languages))
+
+    def __enter__(self):
+        return self
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.in_file.close()
+
+    @staticmethod
+    def frame_slot(chapter, frame):
+        """
+        :param int chapter: 1 through 50
+        :param int frame: 1 through the frame count of the chapter
+        :return: int
+        """
+        if not 1 <= chapter <= OBSCorpus.chapter_count or \
+                not 1 <= frame <= chapters_and_frames.frame_counts[chapter - 1]:
+            raise IndexError('Frame not found: {0}-{1}'.format(str(chapter).zfill(2), str(frame).zfill(2)))
+
+        return OBSCorpus.chapter_slots[chapter - 1] + frame - 1
+
+    @staticmethod
+    def title_slot(chapter):
+        return OBSCorpus.frame_count + chapter - 1
+
+    @staticmethod
+    def ref_slot(chapter):
+        return OBSCorpus.frame_count + OBSCorpus.chapter_count + chapter - 1
+
+    def get_text(self, lang, slot):
+        """
+        :param str|unicode lang:
+        :param int slot:
+        :return: str|unicode
+        """
+        index = self.language_index[lang] * OBSCorpus.slot_count + slot
+        position = self.offsets_offset + index * OBSCorpus.offset_size
+        start, end = struct.unpack_from(str('<QQ'), self.data, position)
+        return self.data[self.text_offset + start:self.text_offset + end].decode('utf-8')
+
+    def get_frame(self, lang, chapter, frame):
+        return self.get_text(lang, OBSCorpus.frame_slot(int(chapter), int(frame)))
+
+    def get_title(self, lang, chapter):
+        return self.get_text(lang, OBSCorpus.title_slot(int(chapter)))
+
+    def get_ref(self, lang, chapter):
+        return self.get_text(lang, OBSCorpus.ref_slot(int(chapter)))
+
+    def iter_frames(self, lang):
+        """
+        Yields the id and text of every frame of a language, in order
+        """
+        for slot, frame_id in enumerate(chapters_and_frames.frame_ids):
+            yield frame_id, self.get_text(lang, slot)
+
+    @staticmethod
+    def get_slot_texts(obs_obj):
+        """
+        Returns the text of each slot for one language
+        :param OBS obs_obj:
+        :return: list<str>
+        """
+        texts = [''] * OBSCorpus.slot_count
+
+        for chapter in obs_obj.chapters:
+            chapter_number = int(chapter['number'])
+            if not 1 <= chapter_number <= OBSCorpus.chapter_count:
+                continue
+
+            texts[OBSCorpus.title_slot(chapter_number)] = chapter['title'] or ''
+            texts[OBSCorpus.ref_slot(chapter_number)] = chapter['ref'] or ''
+
+            for frame in chapter['frames']:
+                slot = chapters_and_frames.get_frame_index(frame['id'])
+                if slot >= 0:
+                    texts[slot] = frame.get('text') or ''
+
+        return texts
+
+    @staticmethod
+    def write(file_name, obs_list):
+        """
+        Writes the text of the OBS objects to a corpus file
+        :param str|unicode file_name:
+        :param list obs_list: OBS objects, one for each language
+        """
+        languages = [OrderedDict([('language', o.language), ('direction', o.direction)]) for o in obs_list]
+        lang_bytes = json.dumps(languages).encode('utf-8')
+
+        offsets = [0]
+        blobs = []
+        for obs_obj in obs_list:
+            for text in OBSCorpus.get_slot_texts(obs_obj):
+                blob = text.encode('utf-8')
+                blobs.append(blob)
+                offsets.append(offsets[-1] + len(blob))
+
+        lang_offset = OBSCorpus.header_size
+        offsets_offset = lang_offset + len(lang_bytes)
+        text_offset = offsets_offset + len(offsets) * OBSCorpus.offset_size
+
+        with open(file_name, 'wb') as out_file:
+            out_file.write(struct.pack(OBSCorpus.header_format, OBSCorpus.magic, OBSCorpus.version, 0,
+                                       len(obs_list), OBSCorpus.slot_count, lang_offset, len(lang_bytes),
+                                       offsets_offset, text_offset))
+            out_file.write(lang_bytes)
+            out_file.write(struct.pack(str('<{0}Q'.format(len(offsets))), *offsets))
+            for blob in blobs:
+                out_file.write(blob)
+
+    def benchmark(self, lookups=100000):
+        """
+        Times random frame lookups and full scans of every language
+        :param int lookups: The number of random lookups
+        :return: OrderedDict Seconds for each test
+        """
+        langs = [lang['language'] for lang in self.languages]
+        frames = [(c, f) for c, count in enumerate(chapters_and_frames.frame_counts, 1) for f in range(1, count + 1)]
+        picks = [(random.choice(langs), random.choice(frames)) for _ in range(lookups)]
+
+        start = time.time()
+        for lang, (chapter, frame) in picks:
+            self.get_frame(lang, chapter, frame)
+        random_time = time.time() - start
+
+        start = time.time()
+        for lang in langs:
+            for _ in self.iter_frames(lang):
+                pass
+        scan_time = time.time() - start
+
+        return OrderedDict([
+            ('random_lookups', lookups),
+            ('random_seconds', random_time),
+            ('random_per_second', lookups / random_time if random_time else 0.0),
+            ('scanned_frames', len(langs) * OBSCorpus.frame_count),
+            ('scan_seconds', scan_time)
+        ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help='The corpus file')
+    parser.add_argument('-b', '--build', dest='build', default=None,
+                        help='Build the corpus from the JSON files matching this pattern, like "obs-*.json"')
+    parser.add_argument('-n', '--lookups', dest='lookups', default='100000', help='Random lookups to benchmark')
+    args = parser.parse_args(sys.argv[1:])
+
+    if args.build:
+        OBSCorpus.write(args.corpus, [LazyOBS(f) for f in sorted(glob.glob(args.build))])
+
+    with OBSCorpus(args.corpus) as corpus:
+        for key, value in corpus.benchmark(int(args.lookups)).items():
+            print('{0}: {1}'.format(key, value))
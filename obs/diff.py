@@ -0,0 +1,148 @@
+"""
+Compares two versions of an OBS, frame by frame.
+
+Each frame text, title and ref is compared directly, which stops at the first difference, so unchanged content costs
+one string comparison. Word-level detail is computed only for the frames that changed. The changed chapters can be
+used to select what to re-export.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import difflib
+import json
+import sys
+from collections import OrderedDict
+from obs.obs_classes import OBS
+
+
+class OBSDiff(object):
+
+    kinds = ('frames', 'titles', 'refs')
+
+    def __init__(self, old_obs, new_obs, word_detail=False):
+        """
+        Class constructor. Compares the two objects immediately.
+        :param OBS old_obs:
+        :param OBS new_obs:
+        :param bool word_detail: Also list the changed words of each changed frame
+        """
+        self.added = OrderedDict((kind, []) for kind in OBSDiff.kinds)
+        self.removed = OrderedDict((kind, []) for kind in OBSDiff.kinds)
+        self.changed = OrderedDict((kind, []) for kind in OBSDiff.kinds)
+        self.words = OrderedDict()
+
+        old_items = OBSDiff.get_items(old_obs)
+        new_items = OBSDiff.get_items(new_obs)
+
+        for key, new_text in new_items.items():
+            kind, item_id = key
+            if key not in old_items:
+                self.added[kind].append(item_id)
+                continue
+
+            old_text = old_items[key]
+            if old_text == new_text:
+                continue
+
+            self.changed[kind].append(item_id)
+            if word_detail and kind == 'frames':
+                self.words[item_id] = OBSDiff.word_diff(old_text, new_text)
+
+        for key in old_items:
+            if key not in new_items:
+                self.removed[key[0]].append(key[1])
+
+    @staticmethod
+    def get_items(obs_obj):
+        """
+        Returns the text of every frame, title and ref
+        :param OBS obs_obj:
+        :return: OrderedDict (kind, id) -> text, with '' for missing text
+        """
+        items = OrderedDict()
+
+        for chapter in obs_obj.chapters:
+            number = chapter['number']
+            items[('titles', number)] = chapter['title'] or ''
+            items[('refs', number)] = chapter['ref'] or ''
+
+            for frame in chapter['frames']:
+                items[('frames', frame['id'])] = frame.get('text') or ''
+
+        return items
+
+    @staticmethod
+    def word_diff(old_text, new_text):
+        """
+        :param str|unicode old_text:
+        :param str|unicode new_text:
+        :return: list<OrderedDict> The removed and inserted words of each change
+        """
+        old_words = (old_text or '').split()
+        new_words = (new_text or '').split()
+        changes = []
+
+        matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            changes.append(OrderedDict([('op', tag),
+                                        ('old', ' '.join(old_words[old_start:old_end])),
+                                        ('new', ' '.join(new_words[new_start:new_end]))]))
+
+        return changes
+
+    def has_changes(self):
+        return any(self.added[k] or self.removed[k] or self.changed[k] for k in OBSDiff.kinds)
+
+    def changed_chapters(self):
+        """
+        Returns the numbers of the chapters that need to be exported again
+        :return: list<str>
+        """
+        chapters = set()
+        for group in (self.added, self.removed, self.changed):
+            for kind in OBSDiff.kinds:
+                for item_id in group[kind]:
+                    chapters.add(item_id.split('-')[0])
+
+        return sorted(chapters)
+
+    def to_serializable(self):
+        return OrderedDict([
+            ('added', self.added),
+            ('removed', self.removed),
+            ('changed', self.changed),
+            ('words', self.words),
+            ('changed_chapters', self.changed_chapters())
+        ])
+
+    def __str__(self):
+        lines = []
+        for label, group in (('Added', self.added), ('Removed', self.removed), ('Changed', self.changed)):
+            for kind in OBSDiff.kinds:
+                if group[kind]:
+                    lines.append('{0} {1}: {2}'.format(label, kind, ', '.join(group[kind])))
+
+        for frame_id, changes in self.words.items():
+            for change in changes:
+                lines.append('  {0}: -[{1}] +[{2}]'.format(frame_id, change['old'], change['new']))
+
+        return '\n'.join(lines) if lines else 'No changes'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old_file', help='The previous obs-{lang}.json')
+    parser.add_argument('new_file', help='The new obs-{lang}.json')
+    parser.add_argument('-w', '--words', dest='words', action='store_true', help='Show the changed words')
+    parser.add_argument('-j', '--json', dest='as_json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args(sys.argv[1:])
+
+    diff = OBSDiff(OBS(args.old_file), OBS(args.new_file), args.words)
+    if args.as_json:
+        print(json.dumps(diff.to_serializable(), indent=2, ensure_ascii=False))
+    else:
+        print(diff)
+
+    sys.exit(1 if diff.has_changes() else 0)
@@ -0,0 +1,380 @@
+"""
+Runs OBSTexExport as a long-running service, so snippets, templates, language names and fetched JSON stay loaded
+between jobs. Export and verify jobs are submitted over a small local HTTP API, on a TCP port or a Unix socket, and
+are queued and run with bounded concurrency.
+
+    POST /jobs       {"type": "export", "lang": "en", "out_path": "/tmp/en.tex"} or {"type": "verify", "lang": "en"}
+    GET  /jobs/<id>  the status and result of a job
+    GET  /metrics    queue depth, job counts and latencies
+
+The out_path of an export and the file_name of a verify are local files. With a base dir they must be inside it;
+without one any client can read and write every file the service can, so listen only on a trusted socket.
+
+Requires Python 3.5 or newer.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from obs.export_to_tex import OBSTexExport, OBSExportCache
+from obs.frame_store import OBSFrameStore
+from obs.obs_classes import OBS
+
+
+class ExportJob(object):
+    def __init__(self, job_id, kind, params):
+        """
+        Class constructor.
+        :param str job_id:
+        :param str kind: Either 'export' or 'verify'
+        :param dict params: The job parameters, as posted to the service
+        """
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_serializable(self):
+        return OrderedDict([
+            ('id', self.id),
+            ('type', self.kind),
+            ('params', self.params),
+            ('status', self.status),
+            ('result', self.result),
+            ('error', self.error),
+            ('submitted', self.submitted),
+            ('started', self.started),
+            ('finished', self.finished)
+        ])
+
+
+class ExportService(object):
+
+    job_kinds = ('export', 'verify')
+    reasons = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+    def __init__(self, max_concurrent=2, max_queue=100, cache=None, max_finished=1000, json_dir=None, base_dir=None):
+        """
+        Class constructor.
+        :param int max_concurrent: The number of jobs that can run at the same time
+        :param int max_queue: The number of jobs that can wait in the queue before new jobs are refused
+        :param OBSExportCache cache: Shared by all jobs, a new cache is created if not given
+        :param int max_finished: The number of finished jobs to remember
+        :param str json_dir: Where the body JSON and its chapter index are kept for jobs with max_chapters, a temporary
+                             directory that is deleted in stop if not given
+        :param str base_dir: If given, the files named in jobs must be inside this directory
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.cache = cache or OBSExportCache()
+        self.temp_json_dir = None if json_dir else tempfile.mkdtemp(prefix='obs-service-json-')
+        self.json_dir = json_dir or self.temp_json_dir
+        self.base_dir = base_dir
+        self.store = OBSFrameStore()
+        self.lang_names = None  # type: dict
+
+        self.jobs = OrderedDict()
+        self.job_ids = itertools.count(1)
+        self.queue = None  # type: asyncio.Queue
+        self.workers = []
+        self.server = None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)  # type: deque<tuple>
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """
+        Starts the workers and begins listening, on a Unix socket if <path> is given
+        :param str host:
+        :param int port: Use 0 to pick a free port
+        :param str path: The name of the Unix socket
+        """
+        loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.workers = [loop.create_task(self.worker()) for _ in range(self.max_concurrent)]
+
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+        return self.server
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+        self.executor.shutdown(wait=True)
+
+        if self.temp_json_dir:
+            shutil.rmtree(self.temp_json_dir, ignore_errors=True)
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    def submit(self, kind, params=None):
+        """
+        Queues a new job
+        :param str kind: Either 'export' or 'verify'
+        :param dict params:
+        :return: ExportJob
+        :raises ValueError: if the job is not valid
+        :raises asyncio.QueueFull: if the queue is full
+        """
+        params = params or {}
+
+        if kind not in ExportService.job_kinds:
+            raise ValueError('Unknown job type: {0}'.format(kind))
+
+        if kind == 'export' and ('lang' not in params or 'out_path' not in params):
+            raise ValueError('An export job needs "lang" and "out_path".')
+
+        if kind == 'verify' and ('lang' not in params and 'file_name' not in params):
+            raise ValueError('A verify job needs "lang" or "file_name".')
+
+        for key in ('out_path', 'file_name'):
+            if key in params and not self.is_allowed(params[key]):
+                raise ValueError('"{0}" must be a file in {1}.'.format(key, self.base_dir))
+
+        job = ExportJob(str(next(self.job_ids)), kind, params)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+
+        # forget the oldest finished jobs
+        finished = [j.id for j in self.jobs.values() if j.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+        return job
+
+    def is_allowed(self, file_name):
+        """
+        :return: bool True if there is no base dir, or the file is inside it
+        """
+        if not self.base_dir:
+            return True
+
+        try:
+            real_name = os.path.realpath(file_name)
+        except (TypeError, AttributeError):
+            return False
+
+        return real_name.startswith(os.path.join(os.path.realpath(self.base_dir), ''))
+
+    async def worker(self):
+        loop = asyncio.get_event_loop()
+
+        while True:
+            job = await self.queue.get()
+
+            try:
+                job.status = 'running'
+                job.started = time.time()
+                self.running += 1
+                try:
+                    job.result = await loop.run_in_executor(self.executor, self.run_job, job)
+                finally:
+                    self.running -= 1
+
+                job.status = 'done'
+                self.completed += 1
+
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+                self.failed += 1
+
+            finally:
+                job.finished = time.time()
+                if job.started:
+                    self.latencies.append((job.started - job.submitted, job.finished - job.started))
+                job.done.set()
+                self.queue.task_done()
+
+    def run_job(self, job):
+        try:
+            if job.kind == 'export':
+                return self.run_export(job.params)
+
+            return self.run_verify(job.params)
+
+        except SystemExit:
+            raise RuntimeError('The {0} job exited before it finished.'.format(job.kind))
+
+    def run_export(self, params):
+        with OBSTexExport(params['lang'], params['out_path'], int(params.get('max_chapters', 0)),
+                          params.get('img_res', '360px'), params.get('checking_level', '1'),
+                          cache=self.cache, store=self.store, json_dir=self.json_dir) as exporter:
+            exporter.run()
+
+        return OrderedDict([('out_path', params['out_path']), ('overflow_frames', exporter.overflow_frames)])
+
+    def run_verify(self, params):
+        if 'file_name' in params:
+            obs_obj = OBS(params['file_name'])
+        else:
+            lang = params['lang']
+            obs_obj = OBS()
+            obs_obj.__dict__ = json.loads(self.cache.get_url('/'.join([OBSTexExport.api_url_txt, lang,
+                                                                       'obs-{0}.json'.format(lang)])))
+
+        errors = obs_obj.get_errors()
+
+        return OrderedDict([('language', obs_obj.language),
+                            ('language_name', self.get_lang_names().get(obs_obj.language, '')),
+                            ('verified', len(errors) == 0),
+                            ('errors', errors)])
+
+    def get_lang_names(self):
+        if self.lang_names is None:
+            self.lang_names = OBS.load_lang_strings()
+
+        return self.lang_names
+
+    def get_metrics(self):
+        waits = [w for w, r in self.latencies]
+        runs = [r for w, r in self.latencies]
+
+        return OrderedDict([
+            ('queue_depth', self.queue.qsize() if self.queue else 0),
+            ('running', self.running),
+            ('completed', self.completed),
+            ('failed', self.failed),
+            ('wait_avg', sum(waits) / len(waits) if waits else 0.0),
+            ('wait_max', max(waits) if waits else 0.0),
+            ('run_avg', sum(runs) / len(runs) if runs else 0.0),
+            ('run_max', max(runs) if runs else 0.0),
+            ('cached_files', len(self.cache.files)),
+            ('cached_urls', len(self.cache.urls)),
+            ('memo_hits', self.store.hits),
+            ('memo_misses', self.store.misses)
+        ])
+
+    async def wait(self, job):
+        await job.done.wait()
+        return job
+
+    def route(self, method, path, body):
+        """
+        Handles one API request
+        :return: tuple The HTTP status and the object to return as JSON
+        """
+        path = path.split('?')[0].rstrip('/')
+
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, {'error': 'Use GET'}
+            return 200, self.get_metrics()
+
+        if path == '/jobs':
+            if method == 'GET':
+                return 200, [job.to_serializable() for job in self.jobs.values()]
+            if method != 'POST':
+                return 405, {'error': 'Use GET or POST'}
+
+            try:
+                params = json.loads(body.decode('utf-8')) if body else {}
+                if not isinstance(params, dict):
+                    raise ValueError('The job must be a JSON object.')
+                job = self.submit(params.pop('type', ''), params)
+            except ValueError as e:
+                return 400, {'error': str(e)}
+            except asyncio.QueueFull:
+                return 503, {'error': 'The job queue is full.'}
+
+            return 202, job.to_serializable()
+
+        if path.startswith('/jobs/'):
+            job = self.jobs.get(path[len('/jobs/'):])
+            if not job:
+                return 404, {'error': 'Job not found.'}
+            return 200, job.to_serializable()
+
+        return 404, {'error': 'Not found.'}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path = request_line.decode('latin-1').split()[0:2]
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, value = line.decode('latin-1').split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+            status, payload = self.route(method, path, body)
+
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {'error': 'Malformed request.'}
+
+        except Exception as e:
+            status, payload = 500, {'error': '{0}: {1}'.format(e.__class__.__name__, e)}
+
+        try:
+            content = json.dumps(payload).encode('utf-8')
+            writer.write('HTTP/1.1 {0} {1}\r\n'.format(status, ExportService.reasons[status]).encode('latin-1'))
+            writer.write(b'Content-Type: application/json\r\n')
+            writer.write('Content-Length: {0}\r\n'.format(len(content)).encode('latin-1'))
+            writer.write(b'Connection: close\r\n\r\n')
+            writer.write(content)
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', dest='host', default='127.0.0.1', help='Host to listen on')
+    parser.add_argument('-p', '--port', dest='port', default='8080', help='Port to listen on')
+    parser.add_argument('-s', '--socket', dest='socket', default=None, help='Listen on this Unix socket instead')
+    parser.add_argument('-w', '--workers', dest='workers', default='2', help='Number of jobs to run at the same time')
+    parser.add_argument('-q', '--queue-size', dest='queue_size', default='100',
+                        help='Number of jobs that can wait in the queue')
+    parser.add_argument('-j', '--json-dir', dest='json_dir', default=None,
+                        help='Keep the body JSON and its chapter index here, to speed up jobs with max_chapters')
+    parser.add_argument('-b', '--base-dir', dest='base_dir', default=None,
+                        help='Only read and write files inside this directory')
+    args = parser.parse_args(sys.argv[1:])
+
+    service = ExportService(int(args.workers), int(args.queue_size), json_dir=args.json_dir, base_dir=args.base_dir)
+    event_loop = asyncio.get_event_loop()
+    event_loop.run_until_complete(service.start(args.host, int(args.port), args.socket))
+    print('Listening on {0}'.format(service.address))
+
+    try:
+        event_loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        event_loop.run_until_complete(service.stop())
@@ -18,10 +18,121 @@ import re
 import sys
 import codecs
 import argparse
+import threading
+import time
 from string import Template
 import shutil
+import tempfile
 from general_tools.file_utils import write_file, load_json_object
 from general_tools.url_utils import get_url, join_url_parts
+from obs.layout_estimator import LayoutEstimator
+from obs.lazy_obs import LazyOBS
+from obs.publish import OBSPublisher
+from obs.tex_lint import OBSTexLinter
+
+
+def atomic_group(pattern, name):
+    r"""
+    Matches like the atomic group (?>pattern), which the re module does not have before Python 3.11. The lookahead
+    finds the longest match once and the backreference consumes exactly that text, so it is never backtracked into.
+    :param str|unicode pattern:
+    :param str|unicode name: A group name that is unique in the whole pattern
+    :return: str|unicode
+    """
+    return '(?={0})(?P={1})'.format('(?P<{0}>{1})'.format(name, pattern), name)
+
+
+def blank_separated(name, non_blank=r'\S', blank=r'[^\S\n]+', lazy=True):
+    r"""
+    Matches text that does not begin or end with a blank. Each step takes either one non-blank character or a whole
+    run of blanks followed by a non-blank, so with \s* padding around it there is only one way to match the blanks
+    and the time stays linear.
+    :param str|unicode name: A prefix for the group names, unique in the whole pattern
+    :param str|unicode non_blank: The characters allowed in the text, other than blanks
+    :param str|unicode blank: The blanks allowed inside the text
+    :param bool lazy:
+    :return: str|unicode
+    """
+    return '(?:{0}|{1}(?={0}))*{2}'.format(non_blank, atomic_group(blank, name + '_gap'), '?' if lazy else '')
+
+
+def trimmed_text(close):
+    r"""
+    The linear equivalent of \s*(.*?)\s*<close>, with the text in the group named 'text'
+    :param str|unicode close:
+    :return: str|unicode
+    """
+    return (atomic_group(r'\s*', 'lead') + '(?P<text>' + blank_separated('text') + ')' + atomic_group(r'\s*', 'trail') +
+            close)
+
+
+def url_prefix(blanks=True):
+    r"""
+    The linear equivalent of [(]*\s* in front of a link. A match can only start at the beginning of a run of
+    parentheses or blanks, because a start inside the run would fail in the same way the start of the run did.
+    :param bool blanks: False for the equivalent of [(]*
+    :return: str|unicode
+    """
+    prefix = '(?:(?<![(]){0})?'.format(atomic_group('[(]+', 'parens'))
+    if blanks:
+        prefix += r'(?:(?<!\s){0})?'.format(atomic_group(r'\s+', 'blanks'))
+
+    return prefix
+
+
+class OBSExportCache(object):
+
+    def __init__(self, json_max_age=300, disk_cache=None):
+        """
+        Keeps snippets, templates and fetched JSON between exports, so a long-running process does not reload them.
+        :param int json_max_age: The number of seconds fetched JSON is reused before it is fetched again
+        :param OBSCacheManager disk_cache: If given, fetched JSON is also shared with other processes through it
+        """
+        self.json_max_age = json_max_age
+        self.disk_cache = disk_cache
+        self.files = {}
+        self.urls = {}
+        self.lock = threading.Lock()
+
+    def read_file(self, file_name):
+        with self.lock:
+            if file_name in self.files:
+                return self.files[file_name]
+
+        with codecs.open(file_name, 'r', encoding='utf-8-sig') as in_file:
+            content = in_file.read()
+
+        with self.lock:
+            self.files[file_name] = content
+
+        return content
+
+    def get_url(self, url):
+        now = time.time()
+        with self.lock:
+            if url in self.urls and now - self.urls[url][1] < self.json_max_age:
+                return self.urls[url][0]
+
+        content = None
+        if self.disk_cache:
+            content = self.disk_cache.get('http', url, self.json_max_age)
+            if content is not None:
+                content = content.decode('utf-8')
+
+        if content is None:
+            content = get_url(url)
+            if self.disk_cache and content:
+                self.disk_cache.put('http', url, content.encode('utf-8'))
+
+        with self.lock:
+            self.urls[url] = (content, now)
+
+        return content
+
+    def clear(self):
+        with self.lock:
+            self.files = {}
+            self.urls = {}
 
 
 class OBSTexExport(object):
@@ -38,46 +149,66 @@ class OBSTexExport(object):
         return tools_dir
 
     api_url_txt = 'https://api.unfoldingword.org/obs/txt/1'
+    # the JSON files of a language, and the temp files they are saved to
+    json_files = [('obs-{0}-front-matter.json', '{0}-front-matter-json.tmp'),
+                  ('obs-{0}-back-matter.json', '{0}-back-matter-json.tmp'),
+                  ('obs-{0}.json', '{0}-body-matter-json.tmp')]
     api_url_jpg = 'https://cdn.door43.org/obs/jpg'
-    snippets_dir = os.path.join(get_tools_dir(), 'obs', 'tex')
+    # a staticmethod cannot be called in the class body before Python 3.10
+    tools_dir = get_tools_dir.__func__()
+    snippets_dir = os.path.join(tools_dir, 'obs', 'tex') if tools_dir else None
 
     MATCH_ALL = 0
     MATCH_ONE = 0
 
-    # Create clickable URL links with \1 \1 or \1 \2, respectively
+    # Create clickable URL links with url url, url text or url url2, respectively
     clickable_item1 = r'\\startitemize[intro,joinedup,nowhite]' + \
-                      r'{{\\goto{ht===!!!===tp\1}[url(ht===!!!===tp\1)]}}\\stopitemize'
-    clickable_inline1 = r'({{\\goto{ht===!!!===tp\1}[url(ht===!!!===tp\1)]}})'
-    clickable_ownline1 = r'{{\\goto{ht===!!!===tp\1}[url(ht===!!!===tp\1)]}}'
-    # clickable_item2 = r'\\startitemize[intro,joinedup,nowhite]{{\\goto{\2}[url(\1)]}}\\stopitemize'
-    clickable_inline2 = r'({{\\goto{\2}[url(ht===!!!===tp\1)]}})'
-    clickable_ownline2 = r'{{\\goto{\2}[url(ht===!!!===tp\1)]}}'
-    clickable_inlineB = r'({{\\goto{ht===!!!===tp\2}[url(ht===!!!===tp\1)]}})'
-    clickable_ownlineB = r'{{\\goto{ht===!!!===tp\2}[url(ht===!!!===tp\1)]}}'
+                      r'{{\\goto{ht===!!!===tp\g<url>}[url(ht===!!!===tp\g<url>)]}}\\stopitemize'
+    clickable_inline1 = r'({{\\goto{ht===!!!===tp\g<url>}[url(ht===!!!===tp\g<url>)]}})'
+    clickable_ownline1 = r'{{\\goto{ht===!!!===tp\g<url>}[url(ht===!!!===tp\g<url>)]}}'
+    # clickable_item2 = r'\\startitemize[intro,joinedup,nowhite]{{\\goto{\g<text>}[url(\g<url>)]}}\\stopitemize'
+    clickable_inline2 = r'({{\\goto{\g<text>}[url(ht===!!!===tp\g<url>)]}})'
+    clickable_ownline2 = r'{{\\goto{\g<text>}[url(ht===!!!===tp\g<url>)]}}'
+    clickable_inlineB = r'({{\\goto{ht===!!!===tp\g<url2>}[url(ht===!!!===tp\g<url>)]}})'
+    clickable_ownlineB = r'{{\\goto{ht===!!!===tp\g<url2>}[url(ht===!!!===tp\g<url>)]}}'
 
     # DocuWiki markup patterns
     matchRemoveDummyTokenPat = re.compile(r"===!!!===", re.UNICODE)
     matchSingleTokenPat = re.compile(r"^\s*(\S+)\s*$", re.UNICODE)
-    matchSectionPat = re.compile(r"==+\s*(.*?)\s*==+", re.UNICODE)
-    matchBoldPat = re.compile(r"[*][*]\s*(.*?)\s*[*][*]", re.UNICODE)
-    matchItalicPat = re.compile(r"(?:\A|[^:])//\s*(.*?)\s*//", re.UNICODE)
-    matchUnderLinePat = re.compile(r"__\s*(.*?)\s*__", re.UNICODE)
-    matchMonoPat = re.compile(r"[\'][\']\s*(.*?)\s*[\'][\']", re.UNICODE)
-    matchRedPat = re.compile(r"<red>\s*(.*?)\s*</red>", re.UNICODE)
-    matchMagentaPat = re.compile(r"<mag[enta]*>\s*(.*?)\s*</mag[enta]*>", re.UNICODE)
-    matchBluePat = re.compile(r"<blue>\s*(.*?)\s*</blue>", re.UNICODE)
-    matchGreenPat = re.compile(r"<green>\s*(.*?)\s*</green>", re.UNICODE)
-    matchHeadingFourLevelPat = re.compile(r"(\A|[^=])====+\s*(.*?)\s*===+?([^=]|\Z)", re.UNICODE)
-    matchHeadingThreeLevelPat = re.compile(r"(\A|[^=])===+\s*(.*?)\s*==+?([^=]|\Z)", re.UNICODE)
-    matchHeadingTwoLevelPat = re.compile(r"(\A|[^=])==+\s*(.*?)\s*==+?([^=]|\Z)", re.UNICODE)
-    matchHeadingOneLevelPat = re.compile(r"(\A|[^=])=+\s*(.*?)\s*=+?([^=]|\Z)", re.UNICODE)
-    matchSubScriptPat = re.compile(r"<sub>\s*(.*?)\s*</sub>", re.UNICODE)
-    matchSuperScriptPat = re.compile(r"<sup>\s*(.*?)\s*</sup>", re.UNICODE)
-    matchStrikeOutPat = re.compile(r"<del>\s*(.*?)\s*</del>", re.UNICODE)
-    matchURLPat = re.compile(r"[(]*\s*[\[][\[]\s*http(s*://[^|\[\]]*?)\s*[|]\s*http(s*[^\[\]]*?)\s*[\]][\]][).,]*",
-                             re.UNICODE)
-    matchURLandTextPat = re.compile(r"[(]*\s*[\[][\[]\s*http(s*://[^|\[\]]*?)\s*[|]\s*([^\[\]]*?)\s*[\]][\]][).,]*",
-                                    re.UNICODE)
+    # The text between the delimiters is matched with trimmed_text, the linear equivalent of \s*(.*?)\s*, because the
+    # overlapping blanks make the plain form take cubic time on long runs of blanks without a closing delimiter.
+    matchSectionPat = re.compile(r"==+" + trimmed_text(r"==+"), re.UNICODE)
+    matchBoldPat = re.compile(r"[*][*]" + trimmed_text(r"[*][*]"), re.UNICODE)
+    matchItalicPat = re.compile(r"(?:\A|[^:])//" + trimmed_text(r"//"), re.UNICODE)
+    matchUnderLinePat = re.compile(r"__" + trimmed_text(r"__"), re.UNICODE)
+    matchMonoPat = re.compile(r"[\'][\']" + trimmed_text(r"[\'][\']"), re.UNICODE)
+    matchRedPat = re.compile(r"<red>" + trimmed_text(r"</red>"), re.UNICODE)
+    matchMagentaPat = re.compile(r"<mag[enta]*>" + trimmed_text(r"</mag[enta]*>"), re.UNICODE)
+    matchBluePat = re.compile(r"<blue>" + trimmed_text(r"</blue>"), re.UNICODE)
+    matchGreenPat = re.compile(r"<green>" + trimmed_text(r"</green>"), re.UNICODE)
+    # The closing run of = is taken whole, since the character after it must not be =
+    matchHeadingFourLevelPat = re.compile(r"(?P<pre>\A|[^=])====+" + trimmed_text(r"===" +
+                                          atomic_group(r"=*", "close") + r"(?P<post>[^=]|\Z)"), re.UNICODE)
+    matchHeadingThreeLevelPat = re.compile(r"(?P<pre>\A|[^=])===+" + trimmed_text(r"==" +
+                                           atomic_group(r"=*", "close") + r"(?P<post>[^=]|\Z)"), re.UNICODE)
+    matchHeadingTwoLevelPat = re.compile(r"(?P<pre>\A|[^=])==+" + trimmed_text(r"==" +
+                                         atomic_group(r"=*", "close") + r"(?P<post>[^=]|\Z)"), re.UNICODE)
+    matchHeadingOneLevelPat = re.compile(r"(?P<pre>\A|[^=])=+" + trimmed_text(r"=" +
+                                         atomic_group(r"=*", "close") + r"(?P<post>[^=]|\Z)"), re.UNICODE)
+    matchSubScriptPat = re.compile(r"<sub>" + trimmed_text(r"</sub>"), re.UNICODE)
+    matchSuperScriptPat = re.compile(r"<sup>" + trimmed_text(r"</sup>"), re.UNICODE)
+    matchStrikeOutPat = re.compile(r"<del>" + trimmed_text(r"</del>"), re.UNICODE)
+    # [[http(s)://url | http(s)://url2]] and [[http(s)://url | text]], where the url and text may not contain [ or ]
+    matchURLPat = re.compile(url_prefix() + r"[\[][\[]\s*http(?P<url>s*://" +
+                             blank_separated("url", r"[^|\[\]\s]", r"\s+", False) + r")" +
+                             atomic_group(r"\s*", "url_trail") + r"[|]\s*http(?P<url2>" +
+                             blank_separated("url2", r"[^\[\]\s]", r"\s+", False) + r")" +
+                             atomic_group(r"\s*", "url2_trail") + r"[\]][\]][).,]*", re.UNICODE)
+    matchURLandTextPat = re.compile(url_prefix() + r"[\[][\[]\s*http(?P<url>s*://" +
+                                    blank_separated("url", r"[^|\[\]\s]", r"\s+", False) + r")" +
+                                    atomic_group(r"\s*", "url_trail") + r"[|]" + atomic_group(r"\s*", "lead") +
+                                    r"(?P<text>" + blank_separated("text", r"[^\[\]\s]", r"\s+", False) + r")" +
+                                    atomic_group(r"\s*", "trail") + r"[\]][\]][).,]*", re.UNICODE)
     matchPipePat = re.compile(r"(\|)", re.UNICODE)
     # DocuWiki markup patterns applied only to front and back matter
     matchBulletPat = re.compile(r"^\s*[*]\s+(.*)$", re.UNICODE)
@@ -99,23 +230,31 @@ class OBSTexExport(object):
     # matchAlphaNum = re.compile(r"[A-Za-z0-9]", re.UNICODE)
     matchSignificantTex = re.compile(r"[A-Za-z0-9\\{}\[\]]", re.UNICODE)
     matchBlankLinePat = re.compile(r"^\s*$", re.UNICODE)
-    matchPatLongURL = re.compile(r"[(]*http(s*://[/\w\d,.?&_=+-]{41,9999})[).,]*", re.UNICODE)
-    matchPatURL = re.compile(r"[(]*http(s*://[/\w\d,.?&_=+-]+)[).,]*", re.UNICODE)
-    matchOrdinalBookSpaces = re.compile(r"([123](|\.|\p{L}]{1,3}))\s", re.UNICODE)
+    matchPatLongURL = re.compile(url_prefix(False) + r"http(?P<url>s*://[/\w\d,.?&_=+-]{41,9999})[).,]*", re.UNICODE)
+    matchPatURL = re.compile(url_prefix(False) + r"http(?P<url>s*://[/\w\d,.?&_=+-]+)[).,]*", re.UNICODE)
+    matchOrdinalBookSpaces = re.compile(r"([123](|\.|[^\W\d_]{1,3}))\s", re.UNICODE)
     matchChapterVersePat = re.compile(r"\s+(\d+:\d+)", re.UNICODE)
 
-    def __init__(self, lang, out_path, max_chapters, img_res, checking_level):
+    def __init__(self, lang, out_path, max_chapters, img_res, checking_level, cache=None, store=None, temp_dir=None,
+                 json_dir=None):
         self.lang = lang
         self.out_path = out_path
         self.max_chapters = max_chapters
         self.img_res = img_res
         self.checking_level = checking_level
+        self.cache = cache  # type: OBSExportCache
+        self.store = store  # type: OBSFrameStore
+
+        # if given, the body JSON and its chapter index are kept here between runs, for --max-chapters
+        self.json_dir = json_dir
 
         self.body_json = None  # type: dict
         self.num_items = 0
+        self.overflow_frames = []
+        self.lint_errors = []
 
-        # remember these so we can delete them
-        self.temp_dir = '/tmp/obs-{0}'.format(lang)
+        # unique to this export, so parallel exports of the same language do not share it, and deleted in __exit__
+        self.temp_dir = temp_dir or tempfile.mkdtemp(prefix='obs-{0}-'.format(lang))
 
     def __enter__(self):
         return self
@@ -203,11 +342,10 @@ class OBSTexExport(object):
 
     def tex_load_snippet_file(self, xtr, entry_name):
 
-        if not os.path.isdir(OBSTexExport.snippets_dir):
+        if not OBSTexExport.snippets_dir or not os.path.isdir(OBSTexExport.snippets_dir):
             raise IOError('Path not found" {0}'.format(OBSTexExport.snippets_dir))
 
-        with codecs.open(os.path.join(OBSTexExport.snippets_dir, entry_name), 'r', encoding='utf-8-sig') as in_file:
-            each = in_file.readlines()
+        each = self.read_text_file(os.path.join(OBSTexExport.snippets_dir, entry_name)).splitlines(True)
 
         each = each[1:]  # Skip the first line which is the utf-8 coding repeated
         return_val = ''.join(each)
@@ -222,6 +360,13 @@ class OBSTexExport(object):
         return_val = xtr + ('\n' + xtr).join(each) + '\n'
         return return_val
 
+    def read_text_file(self, file_name):
+        if self.cache:
+            return self.cache.read_file(file_name)
+
+        with codecs.open(file_name, 'r', encoding='utf-8-sig') as in_file:
+            return in_file.read()
+
     def get_title(self, text):
 
         if 'direction' in self.body_json and self.body_json['direction'] == 'rtl':
@@ -271,27 +416,33 @@ class OBSTexExport(object):
     @staticmethod
     def filter_apply_docuwiki_start(single_line):
         # Order is important here
-        single_line = OBSTexExport.matchHeadingFourLevelPat.sub(r'\1{\\bfd \2}\3', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchHeadingThreeLevelPat.sub(r'\1{\\bfc \2}\3', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchHeadingTwoLevelPat.sub(r'\1{\\bfb \2}\3', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchHeadingOneLevelPat.sub(r'\1{\\bfa \2}\3', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchHeadingFourLevelPat.sub(r'\g<pre>{\\bfd \g<text>}\g<post>', single_line,
+                                                                OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchHeadingThreeLevelPat.sub(r'\g<pre>{\\bfc \g<text>}\g<post>', single_line,
+                                                                 OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchHeadingTwoLevelPat.sub(r'\g<pre>{\\bfb \g<text>}\g<post>', single_line,
+                                                               OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchHeadingOneLevelPat.sub(r'\g<pre>{\\bfa \g<text>}\g<post>', single_line,
+                                                               OBSTexExport.MATCH_ALL)
 
         # Just boldface for stories
-        single_line = OBSTexExport.matchSectionPat.sub(r'{\\bf \1}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchSectionPat.sub(r'{\\bf \g<text>}', single_line, OBSTexExport.MATCH_ALL)
 
-        single_line = OBSTexExport.matchBoldPat.sub(r'{\\bf \1}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchBoldPat.sub(r'{\\bf \g<text>}', single_line, OBSTexExport.MATCH_ALL)
 
         # The \/ is an end-of-italic correction to add extra whitespace
-        single_line = OBSTexExport.matchItalicPat.sub(r'{\\em \1\/}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchUnderLinePat.sub(r'\\underbar{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchMonoPat.sub(r'{\\tt \1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchRedPat.sub(r'\\color[middlered]{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchMagentaPat.sub(r'\\color[magenta]{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchBluePat.sub(r'\\color[blue]{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchGreenPat.sub(r'\\color[middlegreen]{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchSubScriptPat.sub(r'\\low{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchSuperScriptPat.sub(r'\\high{\1}', single_line, OBSTexExport.MATCH_ALL)
-        single_line = OBSTexExport.matchStrikeOutPat.sub(r'\\overstrike{\1}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchItalicPat.sub(r'{\\em \g<text>\/}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchUnderLinePat.sub(r'\\underbar{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchMonoPat.sub(r'{\\tt \g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchRedPat.sub(r'\\color[middlered]{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchMagentaPat.sub(r'\\color[magenta]{\g<text>}', single_line,
+                                                       OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchBluePat.sub(r'\\color[blue]{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchGreenPat.sub(r'\\color[middlegreen]{\g<text>}', single_line,
+                                                     OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchSubScriptPat.sub(r'\\low{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchSuperScriptPat.sub(r'\\high{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
+        single_line = OBSTexExport.matchStrikeOutPat.sub(r'\\overstrike{\g<text>}', single_line, OBSTexExport.MATCH_ALL)
         return single_line
 
     @staticmethod
@@ -383,6 +534,15 @@ class OBSTexExport(object):
     def end_of_physical_page(xtr):
         return '\n'.join([xtr + '}', xtr + '%%END-OF-PHYSICAL-PAGE'])
 
+    def filter_text(self, text):
+        """
+        Escapes the frame text and applies the DokuWiki filter, once for each distinct text if there is a frame store
+        """
+        if self.store:
+            return self.store.tex_filter(text)
+
+        return OBSTexExport.filter_apply_docuwiki(OBSTexLinter.escape(text))
+
     def export(self, chapters_json, max_chapters, img_res, lang):
         """
         Exports JSON to specified format.
@@ -407,17 +567,20 @@ class OBSTexExport(object):
         adjust_two = Template(adjust_two_snip)
         place_ref_template = Template(place_ref_snip)
 
+        # pages that clearly fit do not need the ConTeXt adjust loop
+        estimator = LayoutEstimator.from_body_json(self.body_json or {})
+
         ix_chp = (-1)
         for chp in chapters_json:
             ix_chp += 1
             past_max_chapters = (max_chapters > 0) and (ix_chp >= max_chapters)
             if past_max_chapters:
                 break
-            output.append(self.get_title(chp['title']))
+            output.append(self.get_title(OBSTexLinter.escape(chp['title'])))
             ix_frame = (-1)
             chapter_frames = chp['frames']
             n_frame = len(chapter_frames)
-            ref_text_only = OBSTexExport.do_not_break_before_chapter_verse(chp['ref'])
+            ref_text_only = OBSTexExport.do_not_break_before_chapter_verse(OBSTexLinter.escape(chp['ref']))
             for fr in chapter_frames:
                 ix_frame += 1
                 ix_look_ahead = 1 + ix_frame
@@ -426,9 +589,7 @@ class OBSTexExport(object):
                     (is_even and ((ix_frame + 2) >= n_frame)) \
                     or ((not is_even) and ((ix_frame + 1) >= n_frame))
                 page_is_full = (not is_even) or (ix_look_ahead < n_frame)
-                text_only = fr['text']
-
-                text_only = OBSTexExport.filter_apply_docuwiki(text_only)
+                text_only = self.filter_text(fr['text'])
                 ref_text_only = OBSTexExport.filter_apply_docuwiki(ref_text_only)
                 text_frame = OBSTexExport.get_frame(spaces4, 'toptry' if is_even else 'bottry')
                 image_frame = OBSTexExport.get_image(spaces4, fr['id'], img_res)
@@ -441,14 +602,17 @@ class OBSTexExport(object):
                     output.append(spaces4 + spaces4 + '\\vskip \\the\\leftover')
                 elif page_is_full:
                     next_fr = chapter_frames[ix_look_ahead]
-                    next_text_only = next_fr['text']
-                    next_text_only = OBSTexExport.filter_apply_docuwiki(next_text_only)
+                    page_fits = estimator.page_fits(fr['text'], next_fr['text'], chp['ref'] if is_last_page else None)
+                    next_text_only = self.filter_text(next_fr['text'])
                     next_image_frame = OBSTexExport.get_image(spaces4, next_fr['id'], img_res)
                     tex_dict = dict(pageword=page_word, needalso=need_also, alsoreg=also_reg,
                                     topimg=image_frame, botimg=next_image_frame,
                                     lang=lang, fid=fr['id'], isLastPage=truth_is_last_page,
                                     toptxt=text_only, bottxt=next_text_only, reftxt=ref_text_only)
-                    output.append(adjust_two.safe_substitute(tex_dict))
+                    if page_fits:
+                        output.append(adjust_one.safe_substitute(tex_dict))
+                    else:
+                        output.append(adjust_two.safe_substitute(tex_dict))
                 else:
                     tex_dict = dict(pageword=page_word, needalso=need_also, alsoreg=also_reg,
                                     topimg=image_frame, botimg='',
@@ -472,19 +636,61 @@ class OBSTexExport(object):
         any_json_e = entry.format(lang)
         any_json_f = '/'.join([OBSTexExport.api_url_txt, lang, any_json_e])
         any_tmp_f = os.path.join(self.temp_dir, tmp_ent.format(lang))
-        write_file(any_tmp_f, get_url(any_json_f))
+        write_file(any_tmp_f, self.cache.get_url(any_json_f) if self.cache else get_url(any_json_f))
         if not os.path.exists(any_tmp_f):
             print("Failed to get JSON {0} file into {1}.".format(any_json_e, any_tmp_f))
             sys.exit(1)
         return any_tmp_f
 
-    def run(self):
+    def keep_json(self, tmp_file):
+        """
+        Copies the fetched body JSON to json_dir, unless it has not changed, so the chapter index of LazyOBS stays valid
+        :param str|unicode tmp_file:
+        :return: str|unicode The name of the kept file
+        """
+        kept_file = os.path.join(self.json_dir, 'obs-{0}.json'.format(self.lang))
+        with open(tmp_file, 'rb') as in_file:
+            content = in_file.read()
+
+        if os.path.isfile(kept_file):
+            with open(kept_file, 'rb') as in_file:
+                if in_file.read() == content:
+                    return kept_file
+
+        OBSPublisher.write_atomic(kept_file, content)
+        return kept_file
+
+    def fetch(self):
+        """
+        Downloads the front matter, back matter and body JSON of the language into the temp directory
+        :return: list The temp file names
+        """
+        return [self.get_json(self.lang, entry, tmp_ent) for entry, tmp_ent in OBSTexExport.json_files]
 
+    def copy_json(self, source_dir):
+        """
+        Copies the front matter, back matter and body JSON of the language from a local directory into the temp
+        directory, instead of fetch(). The files have the same names as on the API, like obs-en.json.
+        :param str|unicode source_dir:
+        :return: list The temp file names
+        """
+        temp_files = self.get_temp_files()
+        for (entry, _), temp_file in zip(OBSTexExport.json_files, temp_files):
+            shutil.copyfile(os.path.join(source_dir, entry.format(self.lang)), temp_file)
+
+        return temp_files
+
+    def get_temp_files(self):
+        return [os.path.join(self.temp_dir, tmp_ent.format(self.lang)) for _, tmp_ent in OBSTexExport.json_files]
+
+    def render(self):
+        """
+        Builds the TeX from the JSON files saved by fetch(), without any network access
+        :return: str|unicode
+        """
         relative_path_re = re.compile(r'([{ ])obs/tex/', re.UNICODE)
 
-        sys.stdout = codecs.getwriter('utf8')(sys.stdout)
-        top_tmp_f = self.get_json(self.lang, 'obs-{0}-front-matter.json', '{0}-front-matter-json.tmp')
-        bot_tmp_f = self.get_json(self.lang, 'obs-{0}-back-matter.json', '{0}-back-matter-json.tmp')
+        top_tmp_f, bot_tmp_f, tmpf = self.get_temp_files()
         lang_top_json = load_json_object(top_tmp_f, {})
         lang_bot_json = load_json_object(bot_tmp_f, {})
         # Parse the front and back matter
@@ -502,14 +708,28 @@ class OBSTexExport(object):
             output_front_license = ''
         output_back = self.export_matter(lang_bot_json['back-matter'], 0)
         # Parse the body matter
-        jsonf = 'obs-{0}.json'.format(self.lang)
-
-        tmpf = self.get_json(self.lang, jsonf, '{0}-body-matter-json.tmp')
-        self.body_json = load_json_object(tmpf, {})
+        if self.max_chapters > 0 and self.json_dir:
+            # decode only the exported chapters, using a chapter index that is kept between runs
+            self.body_json = LazyOBS(self.keep_json(tmpf)).__dict__
+        else:
+            # building a chapter index is slower than decoding the whole file once
+            self.body_json = load_json_object(tmpf, {})
         self.check_for_standard_keys_json()
         # Hacks to make up for missing localized strings
         if 'toctitle' not in self.body_json.keys():
             self.body_json['toctitle'] = OBSTexExport.extract_title_from_frontmatter(lang_top_json['front-matter'])
+
+        # TeX specials are escaped during the export, but broken markup has to be fixed in the source
+        self.lint_errors = OBSTexLinter.get_errors(self.body_json['chapters'], self.max_chapters, self.store)
+        if self.lint_errors:
+            print('The {0} text has {1} markup errors and will not be typeset.'.format(self.lang,
+                                                                                       len(self.lint_errors)))
+            sys.exit(1)
+
+        # flag frames that will not fit before typesetting starts
+        estimator = LayoutEstimator.from_body_json(self.body_json)
+        self.overflow_frames = estimator.find_overflows(self.body_json['chapters'], self.max_chapters)
+
         output = self.export(self.body_json['chapters'], self.max_chapters, self.img_res, self.body_json['language'])
         # For ConTeXt files only, Read the "main_template.tex" file replacing
         # all <<<[anyvar]>>> with its definition from the body-matter JSON file
@@ -519,8 +739,7 @@ class OBSTexExport(object):
             print("Failed to get TeX template.")
             sys.exit(1)
 
-        with codecs.open(tex_template, 'r', encoding='utf-8-sig') as in_file:
-            template = in_file.read()
+        template = self.read_text_file(tex_template)
 
         # replace relative path to fonts with absolute
         template = relative_path_re.sub(r'\1{0}/'.format(OBSTexExport.snippets_dir), template)
@@ -542,8 +761,12 @@ class OBSTexExport(object):
                         = OBSTexExport.matchMiscPat.subn(self.another_replace, single_line,
                                                          OBSTexExport.MATCH_ALL)
                 outlist.append(single_line)
-        full_output = '\n'.join(outlist)
-        write_file(self.out_path, full_output)
+        return '\n'.join(outlist)
+
+    def run(self):
+        self.fetch()
+        # exports running at the same time may write into the same new directory, or even the same file
+        OBSPublisher.write_atomic(self.out_path, self.render().encode('utf-8'))
 
 
 if __name__ == '__main__':
@@ -559,7 +782,13 @@ if __name__ == '__main__':
                         help="Image resolution: 360px, or 2160px")
     parser.add_argument('-c', '--checking-level', dest="checking_level", default="1",
                         help="Quality Assurance level completed: 1, 2, or 3")
+    parser.add_argument('-j', '--json-dir', dest="json_dir", default=None,
+                        help="Keep the body JSON and its chapter index here, to speed up --max-chapters")
     args = parser.parse_args(sys.argv[1:])
 
-    with OBSTexExport(args.lang, args.outpath, int(args.max_chapters), args.img_res, args.checking_level) as api:
+    if sys.version_info[0] < 3:
+        sys.stdout = codecs.getwriter('utf8')(sys.stdout)
+
+    with OBSTexExport(args.lang, args.outpath, int(args.max_chapters), args.img_res, args.checking_level,
+                      json_dir=args.json_dir) as api:
         api.run()
@@ -0,0 +1,150 @@
+"""
+A content-addressed store for the frame text, titles and refs of many OBS languages.
+
+Each distinct text is kept once, in a dictionary keyed by the text itself, and the chapters of every loaded OBS are
+changed to refer to the shared copy, so dialect forks, frames left in English and identical refs are held in memory
+once. Results that depend only on the text, like the TeX filter and the markup check, are computed once for each
+distinct text.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import glob
+import sys
+import threading
+from collections import OrderedDict
+from obs.export_to_tex import OBSTexExport
+from obs.lazy_obs import LazyOBS
+from obs.tex_lint import OBSTexLinter
+
+
+class OBSFrameStore(object):
+
+    def __init__(self, max_results=100000):
+        """
+        Class constructor
+        :param int max_results: The memoized results are cleared when there are this many, so a long running process
+                                does not keep the results of every text it has ever seen
+        """
+        self.max_results = max_results
+        self.texts = {}  # type: dict<str, str>  # text -> the shared copy
+        self.counts = {}  # type: dict<str, int>  # text -> number of references
+        self.results = {}  # type: dict<tuple, object>  # (name, text) -> memoized result
+        self.duplicate_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def add(self, text):
+        """
+        Adds one reference to the text
+        :param str|unicode text:
+        :return: str|unicode The shared copy of the text
+        """
+        text = text or ''
+
+        with self.lock:
+            shared = self.texts.setdefault(text, text)
+            self.counts[shared] = self.counts.get(shared, 0) + 1
+            if shared is not text:
+                self.duplicate_bytes += sys.getsizeof(text)
+
+        return shared
+
+    def add_obs(self, obs_obj):
+        """
+        Changes the title, ref and frame text of each chapter to refer to the shared copies
+        :param OBS obs_obj:
+        :return: OBS The same object
+        """
+        for chapter in obs_obj.chapters:
+            values = chapter if isinstance(chapter, dict) else chapter.__dict__
+            values['title'] = self.add(values.get('title'))
+            values['ref'] = self.add(values.get('ref'))
+            for frame in values['frames']:
+                frame['text'] = self.add(frame.get('text'))
+
+        return obs_obj
+
+    def memoize(self, name, function, text):
+        """
+        Returns function(text), computing it only once for each distinct text
+        :param str|unicode name: The name of the function, to keep the results apart
+        :param function:
+        :param str|unicode text:
+        """
+        result_key = (name, text or '')
+
+        with self.lock:
+            if result_key in self.results:
+                self.hits += 1
+                return self.results[result_key]
+            self.misses += 1
+
+        # outside the lock, another thread may compute the same result, which is harmless
+        result = function(result_key[1])
+
+        with self.lock:
+            if len(self.results) >= self.max_results:
+                self.results.clear()
+            self.results[result_key] = result
+
+        return result
+
+    def tex_filter(self, text):
+        """
+        Escapes the text and applies the DokuWiki filter, like OBSTexExport.export does for frame text
+        """
+        return self.memoize('tex', lambda t: OBSTexExport.filter_apply_docuwiki(OBSTexLinter.escape(t)), text)
+
+    def lint(self, text, item_id=''):
+        """
+        Returns the markup errors of the text, like OBSTexLinter.lint
+        :return: list<str>
+        """
+        return [p.format(item_id) for p in self.memoize('lint', lambda t: OBSTexLinter.scan(t)[1], text)]
+
+    def get_overhead(self):
+        """
+        The memory used by the dictionaries of the store itself, which the shared copies have to make up for
+        :return: int Bytes
+        """
+        return sys.getsizeof(self.texts) + sys.getsizeof(self.counts)
+
+    def get_stats(self):
+        with self.lock:
+            references = sum(self.counts.values())
+            unique_bytes = sum(len(text.encode('utf-8')) for text in self.texts)
+            total_bytes = sum(len(text.encode('utf-8')) * count for text, count in self.counts.items())
+            unique_texts = len(self.texts)
+            overhead = self.get_overhead()
+            duplicate_bytes = self.duplicate_bytes
+            hits, misses, results = self.hits, self.misses, len(self.results)
+
+        return OrderedDict([
+            ('unique_texts', unique_texts),
+            ('references', references),
+            ('dedup_ratio', float(references) / unique_texts if unique_texts else 0.0),
+            ('unique_bytes', unique_bytes),
+            ('total_bytes', total_bytes),
+            ('bytes_saved', total_bytes - unique_bytes),
+            ('duplicate_memory', duplicate_bytes),
+            ('overhead', overhead),
+            ('memory_saved', duplicate_bytes - overhead),
+            ('memo_results', results),
+            ('memo_hits', hits),
+            ('memo_misses', misses)
+        ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', help='The JSON files to load, like "obs-*.json"')
+    args = parser.parse_args(sys.argv[1:])
+
+    store = OBSFrameStore()
+    for file_name in sorted(glob.glob(args.files)):
+        store.add_obs(LazyOBS(file_name))
+
+    for stat_name, value in store.get_stats().items():
+        print('{0}: {1}'.format(stat_name, value))
@@ -0,0 +1,241 @@
+"""
+Checks that the CDN images referenced by OBS frames actually exist.
+
+The image URLs are collected from any number of OBS objects and resolutions and checked once each, using HEAD requests
+sent over a pool of keep-alive connections at a limited rate. Results are cached for <ttl> seconds, and can be shared
+with other processes and later runs through the "images" namespace of an OBSCacheManager.
+
+Requires Python 3.5 or newer.
+"""
+from __future__ import print_function, unicode_literals
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit
+
+
+class ConnectionPool(object):
+
+    def __init__(self, max_per_host=4, timeout=10):
+        """
+        Keeps idle keep-alive connections so each HEAD request does not open a new one.
+        :param int max_per_host: The number of idle connections to keep for each host
+        :param int timeout: Seconds
+        """
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.idle = {}  # type: dict<tuple, list>
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        with self.lock:
+            connections = self.idle.get((scheme, netloc))
+            if connections:
+                return connections.pop()
+
+        if scheme == 'https':
+            return HTTPSConnection(netloc, timeout=self.timeout)
+
+        return HTTPConnection(netloc, timeout=self.timeout)
+
+    def release(self, scheme, netloc, connection):
+        with self.lock:
+            connections = self.idle.setdefault((scheme, netloc), [])
+            if len(connections) < self.max_per_host:
+                connections.append(connection)
+                return
+
+        connection.close()
+
+    def head(self, url):
+        """
+        Sends a HEAD request and returns the HTTP status, or 0 if the server could not be reached
+        :param str url:
+        :return: int
+        """
+        parts = urlsplit(url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+
+        # a pooled connection may have been closed by the server, so try once more with a new one
+        for attempt in range(2):
+            connection = self.acquire(parts.scheme, parts.netloc)
+            try:
+                connection.request('HEAD', path)
+                response = connection.getresponse()
+                response.read()
+            except (HTTPException, OSError):
+                connection.close()
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(parts.scheme, parts.netloc, connection)
+
+            return response.status
+
+        return 0
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle = {}
+
+
+class RateLimiter(object):
+
+    def __init__(self, rate):
+        """
+        Spaces requests so no more than <rate> are started each second.
+        :param float rate: Requests per second, 0 for no limit
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+
+        now = time.time()
+        delay = max(0.0, self.next_time - now)
+        self.next_time = max(now, self.next_time) + self.interval
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class ImageChecker(object):
+
+    resolutions = ('360px', '2160px')
+    resolution_re = re.compile(r'/\d+px/', re.UNICODE)
+
+    def __init__(self, max_concurrent=8, rate=20.0, ttl=3600, timeout=10, disk_cache=None):
+        """
+        Class constructor.
+        :param int max_concurrent: The number of requests in flight at the same time
+        :param float rate: The number of requests started each second, 0 for no limit
+        :param int ttl: The number of seconds a result is cached
+        :param int timeout: Seconds
+        :param OBSCacheManager disk_cache: If given, results are also looked up in and saved to this cache
+        """
+        self.max_concurrent = max_concurrent
+        self.ttl = ttl
+        self.rate = rate
+        self.pool = ConnectionPool(max_per_host=max_concurrent, timeout=timeout)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self.cache = {}  # type: dict<str, tuple>
+        self.disk_cache = disk_cache
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+    def get_image_urls(self, obs_list, resolutions=None):
+        """
+        Collects the image URL of each frame, once for each resolution, without duplicates
+        :param list obs_list: OBS objects
+        :param list resolutions: The default is both 360px and 2160px
+        :return: OrderedDict The URL and the list of (language, frame id) using it
+        """
+        resolutions = resolutions or ImageChecker.resolutions
+        urls = OrderedDict()
+
+        for obs_obj in obs_list:
+            for chapter in obs_obj.chapters:
+                for frame in chapter['frames']:
+                    if not frame.get('img'):
+                        continue
+                    for res in resolutions:
+                        url = ImageChecker.resolution_re.sub('/{0}/'.format(res), frame['img'], 1)
+                        urls.setdefault(url, []).append((obs_obj.language, frame['id']))
+
+        return urls
+
+    def get_cached(self, url):
+        if url in self.cache:
+            status, checked_at = self.cache[url]
+            if time.time() - checked_at < self.ttl:
+                return status
+
+        if self.disk_cache:
+            content = self.disk_cache.get('images', url, self.ttl)
+            if content is not None:
+                status, checked_at = content.decode('ascii').split()
+                self.cache[url] = (int(status), float(checked_at))
+                return int(status)
+
+        return None
+
+    def set_cached(self, url, status):
+        checked_at = time.time()
+        self.cache[url] = (status, checked_at)
+        if self.disk_cache:
+            self.disk_cache.put('images', url, '{0} {1}'.format(status, checked_at).encode('ascii'))
+
+    async def check_urls(self, urls):
+        """
+        Checks each URL, using cached results when available
+        :param list urls:
+        :return: dict<str, int> The HTTP status for each URL, 0 if the server could not be reached
+        """
+        loop = asyncio.get_event_loop()
+        limiter = RateLimiter(self.rate)
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        results = {}
+
+        async def check_one(url):
+            async with semaphore:
+                await limiter.wait()
+                status = await loop.run_in_executor(self.executor, self.pool.head, url)
+
+            # do not cache failures that may be temporary
+            if status and status < 500:
+                await loop.run_in_executor(self.executor, self.set_cached, url, status)
+            results[url] = status
+
+        to_check = []
+        for url in urls:
+            status = self.get_cached(url)
+            if status is None:
+                to_check.append(url)
+            else:
+                results[url] = status
+
+        if to_check:
+            await asyncio.gather(*[check_one(url) for url in to_check])
+
+        return results
+
+    def get_errors(self, obs_list, resolutions=None):
+        """
+        Checks the images of all the frames, in the same format as OBS.get_errors
+        :param list obs_list: OBS objects
+        :param list resolutions: The default is both 360px and 2160px
+        :return: list<str>
+        """
+        urls = self.get_image_urls(obs_list, resolutions)
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(self.check_urls(list(urls.keys())))
+        finally:
+            loop.close()
+
+        errors = []
+        for url, frames in urls.items():
+            status = results[url]
+            if 200 <= status < 400:
+                continue
+
+            for lang, frame_id in frames:
+                msg = 'Image not found for frame {0} ({1}): {2} returned {3}'.format(frame_id, lang, url,
+                                                                                     status or 'no response')
+                print(msg)
+                errors.append(msg)
+
+        return errors
@@ -0,0 +1,229 @@
+"""
+Estimates the vertical space needed to typeset OBS frames so the exporter can skip the ConTeXt adjust loop for pages
+that clearly fit, and flag frames that will not fit before typesetting starts.
+"""
+from __future__ import print_function, unicode_literals
+import os
+import re
+import unicodedata
+from general_tools.file_utils import load_json_object
+
+
+class LayoutEstimator(object):
+
+    # points per unit, at 72.27 pt/inch as used by TeX
+    units_re = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*(pt|bp|in|cm|mm)?\s*$', re.UNICODE)
+    unit_sizes = {'pt': 1.0, 'bp': 72.27 / 72.0, 'in': 72.27, 'cm': 72.27 / 2.54, 'mm': 72.27 / 25.4}
+
+    # DocuWiki markup that takes no horizontal space once typeset
+    markup_re = re.compile(r'\*\*|(?<!:)//|__|\'\'|</?(?:red|mag[enta]*|blue|green|sub|sup|del)>', re.UNICODE)
+    word_re = re.compile(r'\S+', re.UNICODE)
+
+    # OBS images are 2160x1200 and placed at the full text width, scaled to 95% height by get_image
+    image_aspect = 1200.0 / 2160.0
+    image_yscale = 0.95
+
+    # a page is considered to clearly fit if the estimate leaves this much of the text height unused
+    safety_margin = 0.10
+
+    # the height of the page body of the OBS template, topspace and botspace are taken off it to get the text height.
+    # With the default 28pt spaces set by OBSTexExport.check_for_standard_keys_json this leaves 650pt for the frames.
+    body_height = '706pt'
+
+    def __init__(self, text_width='308.9pt', body_size='10.0pt', body_baseline='12.0pt', text_height=None,
+                 top_space='28pt', bottom_space='28pt', metrics=None):
+        """
+        Class constructor. The sizes are TeX dimensions, like the values in the body JSON.
+        :param str|unicode text_width:
+        :param str|unicode body_size:
+        :param str|unicode body_baseline:
+        :param str|unicode text_height: The vertical space available for the frames on one page, calculated from
+                                        body_height, top_space and bottom_space if not given
+        :param str|unicode top_space:
+        :param str|unicode bottom_space:
+        :param dict metrics: Font metrics, the packaged Noto Sans metrics are used if not given
+        """
+        self.text_width = LayoutEstimator.to_points(text_width)
+        self.body_size = LayoutEstimator.to_points(body_size)
+        self.body_baseline = LayoutEstimator.to_points(body_baseline)
+        if text_height:
+            self.text_height = LayoutEstimator.to_points(text_height)
+        else:
+            self.text_height = (LayoutEstimator.to_points(LayoutEstimator.body_height) -
+                                LayoutEstimator.to_points(top_space) - LayoutEstimator.to_points(bottom_space))
+
+        if not metrics:
+            metrics = LayoutEstimator.load_metrics()
+
+        units_per_em = float(metrics['units_per_em'])
+        self.advances = dict((c, w / units_per_em) for c, w in metrics['advances'].items())
+        self.default_advance = metrics['default_advance'] / units_per_em
+        self.wide_advance = metrics['wide_advance'] / units_per_em
+        self.space_width = self.advances.get(' ', self.default_advance) * self.body_size
+
+        self.image_height = self.text_width * LayoutEstimator.image_aspect * LayoutEstimator.image_yscale
+
+    @staticmethod
+    def from_body_json(body_json):
+        """
+        Creates an estimator using the keys set by OBSTexExport.check_for_standard_keys_json
+        :param dict body_json:
+        :return: LayoutEstimator
+        """
+        return LayoutEstimator(text_width=body_json.get('textwidth', '308.9pt'),
+                               body_size=body_json.get('bodysize', '10.0pt'),
+                               body_baseline=body_json.get('bodybaseline', '12.0pt'),
+                               text_height=body_json.get('textheight', None),
+                               top_space=body_json.get('topspace', '28pt'),
+                               bottom_space=body_json.get('botspace', '28pt'))
+
+    @staticmethod
+    def load_metrics():
+        file_name = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'noto-sans-metrics.json')
+        return load_json_object(file_name, {})
+
+    @staticmethod
+    def to_points(dimension):
+        """
+        Converts a TeX dimension like '10.0pt' to points
+        :param str|unicode|float dimension:
+        :return: float
+        """
+        if isinstance(dimension, (int, float)):
+            return float(dimension)
+
+        match = LayoutEstimator.units_re.match(dimension)
+        if not match:
+            raise ValueError('Not a valid dimension: {0}'.format(dimension))
+
+        return float(match.group(1)) * LayoutEstimator.unit_sizes[match.group(2) or 'pt']
+
+    def char_width(self, char):
+        """
+        Returns the width of one character in em
+        :param str|unicode char:
+        :return: float
+        """
+        if char in self.advances:
+            return self.advances[char]
+
+        if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+            return 0.0
+
+        if unicodedata.east_asian_width(char) in ('W', 'F'):
+            return self.wide_advance
+
+        return self.default_advance
+
+    def word_width(self, word):
+        """
+        Returns the width of a word in points
+        :param str|unicode word:
+        :return: float
+        """
+        return sum(self.char_width(c) for c in word) * self.body_size
+
+    def count_lines(self, text):
+        """
+        Estimates the number of lines needed to typeset the text using greedy line breaking
+        :param str|unicode text:
+        :return: int
+        """
+        text = LayoutEstimator.markup_re.sub('', text or '')
+        lines = 0
+
+        for paragraph in text.split('\n'):
+            words = LayoutEstimator.word_re.findall(paragraph)
+            if not words:
+                continue
+
+            lines += 1
+            line_width = 0.0
+            for word in words:
+                width = self.word_width(word)
+                needed = width if line_width == 0.0 else line_width + self.space_width + width
+
+                if needed <= self.text_width:
+                    line_width = needed
+                    continue
+
+                # start a new line, and break words that are wider than a line (scripts without spaces)
+                if line_width > 0.0:
+                    lines += 1
+                while width > self.text_width:
+                    lines += 1
+                    width -= self.text_width
+                line_width = width
+
+        return lines
+
+    def frame_height(self, text):
+        """
+        Estimates the vertical space needed for one frame, the image plus the text and a blank line
+        :param str|unicode text:
+        :return: float
+        """
+        return self.image_height + (self.count_lines(text) + 1) * self.body_baseline
+
+    def page_need(self, top_text, bottom_text=None, ref_text=None):
+        """
+        Estimates the vertical space needed for a physical page
+        :param str|unicode top_text:
+        :param str|unicode bottom_text: None if the page has only one frame
+        :param str|unicode ref_text: The chapter reference, if this is the last page of the chapter
+        :return: float
+        """
+        need = self.frame_height(top_text)
+
+        if bottom_text is not None:
+            need += self.frame_height(bottom_text)
+
+        if ref_text:
+            need += (self.count_lines(ref_text) + 1) * self.body_baseline
+
+        return need
+
+    def page_fits(self, top_text, bottom_text=None, ref_text=None):
+        """
+        Returns True if the page clearly fits, so the spacing does not need to be adjusted by ConTeXt
+        :return: bool
+        """
+        available = self.text_height * (1.0 - LayoutEstimator.safety_margin)
+        return self.page_need(top_text, bottom_text, ref_text) <= available
+
+    def page_overflows(self, top_text, bottom_text=None, ref_text=None):
+        """
+        Returns True if the page will not fit even after ConTeXt adjusts the spacing
+        :return: bool
+        """
+        return self.page_need(top_text, bottom_text, ref_text) > self.text_height
+
+    def find_overflows(self, chapters, max_chapters=0):
+        """
+        Checks the pages of each chapter, two frames per page, and returns the ids of frames that will overflow
+        :param list chapters: OBSChapter objects or chapter dictionaries
+        :param int max_chapters: Check only the first n chapters, 0 to check all
+        :return: list<str>
+        """
+        overflows = []
+
+        for ix_chp, chapter in enumerate(chapters):
+            if 0 < max_chapters <= ix_chp:
+                break
+
+            frames = chapter['frames']
+            for ix_frame in range(0, len(frames), 2):
+                page = frames[ix_frame:ix_frame + 2]
+                is_last_page = ix_frame + 2 >= len(frames)
+
+                top_text = page[0]['text']
+                bottom_text = page[1]['text'] if len(page) > 1 else None
+                ref_text = chapter['ref'] if is_last_page else None
+
+                if self.page_overflows(top_text, bottom_text, ref_text):
+                    for frame in page:
+                        msg = 'Frame may overflow the page: {0}'.format(frame['id'])
+                        print(msg)
+                        overflows.append(frame['id'])
+
+        return overflows
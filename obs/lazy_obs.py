@@ -0,0 +1,171 @@
+"""
+Reads an obs-{lang}.json file one chapter at a time.
+
+The first time a file is opened, the byte offsets of the chapters are found without decoding the chapters, and saved
+in a sidecar index file next to the JSON file. Chapters are decoded the first time they are accessed.
+"""
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import re
+from general_tools.file_utils import load_json_object
+from obs.obs_classes import OBS
+from obs.publish import OBSPublisher
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+
+class LazyChapterList(Sequence):
+
+    def __init__(self, file_name, offsets, numbers):
+        """
+        Class constructor.
+        :param str|unicode file_name: The OBS JSON file
+        :param list offsets: The start and end byte offset of each chapter
+        :param list numbers: The number of each chapter
+        """
+        self.file_name = file_name
+        self.offsets = offsets
+        self.numbers = numbers
+        self.chapters = [None] * len(offsets)  # type: list<dict>
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if self.chapters[index] is None:
+            start, end = self.offsets[index]
+            with open(self.file_name, 'rb') as in_file:
+                in_file.seek(start)
+                self.chapters[index] = json.loads(in_file.read(end - start).decode('utf-8'))
+
+        return self.chapters[index]
+
+    @property
+    def decoded_count(self):
+        return len([c for c in self.chapters if c is not None])
+
+    def to_serializable(self):
+        return list(self)
+
+
+class LazyOBS(OBS):
+
+    # a JSON string, or a bracket or brace
+    token_re = re.compile(br'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.DOTALL)
+    number_re = re.compile(br'"number"\s*:\s*"([^"]*)"')
+
+    def __init__(self, file_name, index_file=None):
+        """
+        Class constructor.
+        :param str|unicode file_name: The name of a file to deserialize into a OBS object
+        :param str|unicode index_file: The sidecar index, <file_name>.idx if not given
+        """
+        # note: the base constructor is not called, the attributes all come from the file
+        if not os.path.isfile(file_name):
+            raise IOError('The file {0} was not found.'.format(file_name))
+
+        index_file = index_file or file_name + '.idx'
+        stat = os.stat(file_name)
+
+        # in nanoseconds where available, a float of seconds cannot tell apart two writes in the same microsecond
+        mtime = getattr(stat, 'st_mtime_ns', stat.st_mtime)
+
+        index = load_json_object(index_file)
+        if not index or index.get('size') != stat.st_size or index.get('mtime') != mtime:
+            index = LazyOBS.build_index(file_name)
+            index['size'] = stat.st_size
+            index['mtime'] = mtime
+            try:
+                # atomically, because parallel exports of the same language may open the file at the same time
+                OBSPublisher.write_atomic(index_file, json.dumps(index).encode('utf-8'))
+            except (IOError, OSError):
+                # the index is only an optimization
+                pass
+
+        self.__dict__ = index['header']
+        self.chapters = LazyChapterList(file_name, index['offsets'], index['numbers'])
+
+    @staticmethod
+    def build_index(file_name):
+        """
+        Finds the byte offsets of the chapters, and decodes everything except the chapters
+        :param str|unicode file_name:
+        :return: dict
+        """
+        with open(file_name, 'rb') as in_file:
+            data = in_file.read()
+
+        depth = 0
+        key = None
+        in_chapters = False
+        chapters_span = None
+        chapter_start = 0
+        offsets = []
+
+        for match in LazyOBS.token_re.finditer(data):
+            token = match.group(0)[0:1]
+
+            if token == b'"':
+                # remember the most recent key of the top-level object
+                if depth == 1 and LazyOBS.next_byte(data, match.end()) == b':':
+                    key = json.loads(match.group(0).decode('utf-8'))
+                continue
+
+            if token in (b'[', b'{'):
+                depth += 1
+                if depth == 2 and token == b'[' and key == 'chapters':
+                    in_chapters = True
+                    chapters_span = [match.start(), None]
+                elif depth == 3 and in_chapters:
+                    chapter_start = match.start()
+            else:
+                if depth == 3 and in_chapters:
+                    offsets.append([chapter_start, match.end()])
+                elif depth == 2 and in_chapters:
+                    in_chapters = False
+                    chapters_span[1] = match.end()
+                depth -= 1
+
+        if chapters_span:
+            header_bytes = data[:chapters_span[0]] + b'[]' + data[chapters_span[1]:]
+        else:
+            header_bytes = data
+
+        if header_bytes.startswith(codecs.BOM_UTF8):
+            header_bytes = header_bytes[len(codecs.BOM_UTF8):]
+
+        header = json.loads(header_bytes.decode('utf-8'))
+        header.pop('chapters', None)
+
+        numbers = []
+        for start, end in offsets:
+            match = LazyOBS.number_re.search(data, start, end)
+            numbers.append(match.group(1).decode('utf-8') if match else '')
+
+        return {'header': header, 'offsets': offsets, 'numbers': numbers}
+
+    @staticmethod
+    def next_byte(data, position):
+        while position < len(data) and data[position:position + 1] in (b' ', b'\t', b'\r', b'\n'):
+            position += 1
+        return data[position:position + 1]
+
+    def get_chapter(self, number):
+        """
+        Returns one chapter, decoding only that chapter
+        :param str|unicode|int number: The chapter number, like '01' or 1
+        :return: dict
+        """
+        number = str(number).zfill(2)
+        if number not in self.chapters.numbers:
+            return None
+
+        return self.chapters[self.chapters.numbers.index(number)]
@@ -0,0 +1,200 @@
+"""
+Compares the length of every frame across many languages, to find the languages that are likely to overflow the
+two-frames-per-page layout before spending time on a ConTeXt run.
+
+The character, grapheme and word counts of each frame are loaded into a frames x languages matrix. For each language
+the log of the length ratio to the baseline language (English) is reduced to a z-score per frame, so a frame that is
+unusually long for that language stands out even if the language is normally longer than English. Frames longer than
+the longest baseline frame are counted as layout risks.
+
+NumPy is used when it is installed, otherwise the same statistics are computed in pure Python.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import glob
+import math
+import sys
+import unicodedata
+import warnings
+from collections import OrderedDict
+from obs import chapters_and_frames
+from obs.layout_estimator import LayoutEstimator
+from obs.lazy_obs import LazyOBS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class OBSLengthAnalytics(object):
+
+    metrics = ('chars', 'graphemes', 'words')
+
+    def __init__(self, obs_list, baseline='en', metric='graphemes', z_limit=2.5, max_length=None):
+        """
+        Class constructor. Counts and analyzes the frames immediately.
+        :param list obs_list: OBS objects, one for each language
+        :param str|unicode baseline: The language the others are compared to
+        :param str|unicode metric: One of 'chars', 'graphemes' or 'words'
+        :param float z_limit: Frames with a higher z-score are reported as outliers
+        :param int max_length: Frames longer than this are layout risks, defaults to the longest baseline frame
+        """
+        if metric not in OBSLengthAnalytics.metrics:
+            raise ValueError('Unknown metric: {0}'.format(metric))
+
+        self.languages = [o.language for o in obs_list]
+        if baseline not in self.languages:
+            raise ValueError('The baseline language {0} was not loaded.'.format(baseline))
+
+        self.baseline = baseline
+        self.metric = metric
+        self.z_limit = z_limit
+
+        # metric -> frames x languages, None where a frame is missing
+        self.counts = OrderedDict((m, [[None] * len(obs_list) for _ in chapters_and_frames.frame_ids])
+                                  for m in OBSLengthAnalytics.metrics)
+
+        for column, obs_obj in enumerate(obs_list):
+            self.add_language(column, obs_obj)
+
+        base_column = self.languages.index(baseline)
+        if max_length is None:
+            max_length = max([row[base_column] for row in self.counts[metric] if row[base_column] is not None] or [0])
+        self.max_length = max_length
+
+        # language -> one z-score or None per frame, and language -> geometric mean ratio to the baseline
+        if numpy is not None:
+            self.z_scores, self.expansion = self.analyze_numpy(self.counts[metric], base_column)
+        else:
+            self.z_scores, self.expansion = self.analyze_python(self.counts[metric], base_column)
+
+    @staticmethod
+    def get_counts(text):
+        """
+        Counts the characters, graphemes and words of a frame, ignoring markup
+        :param str|unicode text:
+        :return: tuple (chars, graphemes, words)
+        """
+        text = LayoutEstimator.markup_re.sub('', text or '').strip()
+
+        # combining marks and joiners do not start a new grapheme
+        graphemes = sum(1 for c in text if unicodedata.category(c)[0] != 'M' and c not in '\u200c\u200d')
+
+        return len(text), graphemes, len(text.split())
+
+    def add_language(self, column, obs_obj):
+        for chapter in obs_obj.chapters:
+            for frame in chapter['frames']:
+                row = chapters_and_frames.get_frame_index(frame['id'])
+                if row < 0 or not frame.get('text'):
+                    continue
+
+                for metric, count in zip(OBSLengthAnalytics.metrics, OBSLengthAnalytics.get_counts(frame['text'])):
+                    self.counts[metric][row][column] = count
+
+    def analyze_numpy(self, counts, base_column):
+        matrix = numpy.array(counts, dtype=float)
+
+        with warnings.catch_warnings(), numpy.errstate(divide='ignore', invalid='ignore'):
+            # all-missing columns are expected for incomplete languages
+            warnings.simplefilter('ignore', RuntimeWarning)
+
+            logs = numpy.log(matrix / matrix[:, [base_column]])
+            logs[~numpy.isfinite(logs)] = numpy.nan
+
+            means = numpy.nanmean(logs, axis=0)
+            deviations = numpy.nanstd(logs, axis=0)
+            z_matrix = (logs - means) / numpy.where(deviations > 0, deviations, numpy.nan)
+
+        z_scores = OrderedDict()
+        expansion = OrderedDict()
+        for column, lang in enumerate(self.languages):
+            z_scores[lang] = [None if math.isnan(z) else z for z in z_matrix[:, column].tolist()]
+            expansion[lang] = None if math.isnan(means[column]) else math.exp(means[column])
+
+        return z_scores, expansion
+
+    def analyze_python(self, counts, base_column):
+        z_scores = OrderedDict()
+        expansion = OrderedDict()
+
+        for column, lang in enumerate(self.languages):
+            logs = []
+            for row in counts:
+                value, base = row[column], row[base_column]
+                logs.append(math.log(float(value) / base) if value and base else None)
+
+            values = [x for x in logs if x is not None]
+            if not values:
+                z_scores[lang] = [None] * len(logs)
+                expansion[lang] = None
+                continue
+
+            mean = sum(values) / len(values)
+            deviation = math.sqrt(sum((x - mean) ** 2 for x in values) / len(values))
+            z_scores[lang] = [(x - mean) / deviation if x is not None and deviation > 0 else None for x in logs]
+            expansion[lang] = math.exp(mean)
+
+        return z_scores, expansion
+
+    def get_z_scores(self, lang):
+        """
+        :param str|unicode lang:
+        :return: OrderedDict Frame id -> z-score, for the frames that have one
+        """
+        return OrderedDict((frame_id, z) for frame_id, z in zip(chapters_and_frames.frame_ids, self.z_scores[lang])
+                           if z is not None)
+
+    def get_summary(self, lang):
+        """
+        Summarizes the layout risk of one language
+        :param str|unicode lang:
+        :return: OrderedDict
+        """
+        column = self.languages.index(lang)
+        counts = [row[column] for row in self.counts[self.metric]]
+        z_scores = self.z_scores[lang]
+
+        outliers = [frame_id for frame_id, z in zip(chapters_and_frames.frame_ids, z_scores)
+                    if z is not None and z > self.z_limit]
+        long_frames = [frame_id for frame_id, count in zip(chapters_and_frames.frame_ids, counts)
+                       if count is not None and count > self.max_length]
+        known = [z for z in z_scores if z is not None]
+
+        return OrderedDict([
+            ('language', lang),
+            ('frames', sum(1 for c in counts if c is not None)),
+            ('expansion', self.expansion[lang]),
+            ('max_z', max(known) if known else None),
+            ('outliers', outliers),
+            ('long_frames', long_frames),
+            ('needs_review', bool(long_frames))
+        ])
+
+    def get_summaries(self):
+        """
+        :return: list<OrderedDict> One summary for each language, the riskiest first
+        """
+        summaries = [self.get_summary(lang) for lang in self.languages]
+        summaries.sort(key=lambda s: (-len(s['long_frames']), -len(s['outliers']), s['language']))
+        return summaries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', help='The JSON files to compare, like "obs-*.json"')
+    parser.add_argument('-b', '--baseline', dest='baseline', default='en', help='The baseline language')
+    parser.add_argument('-m', '--metric', dest='metric', default='graphemes', choices=OBSLengthAnalytics.metrics)
+    parser.add_argument('-z', '--z-limit', dest='z_limit', default='2.5', help='Report frames above this z-score')
+    args = parser.parse_args(sys.argv[1:])
+
+    analytics = OBSLengthAnalytics([LazyOBS(f) for f in sorted(glob.glob(args.files))], args.baseline, args.metric,
+                                   float(args.z_limit))
+
+    for summary in analytics.get_summaries():
+        expansion = '{0:.2f}'.format(summary['expansion']) if summary['expansion'] else '-'
+        print('{0}: {1} frames, expansion {2}, {3} outliers, {4} long frames{5}'.format(
+            summary['language'], summary['frames'], expansion, len(summary['outliers']), len(summary['long_frames']),
+            ', needs review' if summary['needs_review'] else ''))
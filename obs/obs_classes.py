@@ -1,5 +1,6 @@
 from __future__ import print_function, unicode_literals
 import codecs
+import copy
 import re
 from collections import OrderedDict
 from datetime import datetime
@@ -47,8 +48,13 @@ class OBSStatus(object):
         status.comments = resource_status['comments']
         status.contributors = ', '.join(resource_status['contributors'])
         status.publish_date = resource_status['pub_date']
-        status.source_text = resource_status['source_translations'][0]['language_slug']
-        status.source_text_version = resource_status['source_translations'][0]['version']
+        # a new manifest has no source translations yet, which is not the same as translated from English
+        if resource_status['source_translations']:
+            status.source_text = resource_status['source_translations'][0]['language_slug']
+            status.source_text_version = resource_status['source_translations'][0]['version']
+        else:
+            status.source_text = ''
+            status.source_text_version = ''
         status.version = resource_status['version']
 
         return status
@@ -95,16 +101,13 @@ class OBSChapter(object):
 
         chapter_index = int(self.number) - 1
 
-        # get the expected number of frames for this chapter
-        expected_frame_count = chapters_and_frames.frame_counts[chapter_index]
-
-        for x in range(1, expected_frame_count + 1):
+        # look up each frame by id once, instead of scanning the list for every expected frame
+        frames_by_id = dict((f['id'], f) for f in self.frames)
 
-            # frame id is formatted like '01-01'
-            frame_id = '{0}-{1}'.format(self.number.zfill(2), str(x).zfill(2))
+        # frame ids are formatted like '01-01'
+        for frame_id in chapters_and_frames.chapter_frame_ids[chapter_index]:
 
-            # get the next frame
-            frame = next((f for f in self.frames if f['id'] == frame_id), None)  # type: dict
+            frame = frames_by_id.get(frame_id)  # type: dict
             if not frame:
                 msg = 'Frame not found: {0}'.format(frame_id)
                 print(msg)
@@ -177,6 +180,38 @@ class OBSChapter(object):
 
         return return_val
 
+    @staticmethod
+    def from_ts_directory(chapter_dir, chapter_number):
+        """
+        Loads a chapter from a tS repository, where each frame is a file named like '01.txt'
+        :param str|unicode chapter_dir:
+        :param int chapter_number:
+        :return: OBSChapter
+        """
+        return_val = OBSChapter()
+        return_val.number = str(chapter_number).zfill(2)
+
+        for file_name in sorted(os.listdir(chapter_dir)):
+            base_name, ext = os.path.splitext(file_name)
+            if ext != '.txt':
+                continue
+
+            with codecs.open(os.path.join(chapter_dir, file_name), 'r', encoding='utf-8-sig') as in_file:
+                content = in_file.read().strip()
+
+            if base_name == 'title':
+                return_val.title = content
+            elif base_name == 'reference':
+                return_val.ref = content
+            elif base_name.isdigit():
+                frame_id = '{0}-{1}'.format(return_val.number, base_name.zfill(2))
+                return_val.frames.append({'id': frame_id,
+                                          'img': OBSChapter.img_url.format(frame_id),
+                                          'text': content
+                                          })
+
+        return return_val
+
 
 class OBS(object):
     def __init__(self, file_name=None):
@@ -207,8 +242,12 @@ class OBS(object):
             self.direction = 'ltr'
             self.language = ''
 
-    def verify_all(self):
-
+    def get_errors(self, image_checker=None):
+        """
+        Checks all the chapters for errors
+        :param ImageChecker image_checker: If given, also checks that the frame images exist
+        :returns list<str>
+        """
         errors = []
 
         for chapter in self.chapters:
@@ -218,16 +257,36 @@ class OBS(object):
                 obs_chapter = OBSChapter(chapter)
             errors = errors + obs_chapter.get_errors()
 
+        if image_checker:
+            errors = errors + image_checker.get_errors([self])
+
+        return errors
+
+    def verify_all(self, image_checker=None):
+
+        errors = self.get_errors(image_checker)
+
         if len(errors) == 0:
             print('No errors were found in the OBS data.')
             return True
         else:
             return False
 
+    # file name -> the parsed template, shared by every language
+    static_json = {}
+
     @staticmethod
     def load_static_json_file(file_name):
-        file_name = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', file_name)
-        return load_json_object(file_name, {})
+        """
+        Loads a packaged JSON template once, and returns a copy the caller can change
+        :param str|unicode file_name:
+        :return: dict
+        """
+        if file_name not in OBS.static_json:
+            file_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', file_name)
+            OBS.static_json[file_name] = load_json_object(file_path, {})
+
+        return copy.deepcopy(OBS.static_json[file_name])
 
     @staticmethod
     def get_readme_text():
@@ -372,6 +431,8 @@ class OBSManifest(object):
 
 class OBSEncoder(JSONEncoder):
     def default(self, o):
+        if hasattr(o, 'to_serializable'):
+            return o.to_serializable()
         return o.__dict__
 
 
@@ -0,0 +1,151 @@
+"""
+Reads the OBS pages of every language under a Door43 pages directory, like <pages_dir>/<lang>/obs/, in parallel.
+
+The front matter, back matter and chapter pages (01.md or 01.txt) of each language are read in a bounded thread pool,
+and the results are yielded as each language finishes, so a full catalog can be processed while it is still being
+read.
+
+Requires Python 3.5 or newer, or the futures and scandir back ports.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import codecs
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from obs import chapters_and_frames
+from obs.obs_classes import OBS, OBSChapter
+
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+
+
+class OBSPagesLanguage(object):
+
+    def __init__(self, lang_code):
+        """
+        The pages of one language
+        :param str|unicode lang_code:
+        """
+        self.language = lang_code
+        self.obs = None  # type: OBS
+        self.front_matter = None  # type: dict
+        self.back_matter = None  # type: dict
+        self.errors = []  # type: list<str>
+
+
+class OBSPagesIngester(object):
+
+    chapter_file_re = re.compile(r'^(\d{2})\.(md|txt)$')
+
+    def __init__(self, pages_dir, max_workers=8, today_str=None):
+        """
+        Class constructor
+        :param str|unicode pages_dir: The directory containing one directory for each language
+        :param int max_workers: The number of languages read at the same time
+        :param str|unicode today_str: The modified date for the front and back matter, defaults to today
+        """
+        self.pages_dir = pages_dir
+        self.max_workers = max_workers
+        self.today_str = today_str or datetime.today().strftime('%Y%m%d')
+
+    def get_languages(self):
+        """
+        Returns the codes of the languages that have an obs directory
+        :return: list<str>
+        """
+        langs = []
+        for entry in scandir(self.pages_dir):
+            if entry.is_dir() and os.path.isdir(os.path.join(entry.path, 'obs')):
+                langs.append(entry.name)
+
+        return sorted(langs)
+
+    def get_chapter_files(self, lang_code):
+        """
+        Returns the chapter page of each chapter, preferring markdown if both exist
+        :param str|unicode lang_code:
+        :return: list<tuple> (chapter number, file path), sorted by chapter
+        """
+        valid = set(chapters_and_frames.chapter_numbers)
+        files = {}
+
+        for entry in scandir(os.path.join(self.pages_dir, lang_code, 'obs')):
+            match = OBSPagesIngester.chapter_file_re.search(entry.name)
+            if not match or match.group(1) not in valid or not entry.is_file():
+                continue
+
+            number = int(match.group(1))
+            if number not in files or match.group(2) == 'md':
+                files[number] = entry.path
+
+        return sorted(files.items())
+
+    def load_language(self, lang_code):
+        """
+        Reads all the pages of one language. Errors are recorded in the result instead of raised.
+        :param str|unicode lang_code:
+        :return: OBSPagesLanguage
+        """
+        result = OBSPagesLanguage(lang_code)
+
+        try:
+            result.front_matter = OBS.get_front_matter(self.pages_dir, lang_code, self.today_str)
+            result.back_matter = OBS.get_back_matter(self.pages_dir, lang_code, self.today_str)
+
+            result.obs = OBS()
+            result.obs.language = lang_code
+
+            for number, file_path in self.get_chapter_files(lang_code):
+                with codecs.open(file_path, 'r', encoding='utf-8-sig') as in_file:
+                    markdown = in_file.read()
+
+                try:
+                    result.obs.chapters.append(OBSChapter.from_markdown(markdown, number))
+                except Exception as e:
+                    result.errors.append('{0}: {1}'.format(file_path, e))
+
+        except Exception as e:
+            result.errors.append('{0}: {1}'.format(lang_code, e))
+
+        return result
+
+    def ingest(self, langs=None):
+        """
+        Reads the languages in the thread pool, yielding each as soon as it is finished. No more than twice the
+        number of workers are waiting at any time, so memory use stays bounded for a large catalog.
+        :param list langs: The languages to read, defaults to all of them
+        :return: generator of OBSPagesLanguage
+        """
+        pending_langs = list(langs if langs is not None else self.get_languages())
+        pending_langs.reverse()
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending_langs or running:
+                while pending_langs and len(running) < 2 * self.max_workers:
+                    running.add(executor.submit(self.load_language, pending_langs.pop()))
+
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages_dir', help='The Door43 pages directory')
+    parser.add_argument('-l', '--lang', dest='langs', action='append', help='Read only this language')
+    parser.add_argument('-w', '--workers', dest='workers', default='8', help='Languages read at the same time')
+    args = parser.parse_args(sys.argv[1:])
+
+    ingester = OBSPagesIngester(args.pages_dir, int(args.workers))
+    for language in ingester.ingest(args.langs):
+        chapter_count = len(language.obs.chapters) if language.obs else 0
+        print('{0}: {1} chapters, {2} errors'.format(language.language, chapter_count, len(language.errors)))
+        for error in language.errors:
+            print('  ' + error)
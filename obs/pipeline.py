@@ -0,0 +1,403 @@
+"""
+Runs work items through a chain of stages connected by bounded queues, so the network waits of one language overlap
+the CPU work and file writes of others.
+
+Each stage has its own kind of worker and concurrency limit:
+  thread   for I/O-bound work, like fetching the JSON
+  process  for CPU-bound work, run in a process pool so it can use all the cores
+  async    for coroutines, run on an event loop in its own thread
+
+A stage that falls behind fills its input queue, which blocks the stage before it (backpressure), so memory stays
+bounded however many languages are queued. The metrics show where the time goes: a stage with a high busy share is
+the bottleneck, and a stage with a high blocked time is waiting on the one after it.
+
+An item that fails is recorded and the others carry on. An error like KeyboardInterrupt also stops the reading of new
+items, and is raised again by run() once the items already in the pipeline are done.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from obs.cache_manager import OBSCacheManager
+from obs.export_to_tex import OBSTexExport, OBSExportCache
+from obs.publish import OBSPublisher
+
+try:
+    import queue
+except ImportError:
+    # noinspection PyUnresolvedReferences
+    import Queue as queue
+
+
+class OBSPipelineStage(object):
+
+    kinds = ('thread', 'process', 'async')
+
+    def __init__(self, name, function, workers=1, kind='thread'):
+        """
+        Class constructor
+        :param str|unicode name:
+        :param function: Called with each item, returns the item for the next stage. For async stages this is a
+                         coroutine function, for process stages it must be a module level function.
+        :param int workers: The number of items this stage works on at the same time
+        :param str|unicode kind: 'thread', 'process' or 'async'
+        """
+        if kind not in OBSPipelineStage.kinds:
+            raise ValueError('Unknown stage kind "{0}" for stage {1}.'.format(kind, name))
+
+        if workers < 1:
+            raise ValueError('Stage {0} needs at least one worker.'.format(name))
+
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.kind = kind
+
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+
+    def add_time(self, busy=0.0, blocked=0.0, succeeded=True):
+        with self.lock:
+            self.busy += busy
+            self.blocked += blocked
+            if succeeded:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def get_metrics(self, elapsed):
+        """
+        :param float elapsed: The seconds the pipeline has been running
+        :return: OrderedDict
+        """
+        return OrderedDict([
+            ('kind', self.kind),
+            ('workers', self.workers),
+            ('processed', self.processed),
+            ('failed', self.failed),
+            ('throughput', self.processed / elapsed if elapsed else 0.0),
+            ('busy_seconds', self.busy),
+            ('blocked_seconds', self.blocked),
+            ('utilization', self.busy / (elapsed * self.workers) if elapsed else 0.0),
+            ('max_queue_depth', self.max_depth)
+        ])
+
+
+class OBSPipeline(object):
+
+    # put in a queue once for each worker of the stage, after the last item
+    stop = object()
+
+    def __init__(self, stages, max_queue=4):
+        """
+        Class constructor
+        :param list stages: OBSPipelineStage objects, in order
+        :param int max_queue: The number of items that can wait in front of each stage
+        """
+        self.stages = stages  # type: list<OBSPipelineStage>
+        self.max_queue = max_queue
+        self.queues = []  # type: list<queue.Queue>
+        self.results = []
+        self.failures = []
+        self.error = None  # type: BaseException
+        self.started = 0.0
+        self.finished = 0.0
+        self.lock = threading.Lock()
+
+        # the number of workers of each stage still running, the last one to stop tells the next stage
+        self.running = []
+
+    def run(self, items):
+        """
+        Runs each item through all the stages
+        :param items: Any iterable, it is read only as fast as the first stage takes the items
+        :return: OrderedDict The results of the last stage, the failures, and the metrics
+        """
+        self.queues = [queue.Queue(maxsize=self.max_queue) for _ in self.stages]
+        self.results = []
+        self.failures = []
+        self.error = None
+        self.running = [stage.workers for stage in self.stages]
+        for stage in self.stages:
+            stage.reset()
+
+        self.started = time.time()
+        threads = []
+        executors = []
+
+        for index, stage in enumerate(self.stages):
+            if stage.kind == 'async':
+                threads.append(threading.Thread(target=self.run_async_stage, args=(index,)))
+                continue
+
+            executor = None
+            if stage.kind == 'process':
+                executor = ProcessPoolExecutor(max_workers=stage.workers)
+                executors.append(executor)
+
+            threads.extend(threading.Thread(target=self.run_worker, args=(index, executor))
+                           for _ in range(stage.workers))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            for item in items:
+                if self.error is not None:
+                    break
+                self.put(-1, item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self.queues[0].put(OBSPipeline.stop)
+
+            for thread in threads:
+                thread.join()
+
+            for executor in executors:
+                executor.shutdown()
+
+        self.finished = time.time()
+
+        if self.error is not None:
+            raise self.error
+
+        return OrderedDict([('results', self.results), ('failures', self.failures),
+                            ('metrics', self.get_metrics())])
+
+    def put(self, index, item):
+        """
+        Passes the item from stage index to the next stage, or to the results after the last stage
+        :return: float The seconds spent waiting for room in the queue
+        """
+        if index + 1 == len(self.stages):
+            with self.lock:
+                self.results.append(item)
+            return 0.0
+
+        next_queue = self.queues[index + 1]
+        started = time.time()
+        next_queue.put(item)
+        blocked = time.time() - started
+
+        next_stage = self.stages[index + 1]
+        with next_stage.lock:
+            next_stage.max_depth = max(next_stage.max_depth, next_queue.qsize())
+
+        return blocked
+
+    def fail(self, index, item, error):
+        msg = '{0}: {1}'.format(error.__class__.__name__, error)
+        print('The {0} stage failed for {1}: {2}'.format(self.stages[index].name, item, msg))
+        with self.lock:
+            self.failures.append(OrderedDict([('stage', self.stages[index].name), ('item', item), ('error', msg)]))
+
+            # the worker keeps going, so the items already in the pipeline drain and run() does not hang
+            if not isinstance(error, (Exception, SystemExit)) and self.error is None:
+                self.error = error
+
+    def stop_worker(self, index):
+        """
+        Called when a worker of stage index stops, the last one stops the workers of the next stage
+        """
+        with self.lock:
+            self.running[index] -= 1
+            last = self.running[index] == 0
+
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self.queues[index + 1].put(OBSPipeline.stop)
+
+    def run_worker(self, index, executor=None):
+        stage = self.stages[index]
+
+        while True:
+            item = self.queues[index].get()
+            if item is OBSPipeline.stop:
+                break
+
+            started = time.time()
+            try:
+                if executor:
+                    output = executor.submit(stage.function, item).result()
+                else:
+                    output = stage.function(item)
+            except BaseException as e:
+                stage.add_time(busy=time.time() - started, succeeded=False)
+                self.fail(index, item, e)
+                continue
+
+            busy = time.time() - started
+            stage.add_time(busy=busy, blocked=self.put(index, output))
+
+        self.stop_worker(index)
+
+    def run_async_stage(self, index):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(asyncio.gather(*[self.run_async_worker(index, loop)
+                                                     for _ in range(self.stages[index].workers)]))
+        finally:
+            loop.close()
+
+    async def run_async_worker(self, index, loop):
+        stage = self.stages[index]
+
+        while True:
+            # the queues are shared with threads, so waiting on them must not block the event loop
+            item = await loop.run_in_executor(None, self.queues[index].get)
+            if item is OBSPipeline.stop:
+                break
+
+            started = time.time()
+            try:
+                output = await stage.function(item)
+            except BaseException as e:
+                stage.add_time(busy=time.time() - started, succeeded=False)
+                self.fail(index, item, e)
+                continue
+
+            busy = time.time() - started
+            blocked = await loop.run_in_executor(None, self.put, index, output)
+            stage.add_time(busy=busy, blocked=blocked)
+
+        self.stop_worker(index)
+
+    def get_metrics(self):
+        elapsed = (self.finished or time.time()) - self.started if self.started else 0.0
+
+        return OrderedDict([
+            ('elapsed', elapsed),
+            ('completed', len(self.results)),
+            ('failed', len(self.failures)),
+            ('throughput', len(self.results) / elapsed if elapsed else 0.0),
+            ('stages', OrderedDict((stage.name, stage.get_metrics(elapsed)) for stage in self.stages))
+        ])
+
+
+def get_exporter(job):
+    return OBSTexExport(job['lang'], job['out_path'], job['max_chapters'], job['img_res'], job['checking_level'],
+                        temp_dir=job.get('temp_dir'))
+
+
+def render_tex(job):
+    """
+    The CPU stage of the TeX pipeline, run in a worker process
+    :param dict job: From OBSTexPipeline.fetch
+    :return: dict The job, with the TeX and the overflow frames added
+    """
+    # the temp files are removed when this is done, whether or not it works
+    with get_exporter(job) as exporter:
+        tex = exporter.render()
+
+    result = dict(job)
+    result['tex'] = tex
+    result['overflow_frames'] = exporter.overflow_frames
+    return result
+
+
+class OBSTexPipeline(object):
+
+    def __init__(self, out_dir, max_chapters=0, img_res='360px', checking_level='1', cache=None, fetch_workers=8,
+                 render_workers=None, write_workers=4, max_queue=4):
+        """
+        Exports many languages to TeX: fetch the JSON in threads, render the TeX in processes, write the files from
+        an event loop
+        :param int render_workers: Defaults to the number of CPUs
+        """
+        self.out_dir = out_dir
+        self.max_chapters = max_chapters
+        self.img_res = img_res
+        self.checking_level = checking_level
+        self.cache = cache or OBSExportCache()
+
+        # here, before the write workers start, so they do not race to create it
+        OBSPublisher.make_dirs(out_dir)
+
+        self.pipeline = OBSPipeline([
+            OBSPipelineStage('fetch', self.fetch, fetch_workers, 'thread'),
+            OBSPipelineStage('render', render_tex, render_workers or os.cpu_count() or 1, 'process'),
+            OBSPipelineStage('write', self.write, write_workers, 'async')
+        ], max_queue)
+
+    def get_job(self, lang):
+        return {'lang': lang, 'out_path': os.path.join(self.out_dir, 'obs-{0}.tex'.format(lang)),
+                'max_chapters': self.max_chapters, 'img_res': self.img_res, 'checking_level': self.checking_level}
+
+    def fetch(self, job):
+        exporter = get_exporter(job)
+        exporter.cache = self.cache
+        try:
+            exporter.fetch()
+        except BaseException:
+            shutil.rmtree(exporter.temp_dir, ignore_errors=True)
+            raise
+
+        result = dict(job)
+        result['temp_dir'] = exporter.temp_dir
+        return result
+
+    @staticmethod
+    async def write(job):
+        await asyncio.get_event_loop().run_in_executor(None, OBSPublisher.write_atomic, job['out_path'],
+                                                       job['tex'].encode('utf-8'))
+        return OrderedDict([('lang', job['lang']), ('out_path', job['out_path']),
+                            ('overflow_frames', job['overflow_frames'])])
+
+    def run(self, langs):
+        """
+        :param list langs:
+        :return: OrderedDict The written files, the failures, and the metrics
+        """
+        return self.pipeline.run(self.get_job(lang) for lang in langs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output-dir', dest='out_dir', required=True, help='The output directory')
+    parser.add_argument('-l', '--lang', dest='langs', action='append', required=True, help='A language to export')
+    parser.add_argument('-f', '--fetch-workers', dest='fetch_workers', default=8, type=int,
+                        help='The number of languages to download at the same time')
+    parser.add_argument('-p', '--processes', dest='render_workers', default=None, type=int,
+                        help='The number of render processes, defaults to the number of CPUs')
+    parser.add_argument('-w', '--write-workers', dest='write_workers', default=4, type=int,
+                        help='The number of files to write at the same time')
+    parser.add_argument('-d', '--cache-dir', dest='cache_dir', default=None,
+                        help='Share the fetched JSON with other runs through this cache directory')
+    parser.add_argument('-q', '--max-queue', dest='max_queue', default=4, type=int,
+                        help='The number of languages that can wait in front of each stage')
+    args = parser.parse_args(sys.argv[1:])
+
+    export_cache = OBSExportCache(disk_cache=OBSCacheManager(args.cache_dir)) if args.cache_dir else None
+    summary = OBSTexPipeline(args.out_dir, cache=export_cache, fetch_workers=args.fetch_workers,
+                             render_workers=args.render_workers, write_workers=args.write_workers,
+                             max_queue=args.max_queue).run(args.langs)
+
+    metrics = summary['metrics']
+    print('Finished: {0}, failed: {1}, in {2:.1f} seconds'.format(metrics['completed'], metrics['failed'],
+                                                                 metrics['elapsed']))
+    for stage_name, stage_metrics in metrics['stages'].items():
+        print('{0}: {1} done, {2:.1f} per second, {3:.0%} busy, {4:.1f} seconds blocked'.format(
+            stage_name, stage_metrics['processed'], stage_metrics['throughput'], stage_metrics['utilization'],
+            stage_metrics['blocked_seconds']))
+
+    sys.exit(1 if summary['failures'] else 0)
@@ -0,0 +1,145 @@
+"""
+Writes publish artifacts with precompressed gzip (and brotli, if installed) variants, and records the hash of each
+artifact so files that did not change since the previous build are not rewritten.
+"""
+from __future__ import print_function, unicode_literals
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from general_tools.file_utils import load_json_object
+from obs.obs_classes import OBSEncoder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class OBSPublisher(object):
+
+    manifest_file_name = 'publish-manifest.json'
+
+    def __init__(self, out_dir, use_brotli=True):
+        """
+        Class constructor.
+        :param str|unicode out_dir: The directory the artifacts are written to
+        :param bool use_brotli: Also write .br files, if the brotli module is installed
+        """
+        self.out_dir = out_dir
+        self.use_brotli = use_brotli and brotli is not None
+        self.manifest = load_json_object(os.path.join(out_dir, OBSPublisher.manifest_file_name), {})
+        self.written = []
+        self.skipped = []
+
+    @staticmethod
+    def gzip_bytes(content):
+        # mtime=0 and no file name, so the same content always produces the same bytes
+        buffer = io.BytesIO()
+        with gzip.GzipFile(filename='', mode='wb', fileobj=buffer, compresslevel=9, mtime=0) as gz_file:
+            gz_file.write(content)
+        return buffer.getvalue()
+
+    @staticmethod
+    def make_dirs(dir_name):
+        """
+        Like make_dir, but another thread or process creating the directory at the same time is not an error
+        """
+        if dir_name and not os.path.isdir(dir_name):
+            try:
+                os.makedirs(dir_name)
+            except OSError:
+                if not os.path.isdir(dir_name):
+                    raise
+
+    @staticmethod
+    def write_atomic(file_name, content):
+        """
+        Writes a unique temp file in the same directory and renames it into place, so readers never see a partial
+        file and two writers of the same file do not share a temp file
+        :param str|unicode file_name:
+        :param bytes content:
+        """
+        dir_name = os.path.dirname(file_name)
+        OBSPublisher.make_dirs(dir_name)
+
+        handle, temp_name = tempfile.mkstemp(prefix='.tmp-', dir=dir_name or '.')
+        try:
+            with os.fdopen(handle, 'wb') as out_file:
+                out_file.write(content)
+            # mkstemp creates the file readable only by its owner
+            os.chmod(temp_name, 0o644)
+
+            if hasattr(os, 'replace'):
+                os.replace(temp_name, file_name)
+            else:
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+                os.rename(temp_name, file_name)
+
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+    def get_variants(self, content):
+        """
+        :param bytes content:
+        :return: OrderedDict The file name suffix and the content of each variant
+        """
+        variants = OrderedDict([('', content), ('.gz', OBSPublisher.gzip_bytes(content))])
+        if self.use_brotli:
+            variants['.br'] = brotli.compress(content)
+        return variants
+
+    def publish(self, name, content):
+        """
+        Writes the artifact and its compressed variants, unless the same content was already published
+        :param str|unicode name: The file name, relative to the output directory
+        :param str|unicode|bytes content:
+        :return: bool True if the files were written
+        """
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        previous = self.manifest.get(name)
+        suffixes = ['', '.gz'] + (['.br'] if self.use_brotli else [])
+
+        if previous and previous['hash'] == content_hash and \
+                all(os.path.isfile(os.path.join(self.out_dir, name + s)) for s in suffixes):
+            self.skipped.append(name)
+            return False
+
+        entry = OrderedDict([('hash', content_hash), ('size', len(content))])
+        for suffix, variant in self.get_variants(content).items():
+            OBSPublisher.write_atomic(os.path.join(self.out_dir, name + suffix), variant)
+            if suffix:
+                entry[suffix[1:]] = OrderedDict([('hash', hashlib.sha256(variant).hexdigest()),
+                                                 ('size', len(variant))])
+
+        self.manifest[name] = entry
+        self.written.append(name)
+        return True
+
+    def publish_json(self, name, obj, cls=OBSEncoder):
+        """
+        Publishes an object as JSON, for example an OBS with OBSEncoder or an OBSManifest with OBSManifestEncoder
+        :return: bool True if the files were written
+        """
+        return self.publish(name, json.dumps(obj, cls=cls, sort_keys=True))
+
+    def publish_file(self, name, file_name):
+        """
+        Publishes an existing file, for example the TeX output
+        :return: bool True if the files were written
+        """
+        with open(file_name, 'rb') as in_file:
+            return self.publish(name, in_file.read())
+
+    def save(self):
+        OBSPublisher.write_atomic(os.path.join(self.out_dir, OBSPublisher.manifest_file_name),
+                                  json.dumps(self.manifest, sort_keys=True, indent=2).encode('utf-8'))
@@ -0,0 +1,188 @@
+"""
+An inverted index of frame text across languages, for term and phrase searches like "which languages still contain
+X in 12-05".
+
+Text is normalized (NFKC, case-folded) and split into words, keeping combining marks with the letters they modify.
+Scripts that are written without spaces (Chinese, Japanese, Thai, Lao, Khmer, Myanmar) are indexed one character
+per token, so phrase searches still work for them.
+"""
+from __future__ import print_function, unicode_literals
+import re
+import sys
+import unicodedata
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+
+class OBSSearchIndex(object):
+
+    # scripts written without spaces between words
+    no_space_chars = '\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+    phrase_re = re.compile(r'"([^"]*)"|(\S+)', re.UNICODE)
+    token_re = None
+
+    def __init__(self):
+        # token -> language -> frame id -> positions
+        self.postings = {}  # type: dict<str, dict<str, dict<str, list<int>>>>
+
+        # language -> frame id -> tokens
+        self.documents = {}  # type: dict<str, dict<str, list<str>>>
+
+    @staticmethod
+    def get_token_re():
+        """
+        Compiles the token pattern the first time it is needed, because listing the combining marks takes a moment
+        """
+        if OBSSearchIndex.token_re is None:
+            ranges = []
+            start = None
+            for code in range(0x300, min(sys.maxunicode, 0x2ffff) + 1):
+                is_mark = unicodedata.category(unichr(code))[0] == 'M'
+                if is_mark and start is None:
+                    start = code
+                elif not is_mark and start is not None:
+                    ranges.append((start, code - 1))
+                    start = None
+
+            marks = ''.join('{0}-{1}'.format(unichr(a), unichr(b)) for a, b in ranges)
+            no_space = OBSSearchIndex.no_space_chars
+            OBSSearchIndex.token_re = re.compile(
+                '([{0}])|((?:(?![{0}])[\\w{1}])+)'.format(no_space, marks), re.UNICODE)
+
+        return OBSSearchIndex.token_re
+
+    @staticmethod
+    def normalize(text):
+        text = unicodedata.normalize('NFKC', text)
+        return text.casefold() if hasattr(text, 'casefold') else text.lower()
+
+    @staticmethod
+    def tokenize(text):
+        """
+        :param str|unicode text:
+        :return: list<str>
+        """
+        token_re = OBSSearchIndex.get_token_re()
+        return [m.group(0) for m in token_re.finditer(OBSSearchIndex.normalize(text or ''))]
+
+    def add_frame(self, lang, frame_id, text):
+        tokens = OBSSearchIndex.tokenize(text)
+        self.documents.setdefault(lang, {})[frame_id] = tokens
+
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(lang, {}).setdefault(frame_id, []).append(position)
+
+    def remove_frame(self, lang, frame_id):
+        tokens = self.documents.get(lang, {}).pop(frame_id, None)
+        if tokens is None:
+            return
+
+        for token in set(tokens):
+            by_lang = self.postings[token]
+            del by_lang[lang][frame_id]
+            if not by_lang[lang]:
+                del by_lang[lang]
+            if not by_lang:
+                del self.postings[token]
+
+    def update_language(self, obs_obj):
+        """
+        Indexes the frames of one language, re-indexing only the frames whose text changed
+        :param OBS obs_obj:
+        :return: int The number of frames that were added or changed
+        """
+        lang = obs_obj.language
+        old_documents = self.documents.get(lang, {})
+        seen = set()
+        updated = 0
+
+        for chapter in obs_obj.chapters:
+            for frame in chapter['frames']:
+                frame_id = frame['id']
+                seen.add(frame_id)
+                if old_documents.get(frame_id) == OBSSearchIndex.tokenize(frame.get('text')):
+                    continue
+
+                self.remove_frame(lang, frame_id)
+                self.add_frame(lang, frame_id, frame.get('text'))
+                updated += 1
+
+        for frame_id in [f for f in old_documents if f not in seen]:
+            self.remove_frame(lang, frame_id)
+
+        return updated
+
+    def remove_language(self, lang):
+        for frame_id in list(self.documents.get(lang, {})):
+            self.remove_frame(lang, frame_id)
+        self.documents.pop(lang, None)
+
+    @property
+    def languages(self):
+        return sorted(self.documents.keys())
+
+    def find_tokens(self, tokens, phrase=False, langs=None, frame_ids=None):
+        """
+        Finds the frames containing all the tokens, or the tokens in order if <phrase> is True
+        :param list tokens:
+        :param bool phrase:
+        :param list langs: Search only these languages
+        :param list frame_ids: Search only these frames
+        :return: set<tuple> (language, frame id)
+        """
+        if not tokens:
+            return set()
+
+        postings = [self.postings.get(t, {}) for t in tokens]
+
+        # start with the rarest token
+        rarest = min(postings, key=lambda p: sum(len(f) for f in p.values()))
+        matches = set()
+
+        for lang, frames in rarest.items():
+            if langs and lang not in langs:
+                continue
+
+            for frame_id in frames:
+                if frame_ids and frame_id not in frame_ids:
+                    continue
+
+                positions = [p.get(lang, {}).get(frame_id) for p in postings]
+                if not all(positions):
+                    continue
+
+                if phrase:
+                    following = [set(p) for p in positions[1:]]
+                    if not any(all(start + i + 1 in f for i, f in enumerate(following)) for start in positions[0]):
+                        continue
+
+                matches.add((lang, frame_id))
+
+        return matches
+
+    def search(self, query, langs=None, frame_ids=None):
+        """
+        Finds the frames matching all the parts of the query. Quoted parts are phrases, the others are terms.
+        :param str|unicode query: Like 'god "created the world"'
+        :param list langs: Search only these languages
+        :param list frame_ids: Search only these frames, like ['12-05']
+        :return: list<tuple> Sorted (language, frame id) pairs
+        """
+        result = None
+
+        for match in OBSSearchIndex.phrase_re.finditer(query):
+            is_phrase = match.group(1) is not None
+            tokens = OBSSearchIndex.tokenize(match.group(1) if is_phrase else match.group(2))
+            if not tokens:
+                continue
+
+            # a single word in a script without spaces is a phrase of characters
+            found = self.find_tokens(tokens, is_phrase or len(tokens) > 1, langs, frame_ids)
+            result = found if result is None else result & found
+            if not result:
+                break
+
+        return sorted(result or [])
@@ -0,0 +1,115 @@
+"""
+Writes an OBS object as one JSON file per chapter plus a small index, so clients can fetch the chapters they need
+and revalidate each one by its hash instead of downloading the whole obs-{lang}.json.
+
+Each file is replaced atomically and the index is written last, so a client never reads an index that lists a chapter
+file which has not been written yet.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from general_tools.file_utils import load_json_object
+from obs import chapters_and_frames
+from obs.lazy_obs import LazyOBS
+from obs.obs_classes import OBSEncoder
+from obs.publish import OBSPublisher
+
+
+class OBSShards(object):
+
+    index_file_name = 'index.json'
+    chapter_file_name = '{0}.json'
+
+    @staticmethod
+    def serialize(obj):
+        """
+        Compact, sorted JSON so the same content always produces the same bytes and hash
+        :return: bytes
+        """
+        return json.dumps(obj, cls=OBSEncoder, sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def get_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def write(obs_obj, out_dir):
+        """
+        Writes one file for each chapter and the index, and removes the chapter files the previous index listed that are
+        not in the new one
+        :param OBS obs_obj:
+        :param str|unicode out_dir:
+        :return: OrderedDict The index
+        """
+        OBSPublisher.make_dirs(out_dir)
+        previous = OBSShards.load_index(out_dir) or {}
+
+        chapters = []
+        for chapter in obs_obj.chapters:
+            content = OBSShards.serialize(chapter)
+            file_name = OBSShards.chapter_file_name.format(chapter['number'])
+
+            OBSPublisher.write_atomic(os.path.join(out_dir, file_name), content)
+
+            chapter_index = int(chapter['number']) - 1
+            expected = chapters_and_frames.frame_counts[chapter_index] \
+                if 0 <= chapter_index < len(chapters_and_frames.frame_counts) else 0
+
+            chapters.append(OrderedDict([
+                ('number', chapter['number']),
+                ('title', chapter['title']),
+                ('frames', len(chapter['frames'])),
+                ('expected_frames', expected),
+                ('file', file_name),
+                ('hash', OBSShards.get_hash(content)),
+                ('size', len(content))
+            ]))
+
+        index = OrderedDict([
+            ('language', obs_obj.language),
+            ('direction', obs_obj.direction),
+            ('date_modified', obs_obj.date_modified),
+            ('app_words', obs_obj.app_words),
+            ('chapters', chapters)
+        ])
+
+        OBSPublisher.write_atomic(os.path.join(out_dir, OBSShards.index_file_name), OBSShards.serialize(index))
+
+        # only after the new index is in place, so no index lists a removed file
+        written = set(c['file'] for c in chapters)
+        for entry in previous.get('chapters', []):
+            file_name = os.path.join(out_dir, os.path.basename(entry.get('file', '')))
+            if entry.get('file') not in written and os.path.isfile(file_name):
+                os.remove(file_name)
+
+        return index
+
+    @staticmethod
+    def load_index(out_dir):
+        return load_json_object(os.path.join(out_dir, OBSShards.index_file_name))
+
+    @staticmethod
+    def load_chapter(out_dir, number):
+        """
+        :param str|unicode out_dir:
+        :param str|unicode|int number: The chapter number, like '01' or 1
+        :return: dict
+        """
+        file_name = OBSShards.chapter_file_name.format(str(number).zfill(2))
+        return load_json_object(os.path.join(out_dir, file_name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-i', '--input', dest='in_file', required=True, help='The obs-{lang}.json file')
+    parser.add_argument('-o', '--output', dest='out_dir', required=True, help='The directory for the shards')
+    args = parser.parse_args(sys.argv[1:])
+
+    written = OBSShards.write(LazyOBS(args.in_file), args.out_dir)
+    print('Wrote {0} chapters to {1}'.format(len(written['chapters']), args.out_dir))
@@ -0,0 +1,145 @@
+"""
+Checks the frame text, titles and refs of an OBS for problems that would stop or spoil a ConTeXt run, before
+typesetting starts, and escapes the TeX special characters.
+
+Each text is scanned once with a combined pattern. The characters % # & $ \\ { } are escaped. Links are not checked
+for markup. In text that goes through OBSTexExport.filter_apply_docuwiki_and_links they are left as they are, for the
+link patterns of the exporter; everywhere else the & in a link is escaped too. Unbalanced **, //, __ and '' markup,
+unknown tags like <bold>, and tags that are not closed or are closed in the wrong order are reported with the id of the
+frame.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import re
+import sys
+from obs.lazy_obs import LazyOBS
+
+
+class OBSTexLinter(object):
+
+    # the order is important: links first, so nothing inside them is counted as markup
+    token_re = re.compile(r"(?P<url>https*://[/\w\d,.?&_=+-]+)"
+                          r"|(?P<special>[%#&$\\{}])"
+                          r"|(?P<mark>\*\*|(?<!:)//|__|'')"
+                          r"|(?P<tag><(?P<close>/?)(?P<name>[A-Za-z]+)>)", re.UNICODE)
+
+    escapes = {'%': '\\%', '#': '\\#', '&': '\\&', '$': '\\$', '\\': '\\textbackslash{}', '{': '\\{', '}': '\\}'}
+
+    # the tags the exporter knows, see OBSTexExport.filter_apply_docuwiki_start
+    tag_re = re.compile(r'^(?:red|mag[enta]*|blue|green|sub|sup|del)$', re.UNICODE)
+
+    @staticmethod
+    def lint(text, item_id='', links=False):
+        """
+        Escapes the text and checks its markup, in one pass
+        :param str|unicode text:
+        :param str|unicode item_id: Like 'frame 01-01', used in the error messages
+        :param bool links: True if the text goes through the link patterns of the exporter, which need the links as
+                           they are
+        :return: tuple (escaped text, list of error messages)
+        """
+        escaped, problems = OBSTexLinter.scan(text, links)
+        return escaped, [p.format(item_id) for p in problems]
+
+    @staticmethod
+    def scan(text, links=False):
+        """
+        Does the work of lint, but leaves {0} in the error messages where the item id goes, so the result depends only
+        on the text and can be reused for identical texts
+        :param str|unicode text:
+        :param bool links: See lint
+        :return: tuple (escaped text, list of error messages)
+        """
+        text = text or ''
+        pieces = []
+        errors = []
+        marks = {}
+        open_tags = []
+        position = 0
+
+        for match in OBSTexLinter.token_re.finditer(text):
+            pieces.append(text[position:match.start()])
+            position = match.end()
+            token = match.group(0)
+
+            if match.group('special'):
+                pieces.append(OBSTexLinter.escapes[token])
+                continue
+
+            if match.group('url') and not links:
+                # the frame text is not searched for links, so the link is printed as text
+                token = token.replace('&', OBSTexLinter.escapes['&'])
+
+            pieces.append(token)
+
+            if match.group('mark'):
+                marks[token] = marks.get(token, 0) + 1
+
+            elif match.group('tag'):
+                name = match.group('name').lower()
+                if not OBSTexLinter.tag_re.search(name):
+                    errors.append('Unknown tag ' + token + ' in {0}')
+                    continue
+
+                if name.startswith('mag'):
+                    name = 'magenta'
+
+                if not match.group('close'):
+                    open_tags.append(name)
+                elif open_tags and open_tags[-1] == name:
+                    open_tags.pop()
+                else:
+                    errors.append('Closing tag ' + token + ' does not match an open tag in {0}')
+
+        pieces.append(text[position:])
+
+        for mark in sorted(marks):
+            if marks[mark] % 2:
+                errors.append('Unbalanced ' + mark + ' in {0}')
+
+        for name in open_tags:
+            errors.append('Tag <' + name + '> is not closed in {0}')
+
+        return ''.join(pieces), errors
+
+    @staticmethod
+    def escape(text, links=False):
+        return OBSTexLinter.lint(text, links=links)[0]
+
+    @staticmethod
+    def get_errors(chapters, max_chapters=0, store=None):
+        """
+        Checks the title, ref and frames of each chapter
+        :param list chapters: Chapter dicts, like OBS.chapters
+        :param int max_chapters: Check only this many chapters, 0 for all
+        :param OBSFrameStore store: If given, each distinct text is checked only once
+        :return: list<str>
+        """
+        errors = []
+        lint = store.lint if store else lambda t, i: OBSTexLinter.lint(t, i)[1]
+
+        for index, chapter in enumerate(chapters):
+            if 0 < max_chapters <= index:
+                break
+
+            items = [(chapter['title'], 'title {0}'.format(chapter['number'])),
+                     (chapter['ref'], 'ref {0}'.format(chapter['number']))]
+            items.extend((frame['text'], 'frame {0}'.format(frame['id'])) for frame in chapter['frames'])
+
+            for text, item_id in items:
+                for msg in lint(text, item_id):
+                    print(msg)
+                    errors.append(msg)
+
+        return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file_name', help='The obs-{lang}.json file to check')
+    args = parser.parse_args(sys.argv[1:])
+
+    found = OBSTexLinter.get_errors(LazyOBS(args.file_name).chapters)
+    print('{0} problems found.'.format(len(found)))
+    sys.exit(1 if found else 0)
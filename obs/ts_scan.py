@@ -0,0 +1,230 @@
+"""
+Checks the completeness of many tS repositories using only directory listings and file metadata, without reading any
+frame files.
+
+Each chapter directory is compared with chapters_and_frames.frame_counts to find the missing frames, the empty frames
+(files of 0 bytes, or only a UTF-8 BOM) and the missing title and reference. Only 3 byte files are opened, to tell a
+BOM from a short text. The names, sizes and
+modification times of each chapter are also kept as a signature, so the next scan reports which chapters changed and
+only those languages need to be read and validated again.
+
+Requires Python 3.5 or newer, or the futures and scandir back ports.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from general_tools.file_utils import load_json_object, write_file
+from obs import chapters_and_frames
+from obs.obs_classes import OBSManifest
+
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+
+
+class TSCompletenessScanner(object):
+
+    bom = b'\xef\xbb\xbf'
+
+    def __init__(self, state_file=None, max_workers=16):
+        """
+        Class constructor
+        :param str|unicode state_file: The chapter signatures of the last scan are loaded from and saved to this file
+        :param int max_workers: The number of repositories scanned at the same time
+        """
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.signatures = {}  # type: dict<str, dict<str, str>>  # repository -> chapter -> signature
+
+        if state_file and os.path.isfile(state_file):
+            self.signatures = load_json_object(state_file, {})
+
+    def save_state(self):
+        if self.state_file:
+            write_file(self.state_file, self.signatures)
+
+    @staticmethod
+    def get_repositories(root_dir):
+        """
+        The directories under root_dir that look like tS repositories, because they have a 01 chapter directory or a
+        manifest.json
+        :return: list<str>
+        """
+        repos = []
+        for entry in scandir(root_dir):
+            if entry.is_dir() and (os.path.isdir(os.path.join(entry.path, '01')) or
+                                   os.path.isfile(os.path.join(entry.path, 'manifest.json'))):
+                repos.append(entry.path)
+
+        return sorted(repos)
+
+    @staticmethod
+    def list_dir(dir_name):
+        """
+        :return: dict<str, tuple> The size and mtime of each file, or None if the directory is missing
+        """
+        files = {}
+        try:
+            for entry in scandir(dir_name):
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, getattr(stat, 'st_mtime_ns', stat.st_mtime))
+        except OSError:
+            # the directory is missing, or was removed while we were looking at it
+            return None
+
+        return files
+
+    @staticmethod
+    def get_signature(files):
+        if files is None:
+            return ''
+
+        return hashlib.sha1(repr(sorted(files.items())).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_empty(file_name, size):
+        """
+        :param str|unicode file_name:
+        :param int size: From the directory listing, so only a file the size of a BOM has to be read
+        :return: bool True if the file has no text, only a byte order mark at most
+        """
+        if size != len(TSCompletenessScanner.bom):
+            return size == 0
+
+        try:
+            with open(file_name, 'rb') as in_file:
+                return in_file.read() == TSCompletenessScanner.bom
+        except (IOError, OSError):
+            # removed since the directory was listed
+            return True
+
+    @staticmethod
+    def scan_chapter(ts_dir, number, frame_ids):
+        """
+        :param str|unicode ts_dir:
+        :param str|unicode number: Like '01'
+        :param tuple frame_ids: The frame ids the chapter should have
+        :return: OrderedDict
+        """
+        chapter_dir = os.path.join(ts_dir, number)
+        files = TSCompletenessScanner.list_dir(chapter_dir)
+        found = files or {}
+        missing = []
+        empty = []
+
+        def has_text(name):
+            return name in found and not TSCompletenessScanner.is_empty(os.path.join(chapter_dir, name), found[name][0])
+
+        for frame_id in frame_ids:
+            name = frame_id[3:] + '.txt'
+            if name not in found:
+                missing.append(frame_id)
+            elif not has_text(name):
+                empty.append(frame_id)
+
+        expected = set(f[3:] + '.txt' for f in frame_ids) | {'title.txt', 'reference.txt'}
+        extra = sorted(name for name in found if name.endswith('.txt') and name not in expected)
+
+        has_title = has_text('title.txt')
+        has_reference = has_text('reference.txt')
+
+        return OrderedDict([
+            ('chapter', number),
+            ('frames', len(frame_ids)),
+            ('finished', len(frame_ids) - len(missing) - len(empty)),
+            ('missing', missing),
+            ('empty', empty),
+            ('extra', extra),
+            ('title', has_title),
+            ('reference', has_reference),
+            ('complete', not missing and not empty and has_title and has_reference),
+            ('signature', TSCompletenessScanner.get_signature(files))
+        ])
+
+    def scan_repository(self, ts_dir):
+        """
+        Scans one repository and compares it with the last scan
+        :param str|unicode ts_dir:
+        :return: OrderedDict
+        """
+        chapters = [TSCompletenessScanner.scan_chapter(ts_dir, number, frame_ids)
+                    for number, frame_ids in zip(chapters_and_frames.chapter_numbers,
+                                                 chapters_and_frames.chapter_frame_ids)]
+
+        key = os.path.abspath(ts_dir)
+        previous = self.signatures.get(key, {})
+        changed = [c['chapter'] for c in chapters if previous.get(c['chapter']) != c['signature']]
+        self.signatures[key] = dict((c['chapter'], c['signature']) for c in chapters)
+
+        finished = sum(c['finished'] for c in chapters)
+        book_title = (TSCompletenessScanner.list_dir(os.path.join(ts_dir, '00')) or {}).get('title.txt')
+
+        return OrderedDict([
+            ('repository', key),
+            ('frames', chapters_and_frames.total_frames),
+            ('finished', finished),
+            ('completeness', float(finished) / chapters_and_frames.total_frames),
+            ('missing', sum(len(c['missing']) for c in chapters)),
+            ('empty', sum(len(c['empty']) for c in chapters)),
+            ('book_title', book_title is not None and not TSCompletenessScanner.is_empty(
+                os.path.join(ts_dir, '00', 'title.txt'), book_title[0])),
+            ('complete', all(c['complete'] for c in chapters)),
+            ('changed', changed),
+            ('chapters', chapters)
+        ])
+
+    def scan(self, repos):
+        """
+        Scans the repositories in a thread pool, then saves the state
+        :param list repos: The repository directories
+        :return: list<OrderedDict> In the same order as repos
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.scan_repository, repos))
+
+        self.save_state()
+        return results
+
+    @staticmethod
+    def get_chunk_status(result):
+        """
+        The chunk_status of an OBSManifest, one entry for each chapter
+        :param OrderedDict result: From scan_repository
+        :return: list<OrderedDict>
+        """
+        return [OrderedDict((k, v) for k, v in chapter.items() if k != 'signature') for chapter in result['chapters']]
+
+    @staticmethod
+    def fill_manifest(result, manifest=None):
+        """
+        :param OrderedDict result: From scan_repository
+        :param OBSManifest manifest: A new manifest is created if not given
+        :return: OBSManifest
+        """
+        manifest = manifest or OBSManifest()
+        manifest.chunk_status = TSCompletenessScanner.get_chunk_status(result)
+        return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root_dir', help='The directory containing the tS repositories')
+    parser.add_argument('-s', '--state', dest='state_file', default=None,
+                        help='Remember the chapter signatures in this file, to report only the changes next time')
+    parser.add_argument('-w', '--workers', dest='max_workers', default=16, type=int,
+                        help='The number of repositories scanned at the same time')
+    args = parser.parse_args(sys.argv[1:])
+
+    scanner = TSCompletenessScanner(args.state_file, args.max_workers)
+    summary = [OrderedDict((k, v) for k, v in r.items() if k != 'chapters')
+               for r in scanner.scan(TSCompletenessScanner.get_repositories(args.root_dir))]
+
+    print(json.dumps(summary, indent=2))
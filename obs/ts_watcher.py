@@ -0,0 +1,188 @@
+"""
+Watches a tS repository and re-validates only the chapters that changed.
+
+The chapter directories are polled using file names, sizes and modification times only, so a poll costs about a
+thousand stat calls and the process sleeps in between. Changes are debounced, so a chapter is parsed once after the
+translator stops saving, not once for every file.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import os
+import sys
+import threading
+import time
+from general_tools.file_utils import write_file
+from obs import chapters_and_frames
+from obs.obs_classes import OBSChapter
+
+
+class TSWatcher(object):
+
+    def __init__(self, ts_dir, interval=0.5, debounce=0.3, output_dir=None, on_chapter=None):
+        """
+        Class constructor.
+        :param str|unicode ts_dir: The root directory of the tS repository
+        :param float interval: The number of seconds between polls
+        :param float debounce: The number of seconds a chapter must be unchanged before it is processed
+        :param str|unicode output_dir: If given, the JSON for each processed chapter is written here
+        :param callable on_chapter: Called with the OBSChapter and its list of errors after processing a chapter
+        """
+        self.ts_dir = ts_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.output_dir = output_dir
+        self.on_chapter = on_chapter
+
+        self.snapshots = {}  # type: dict<str, tuple>
+        self.pending = {}  # type: dict<str, float>
+        self.chapters = {}  # type: dict<str, OBSChapter>
+        self.errors = {}  # type: dict<str, list>
+        self.stop_event = threading.Event()
+
+    def get_chapter_numbers(self):
+        """
+        Returns the names of the chapter directories, '01' through '50'
+        :return: list<str>
+        """
+        valid = set(chapters_and_frames.chapter_numbers)
+        return sorted(name for name in os.listdir(self.ts_dir)
+                      if name in valid and os.path.isdir(os.path.join(self.ts_dir, name)))
+
+    def snapshot_chapter(self, number):
+        """
+        Returns the name, size and modification time of each file in the chapter directory
+        :param str number:
+        :return: tuple
+        """
+        chapter_dir = os.path.join(self.ts_dir, number)
+        entries = []
+
+        try:
+            for file_name in os.listdir(chapter_dir):
+                stat = os.stat(os.path.join(chapter_dir, file_name))
+                entries.append((file_name, stat.st_size, getattr(stat, 'st_mtime_ns', stat.st_mtime)))
+        except OSError:
+            # the directory or a file was removed while we were looking at it
+            return None
+
+        return tuple(sorted(entries))
+
+    def poll(self):
+        """
+        Compares each chapter directory with the last snapshot, and marks changed chapters as pending
+        :return: list<str> The numbers of the chapters that changed since the last poll
+        """
+        now = time.time()
+        changed = []
+        numbers = self.get_chapter_numbers()
+
+        for number in numbers:
+            snapshot = self.snapshot_chapter(number)
+            if self.snapshots.get(number) != snapshot:
+                self.snapshots[number] = snapshot
+                self.pending[number] = now
+                changed.append(number)
+
+        # chapters whose directory was removed
+        for number in [n for n in self.snapshots if n not in numbers]:
+            del self.snapshots[number]
+            self.pending[number] = now
+            changed.append(number)
+
+        return changed
+
+    def check(self):
+        """
+        Polls once, then processes the pending chapters that have not changed for <debounce> seconds
+        :return: dict<str, list> The errors for each processed chapter
+        """
+        self.poll()
+
+        now = time.time()
+        ready = sorted(n for n, changed_at in self.pending.items() if now - changed_at >= self.debounce)
+
+        results = {}
+        for number in ready:
+            del self.pending[number]
+            results[number] = self.process_chapter(number)
+
+        return results
+
+    def process_chapter(self, number):
+        """
+        Parses and validates one chapter
+        :param str number:
+        :return: list<str> The errors found in the chapter
+        """
+        chapter_dir = os.path.join(self.ts_dir, number)
+
+        if not os.path.isdir(chapter_dir):
+            self.chapters.pop(number, None)
+            errors = ['Chapter not found: {0}'.format(number)]
+            print(errors[0])
+            self.errors[number] = errors
+            return errors
+
+        try:
+            chapter = OBSChapter.from_ts_directory(chapter_dir, int(number))
+            errors = chapter.get_errors()
+        except (IOError, OSError) as e:
+            # a file was removed while we were reading, it will be picked up again by the next poll
+            self.snapshots.pop(number, None)
+            return ['Chapter {0} could not be read: {1}'.format(number, e)]
+        except UnicodeDecodeError as e:
+            # reported like any other error of the chapter, it is read again when the file changes
+            errors = ['Chapter {0} is not valid UTF-8: {1}'.format(number, e)]
+            print(errors[0])
+            self.chapters.pop(number, None)
+            self.errors[number] = errors
+            return errors
+
+        self.chapters[number] = chapter
+        self.errors[number] = errors
+
+        if self.output_dir:
+            write_file(os.path.join(self.output_dir, '{0}.json'.format(number)), chapter.__dict__, indent=2)
+
+        if self.on_chapter:
+            self.on_chapter(chapter, errors)
+
+        return errors
+
+    def run(self, max_cycles=0):
+        """
+        Polls until stop() is called
+        :param int max_cycles: Stop after n polls, 0 to run until stopped
+        """
+        cycles = 0
+        while not self.stop_event.is_set():
+            for number, errors in self.check().items():
+                if not errors:
+                    print('Chapter {0}: no errors'.format(number))
+
+            cycles += 1
+            if 0 < max_cycles <= cycles:
+                break
+
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('ts_dir', help='The tS repository to watch')
+    parser.add_argument('-i', '--interval', dest='interval', default='0.5', help='Seconds between polls')
+    parser.add_argument('-d', '--debounce', dest='debounce', default='0.3',
+                        help='Seconds a chapter must be unchanged before it is validated')
+    parser.add_argument('-o', '--output', dest='output_dir', default=None,
+                        help='Write the JSON for each changed chapter to this directory')
+    args = parser.parse_args(sys.argv[1:])
+
+    watcher = TSWatcher(args.ts_dir, float(args.interval), float(args.debounce), args.output_dir)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
@@ -0,0 +1,157 @@
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+from obs.batch_runner import OBSBatchJournal, OBSBatchRunner, OBSCatalogStages
+from tests.tex_fixtures import use_snippets
+
+
+class TestOBSBatchRunner(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-batch-')
+        self.journal_file = os.path.join(self.temp_dir, 'journal.sqlite')
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_stages(self, crash_lang=None):
+
+        def export(lang):
+            self.calls.append(('export', lang))
+            if lang == 'xx':
+                sys.exit(1)
+            return 'output for {0}'.format(lang)
+
+        def publish(lang):
+            self.calls.append(('publish', lang))
+            if lang == crash_lang:
+                raise KeyboardInterrupt()
+            if lang == 'fr':
+                raise ValueError('bad frame')
+            return None
+
+        return [('export', export), ('publish', publish)]
+
+    def test_failures_are_isolated(self):
+        journal = OBSBatchJournal(self.journal_file)
+        result = OBSBatchRunner(journal, self.get_stages()).run(['en', 'xx', 'fr', 'de'])
+
+        self.assertEqual(['en', 'de'], result['finished'])
+        self.assertEqual(['xx', 'fr'], result['failed'])
+
+        self.assertEqual('done', journal.get_status('en', 'publish'))
+        self.assertEqual('failed', journal.get_status('xx', 'export'))
+        self.assertIsNone(journal.get_status('xx', 'publish'))
+        self.assertEqual('done', journal.get_status('fr', 'export'))
+
+        failed = journal.get_rows('failed')
+        self.assertEqual(['ValueError: bad frame', 'SystemExit: 1'], [r['error'] for r in failed])
+
+        hashes = dict(((r['lang'], r['stage']), r['output_hash']) for r in journal.get_rows('done'))
+        self.assertEqual(OBSBatchRunner.get_hash('output for en'), hashes[('en', 'export')])
+        self.assertEqual('', hashes[('en', 'publish')])
+        journal.close()
+
+    def test_resume(self):
+        journal = OBSBatchJournal(self.journal_file)
+        runner = OBSBatchRunner(journal, self.get_stages(crash_lang='de'))
+        self.assertRaises(KeyboardInterrupt, runner.run, ['en', 'de', 'es'])
+        journal.close()
+
+        # the interrupted stage is left running
+        journal = OBSBatchJournal(self.journal_file)
+        self.assertEqual('running', journal.get_status('de', 'publish'))
+
+        self.calls = []
+        result = OBSBatchRunner(journal, self.get_stages()).run(['en', 'de', 'es'])
+        self.assertEqual(['en', 'de', 'es'], result['finished'])
+        self.assertEqual([('publish', 'de'), ('export', 'es'), ('publish', 'es')], self.calls)
+
+        rows = dict(((r['lang'], r['stage']), r) for r in journal.get_rows())
+        self.assertEqual(2, rows[('de', 'publish')]['attempts'])
+        self.assertEqual(1, rows[('en', 'export')]['attempts'])
+
+        # nothing left to do
+        self.calls = []
+        OBSBatchRunner(journal, self.get_stages()).run(['en', 'de', 'es'])
+        self.assertEqual([], self.calls)
+
+        journal.reset()
+        self.assertEqual([], journal.get_rows())
+        journal.close()
+
+    def test_changed_output(self):
+        out_file_name = os.path.join(self.temp_dir, 'out.txt')
+
+        def export(lang):
+            self.calls.append(('export', lang))
+            with open(out_file_name, 'w') as out_file:
+                out_file.write('output for {0}'.format(lang))
+            return out_file_name
+
+        def publish(lang):
+            self.calls.append(('publish', lang))
+            return None
+
+        journal = OBSBatchJournal(self.journal_file)
+        runner = OBSBatchRunner(journal, [('export', export), ('publish', publish)])
+        runner.run(['en'])
+        self.assertEqual(out_file_name, journal.get_output('en', 'export')[0])
+
+        # the file is unchanged, so nothing runs again
+        self.calls = []
+        runner.run(['en'])
+        self.assertEqual([], self.calls)
+
+        # a changed or missing output file runs the stage, and the stages after it, again
+        with open(out_file_name, 'w') as out_file:
+            out_file.write('edited')
+        runner.run(['en'])
+        self.assertEqual([('export', 'en'), ('publish', 'en')], self.calls)
+
+        self.calls = []
+        os.remove(out_file_name)
+        runner.run(['en'])
+        self.assertEqual([('export', 'en'), ('publish', 'en')], self.calls)
+        journal.close()
+
+    def test_catalog_stages(self):
+        pages_dir = os.path.join(self.temp_dir, 'pages')
+        obs_dir = os.path.join(pages_dir, 'en', 'obs')
+        os.makedirs(obs_dir)
+        with open(os.path.join(obs_dir, '01.md'), 'w') as out_file:
+            out_file.write('# 1. The Creation #\n\n'
+                           '![OBS Image](https://cdn.door43.org/obs/jpg/360px/obs-en-01-01.jpg)\n\nText.\n\n'
+                           '_A Bible story from: Genesis 1_\n')
+
+        catalog = OBSCatalogStages(pages_dir, self.temp_dir)
+        journal = OBSBatchJournal(self.journal_file)
+        result = OBSBatchRunner(journal, catalog.get_stages()[:2]).run(['en'])
+
+        # the JSON is written, but verification fails because most frames are missing
+        self.assertEqual(['en'], result['failed'])
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'obs-en.json')))
+        self.assertEqual('done', journal.get_status('en', 'json'))
+        self.assertEqual('failed', journal.get_status('en', 'verify'))
+        journal.close()
+
+        # the TeX stage uses the local JSON, the network is not used
+        use_snippets(self, self.temp_dir)
+        tex_file = catalog.export_tex('en')
+
+        with open(tex_file, 'r') as in_file:
+            self.assertIn('FIGURE: en-01-01', in_file.read())
+
+        # the publish stage compresses both files, and skips them when they did not change
+        publish_dir = os.path.join(self.temp_dir, 'publish')
+        catalog = OBSCatalogStages(pages_dir, self.temp_dir, publish_dir=publish_dir)
+        self.assertEqual(['json', 'verify', 'tex', 'publish'], [name for name, _ in catalog.get_stages()])
+        catalog.publish('en')
+        self.assertEqual(['obs-en.json', 'obs-en.tex'], catalog.publisher.written)
+        self.assertTrue(os.path.isfile(os.path.join(publish_dir, 'obs-en.tex.gz')))
+        catalog.publish('en')
+        self.assertEqual(['obs-en.json', 'obs-en.tex'], catalog.publisher.skipped)
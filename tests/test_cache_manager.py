@@ -0,0 +1,128 @@
+from __future__ import print_function, unicode_literals
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from obs.cache_manager import OBSCacheManager
+from obs.export_to_tex import OBSExportCache, OBSTexExport
+
+
+def get_content(key):
+    # long enough to be written in more than one block, and easy to check
+    return (hashlib.sha1(key.encode('utf-8')).hexdigest() * 40).encode('ascii')
+
+
+def write_entries(args):
+    cache_dir, worker, max_bytes = args
+    cache = OBSCacheManager(cache_dir, max_bytes)
+    for number in range(60):
+        key = 'key-{0}'.format(number % 20)
+        cache.put('tex', key, get_content(key))
+        content = cache.get('tex', 'key-{0}'.format((number + worker) % 20))
+        if content is not None and content != get_content('key-{0}'.format((number + worker) % 20)):
+            return 'worker {0} read a damaged entry'.format(worker)
+
+    return cache.get_stats()['namespaces']['tex']
+
+
+class TestOBSCacheManager(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-cache-')
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_namespaces(self):
+        cache = OBSCacheManager(self.cache_dir)
+        cache.put('http', 'https://example.com/obs-en.json', b'{"en": 1}')
+        cache.put('tex', 'https://example.com/obs-en.json', b'\\bf')
+
+        self.assertEqual(b'{"en": 1}', cache.get('http', 'https://example.com/obs-en.json'))
+        self.assertEqual(b'\\bf', cache.get('tex', 'https://example.com/obs-en.json'))
+        self.assertIsNone(cache.get('images', 'https://example.com/obs-en.json'))
+        self.assertRaises(ValueError, cache.get, '../http', 'x')
+
+        # written a minute ago
+        path = cache.get_path('http', 'https://example.com/obs-en.json')
+        os.utime(path, (time.time(), time.time() - 60))
+        self.assertIsNone(cache.get('http', 'https://example.com/obs-en.json', max_age=30))
+        self.assertIsNotNone(cache.get('http', 'https://example.com/obs-en.json', max_age=90))
+
+        stats = cache.get_stats()
+        self.assertEqual(12, stats['bytes'])
+        self.assertEqual((2, 1, 1), tuple(stats['namespaces']['http'][k] for k in ('hits', 'misses', 'writes')))
+        self.assertEqual(1, stats['namespaces']['images']['misses'])
+
+        cache.clear('http')
+        self.assertIsNone(cache.get('http', 'https://example.com/obs-en.json'))
+        self.assertEqual(3, cache.get_stats()['bytes'])
+
+    def test_lru_eviction(self):
+        cache = OBSCacheManager(self.cache_dir, max_bytes=1000)
+        now = time.time()
+        for number in range(3):
+            cache.put('chapters', 'chapter-{0}'.format(number), b'x' * 300)
+            path = cache.get_path('chapters', 'chapter-{0}'.format(number))
+            os.utime(path, (now - 100 + number, now - 100 + number))
+
+        # chapter-0 is used again, so chapter-1 is now the least recently used
+        self.assertIsNotNone(cache.get('chapters', 'chapter-0'))
+        cache.put('chapters', 'chapter-3', b'x' * 300)
+
+        self.assertIsNone(cache.get('chapters', 'chapter-1'))
+        for number in (0, 2, 3):
+            self.assertIsNotNone(cache.get('chapters', 'chapter-{0}'.format(number)))
+
+        stats = cache.get_stats()
+        self.assertEqual(900, stats['bytes'])
+        self.assertEqual(1, stats['namespaces']['chapters']['evictions'])
+
+    def test_parallel_writers(self):
+        max_bytes = 20000
+        pool = multiprocessing.Pool(4)
+        try:
+            results = pool.map(write_entries, [(self.cache_dir, worker, max_bytes) for worker in range(8)])
+        finally:
+            pool.close()
+            pool.join()
+
+        for result in results:
+            self.assertIsInstance(result, dict, result)
+            self.assertEqual(60, result['writes'])
+
+        cache = OBSCacheManager(self.cache_dir, max_bytes)
+        entries, stale = cache.get_entries()
+        self.assertEqual([], stale)
+        self.assertLessEqual(cache.get_stats()['bytes'], max_bytes)
+        self.assertEqual(sum(size for _, size, _, _ in entries), cache.get_stats()['bytes'])
+        self.assertGreater(sum(r['evictions'] for r in results), 0)
+
+        for number in range(20):
+            content = cache.get('tex', 'key-{0}'.format(number))
+            self.assertIn(content, (None, get_content('key-{0}'.format(number))))
+
+        # no temp files were left behind
+        for dir_name, _, file_names in os.walk(self.cache_dir):
+            self.assertEqual([], [f for f in file_names if f.startswith(OBSCacheManager.temp_prefix)])
+
+    def test_export_cache(self):
+        url = OBSTexExport.api_url_txt + '/en/obs-en.json'
+        disk_cache = OBSCacheManager(self.cache_dir)
+        disk_cache.put('http', url, '{"language": "en", "title": "\u00e9"}'.encode('utf-8'))
+
+        # found on disk, so there is no network access
+        self.assertEqual('{"language": "en", "title": "\u00e9"}', OBSExportCache(disk_cache=disk_cache).get_url(url))
+
+    def test_unique_temp_dirs(self):
+        with OBSTexExport('en', os.path.join(self.temp_dir, 'a.tex'), 0, '360px', '1') as first:
+            with OBSTexExport('en', os.path.join(self.temp_dir, 'b.tex'), 0, '360px', '1') as second:
+                self.assertNotEqual(first.temp_dir, second.temp_dir)
+                self.assertTrue(os.path.isdir(first.temp_dir))
+
+            self.assertFalse(os.path.exists(second.temp_dir))
+            self.assertTrue(os.path.isdir(first.temp_dir))
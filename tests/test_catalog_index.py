@@ -0,0 +1,132 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.catalog_index import OBSCatalogIndex
+from obs.obs_classes import OBSManifest, OBSManifestEncoder
+
+
+class TestOBSCatalogIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-catalog-')
+        self.catalog_dir = os.path.join(self.temp_dir, 'catalog')
+        self.index = OBSCatalogIndex(os.path.join(self.temp_dir, 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_json(self, lang, file_name, obj, cls=None):
+        path = os.path.join(self.catalog_dir, lang, file_name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with codecs.open(path, 'w', encoding='utf-8') as out_file:
+            out_file.write(json.dumps(obj, cls=cls, sort_keys=True))
+        return path
+
+    def write_manifest(self, lang, level, pub_date, source='en'):
+        manifest = OBSManifest()
+        manifest.language = {'slug': lang, 'name': lang.upper(), 'dir': 'ltr'}
+        manifest.resource['status']['checking_level'] = level
+        manifest.resource['status']['pub_date'] = pub_date
+        if source:
+            manifest.resource['status']['source_translations'] = [
+                {'language_slug': source, 'resource_slug': 'obs', 'version': '4'}]
+        return self.write_json(lang, 'manifest.json', manifest, OBSManifestEncoder)
+
+    def test_scan_and_query(self):
+        self.write_manifest('fr', '3', '2016-07-28')
+        self.write_manifest('de', '3', '2015-01-01')
+        self.write_manifest('es', '1', '2017-02-01')
+        status_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'status.json')
+        os.makedirs(os.path.join(self.catalog_dir, 'hu'))
+        shutil.copy(status_file, os.path.join(self.catalog_dir, 'hu', 'status.json'))
+
+        counts = self.index.scan(self.catalog_dir)
+        self.assertEqual(4, counts['added'])
+
+        self.assertEqual(['de', 'fr', 'hu'], self.index.get_languages(checking_level=3))
+        self.assertEqual(['fr', 'hu'], self.index.get_languages(checking_level='3', published_after='2016-01-01'))
+        self.assertEqual(['es', 'fr', 'hu'], self.index.get_languages(published_after='20160101'))
+        self.assertEqual(['de'], self.index.get_languages(published_before='2016-01-01'))
+        self.assertEqual(['hu'], self.index.get_languages(version='4.1'))
+
+        rows = self.index.query(lang='hu')
+        self.assertEqual(1, len(rows))
+        self.assertEqual('status', rows[0]['kind'])
+        self.assertEqual('2016-07-28', rows[0]['publish_date'])
+        self.assertEqual('en', rows[0]['source_text'])
+
+        fr = self.index.query(lang='fr')[0]
+        self.assertEqual('manifest', fr['kind'])
+        self.assertEqual('FR', fr['lang_name'])
+        self.assertEqual(3, fr['checking_level'])
+
+    def test_incremental_update(self):
+        fr_file = self.write_manifest('fr', '1', '2016-07-28')
+        es_file = self.write_manifest('es', '1', '2016-07-28')
+        self.assertEqual(2, self.index.scan(self.catalog_dir)['added'])
+
+        # touched, but the same content
+        os.utime(fr_file, (1, 1))
+        counts = self.index.scan(self.catalog_dir)
+        self.assertEqual((0, 2), (counts['updated'], counts['unchanged']))
+
+        self.write_manifest('fr', '2', '2016-07-28')
+        os.utime(fr_file, (2, 2))
+        os.remove(es_file)
+        counts = self.index.scan(self.catalog_dir)
+        self.assertEqual((1, 0, 1), (counts['updated'], counts['unchanged'], counts['removed']))
+        self.assertEqual(['fr'], self.index.get_languages(min_checking_level=2))
+        self.assertEqual([], self.index.query(lang='es'))
+
+    def test_bad_filters(self):
+        self.write_manifest('fr', '3', '2016-07-28')
+        self.index.scan(self.catalog_dir)
+
+        self.assertRaises(ValueError, self.index.query, checking_level='three')
+        self.assertRaises(ValueError, self.index.query, min_checking_level='3a')
+        self.assertRaises(ValueError, self.index.query, published_after='July 2016')
+        self.assertRaises(ValueError, self.index.query, published_before='2016')
+        self.assertEqual(['fr'], self.index.get_languages(checking_level='', published_after=None))
+
+    def test_no_source_translation(self):
+        self.write_manifest('fr', '1', '2016-07-28', source=None)
+        self.index.scan(self.catalog_dir)
+
+        self.assertIsNone(self.index.query(lang='fr')[0]['source_text'])
+        self.assertEqual([], self.index.get_languages(source_text='en'))
+
+    def test_bad_file(self):
+        self.write_json('xx', 'status.json', {'comments': 'no checking level'})
+        counts = self.index.scan(self.catalog_dir)
+        self.assertEqual(1, counts['failed'])
+        self.assertEqual(1, len(self.index.errors))
+        self.assertEqual([], self.index.query())
+
+    def test_file_becomes_bad(self):
+        path = self.write_manifest('fr', '3', '2016-07-28')
+        self.assertEqual(1, self.index.scan(self.catalog_dir)['added'])
+
+        with codecs.open(path, 'w', encoding='utf-8') as out_file:
+            out_file.write('{ not json')
+        counts = self.index.scan(self.catalog_dir)
+        self.assertEqual(1, counts['failed'])
+        self.assertEqual([], self.index.query(lang='fr'))
+
+    def test_listed_contributors(self):
+        self.write_json('hu', 'status.json', {'checking_entity': ['Wycliffe', 'SIL'], 'checking_level': '3',
+                                              'comments': '', 'contributors': ['Ann', 'Bob'], 'license': '',
+                                              'publish_date': '20160728', 'source_text': 'en',
+                                              'source_text_version': '4', 'version': '4.1'})
+        self.write_manifest('fr', '3', '2016-07-28')
+        counts = self.index.scan(self.catalog_dir)
+
+        self.assertEqual(2, counts['added'])
+        row = self.index.query(lang='hu')[0]
+        self.assertEqual('Ann, Bob', row['contributors'])
+        self.assertEqual('Wycliffe, SIL', row['checking_entity'])
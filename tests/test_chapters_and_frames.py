@@ -1,5 +1,6 @@
 from __future__ import print_function, unicode_literals
 from unittest import TestCase
+from obs import chapters_and_frames
 from obs.chapters_and_frames import frame_counts
 
 
@@ -15,3 +16,45 @@ class TestChaptersAndFrames(TestCase):
 
         # the last chapter should have 17 frames
         self.assertEqual(17, frame_counts[49])
+
+    def test_frame_tables(self):
+        self.assertEqual(598, chapters_and_frames.total_frames)
+        self.assertEqual(598, len(chapters_and_frames.frame_ids))
+        self.assertEqual(51, len(chapters_and_frames.chapter_offsets))
+        self.assertEqual(16, chapters_and_frames.chapter_offsets[1])
+        self.assertEqual(['01-01', '01-16'], [chapters_and_frames.chapter_frame_ids[0][0],
+                                              chapters_and_frames.chapter_frame_ids[0][-1]])
+
+        # ids and indexes round trip
+        for index, frame_id in enumerate(chapters_and_frames.frame_ids):
+            self.assertEqual(index, chapters_and_frames.get_frame_index(frame_id))
+            self.assertEqual(frame_id, chapters_and_frames.get_frame_id(index))
+
+        self.assertEqual(16, chapters_and_frames.get_frame_index('02-01'))
+        self.assertEqual(-1, chapters_and_frames.get_frame_index('01-17'))
+
+        # the tables cannot be changed
+        with self.assertRaises(TypeError):
+            chapters_and_frames.frame_indexes['99-99'] = 0
+
+    def test_missing_frames(self):
+        all_ids = chapters_and_frames.frame_ids
+        bitmaps = {
+            'en': chapters_and_frames.get_presence_bitmap(all_ids),
+            'fr': chapters_and_frames.get_presence_bitmap([f for f in all_ids if f not in ('01-02', '50-17')]),
+            'xx': chapters_and_frames.get_presence_bitmap(['01-01', 'not-a-frame'])
+        }
+
+        missing = chapters_and_frames.get_missing_frames(bitmaps)
+        self.assertEqual([], missing['en'])
+        self.assertEqual(['01-02', '50-17'], missing['fr'])
+        self.assertEqual(list(all_ids[1:]), missing['xx'])
+        self.assertEqual({}, chapters_and_frames.get_missing_frames({}))
+
+        # the same result without NumPy
+        numpy = chapters_and_frames.numpy
+        chapters_and_frames.numpy = None
+        try:
+            self.assertEqual(missing, chapters_and_frames.get_missing_frames(bitmaps))
+        finally:
+            chapters_and_frames.numpy = numpy
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.corpus import OBSCorpus
+from obs.obs_classes import OBS, OBSChapter, OBSEncoder
+
+
+class TestOBSCorpus(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-corpus-')
+        content_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+
+        hu = OBS()
+        hu.language = 'hu'
+        hu.chapters = [OBSChapter.from_ts_directory(os.path.join(content_dir, str(x).zfill(2)), x)
+                       for x in range(1, 51)]
+
+        # a second, incomplete language
+        ar = OBS()
+        ar.language = 'ar'
+        ar.direction = 'rtl'
+        chapter = OBSChapter()
+        chapter.number = '02'
+        chapter.title = 'الخطية'
+        chapter.frames = [{'id': '02-03', 'img': '', 'text': 'نص'}]
+        ar.chapters = [chapter]
+
+        self.obs_list = [hu, ar]
+        self.file_name = os.path.join(self.temp_dir, 'obs.corpus')
+        OBSCorpus.write(self.file_name, self.obs_list)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        # compare with the JSON model, after a JSON round trip
+        json_file = os.path.join(self.temp_dir, 'obs-hu.json')
+        with codecs.open(json_file, 'w', encoding='utf-8') as out_file:
+            out_file.write(json.dumps(self.obs_list[0], cls=OBSEncoder))
+        hu = OBS(json_file)
+
+        with OBSCorpus(self.file_name) as corpus:
+            self.assertEqual([{'language': 'hu', 'direction': 'ltr'}, {'language': 'ar', 'direction': 'rtl'}],
+                             corpus.languages)
+
+            for chapter in hu.chapters:
+                self.assertEqual(chapter['title'], corpus.get_title('hu', chapter['number']))
+                self.assertEqual(chapter['ref'], corpus.get_ref('hu', chapter['number']))
+                for frame in chapter['frames']:
+                    chapter_number, frame_number = frame['id'].split('-')
+                    self.assertEqual(frame['text'], corpus.get_frame('hu', chapter_number, frame_number))
+
+            frames = list(corpus.iter_frames('hu'))
+            self.assertEqual(598, len(frames))
+            self.assertEqual(('50-17', hu.chapters[49]['frames'][16]['text']), frames[-1])
+
+            self.assertEqual('نص', corpus.get_frame('ar', 2, 3))
+            self.assertEqual('', corpus.get_frame('ar', 2, 4))
+            self.assertEqual('الخطية', corpus.get_title('ar', 2))
+            self.assertEqual('', corpus.get_title('ar', 1))
+
+            self.assertRaises(IndexError, corpus.get_frame, 'hu', 1, 17)
+            self.assertRaises(KeyError, corpus.get_frame, 'xx', 1, 1)
+
+    def test_not_a_corpus(self):
+        json_file = os.path.join(self.temp_dir, 'obs-hu.json')
+        with codecs.open(json_file, 'w', encoding='utf-8') as out_file:
+            out_file.write(json.dumps(self.obs_list[0], cls=OBSEncoder))
+
+        self.assertRaises(IOError, OBSCorpus, json_file)
+
+    def test_empty_and_truncated(self):
+        with open(self.file_name, 'rb') as in_file:
+            content = in_file.read()
+
+        # empty, part of the header, part of the offsets, and part of the text
+        for size in (0, 10, OBSCorpus.header_size + 100, len(content) - 1):
+            truncated_file = os.path.join(self.temp_dir, 'truncated-{0}.corpus'.format(size))
+            with open(truncated_file, 'wb') as out_file:
+                out_file.write(content[0:size])
+
+            self.assertRaises(IOError, OBSCorpus, truncated_file)
+
+    def test_benchmark(self):
+        with OBSCorpus(self.file_name) as corpus:
+            results = corpus.benchmark(lookups=1000)
+
+        self.assertEqual(1000, results['random_lookups'])
+        self.assertEqual(2 * 598, results['scanned_frames'])
@@ -0,0 +1,55 @@
+from __future__ import print_function, unicode_literals
+import copy
+from unittest import TestCase
+from obs.diff import OBSDiff
+from obs.obs_classes import OBS, OBSChapter
+
+
+class TestOBSDiff(TestCase):
+
+    @staticmethod
+    def get_obs():
+        obs_obj = OBS()
+        obs_obj.language = 'en'
+        for number in ['01', '02']:
+            chapter = OBSChapter()
+            chapter.number = number
+            chapter.title = 'Chapter {0}'.format(number)
+            chapter.ref = 'A Bible story from: Genesis {0}'.format(number)
+            chapter.frames = [{'id': '{0}-0{1}'.format(number, x), 'img': '', 'text': 'Frame {0} text.'.format(x)}
+                              for x in range(1, 4)]
+            obs_obj.chapters.append(chapter)
+        return obs_obj
+
+    def test_no_changes(self):
+        diff = OBSDiff(TestOBSDiff.get_obs(), TestOBSDiff.get_obs())
+        self.assertFalse(diff.has_changes())
+        self.assertEqual([], diff.changed_chapters())
+        self.assertEqual('No changes', str(diff))
+
+    def test_changes(self):
+        old_obs = TestOBSDiff.get_obs()
+        new_obs = copy.deepcopy(old_obs)
+        new_obs.chapters[0].frames[1]['text'] = 'Frame 2 new text here.'
+        new_obs.chapters[0].frames.pop()
+        new_obs.chapters[1].frames.append({'id': '02-04', 'img': '', 'text': 'Frame 4 text.'})
+        new_obs.chapters[1].ref = 'A Bible story from: Genesis 3'
+
+        diff = OBSDiff(old_obs, new_obs, word_detail=True)
+
+        self.assertTrue(diff.has_changes())
+        self.assertEqual(['01-02'], diff.changed['frames'])
+        self.assertEqual(['01-03'], diff.removed['frames'])
+        self.assertEqual(['02-04'], diff.added['frames'])
+        self.assertEqual(['02'], diff.changed['refs'])
+        self.assertEqual([], diff.changed['titles'])
+        self.assertEqual(['01', '02'], diff.changed_chapters())
+
+        # word detail only for the changed frame
+        self.assertEqual(['01-02'], list(diff.words.keys()))
+        self.assertEqual([{'op': 'replace', 'old': 'text.', 'new': 'new text here.'}],
+                         [dict(c) for c in diff.words['01-02']])
+
+        serialized = diff.to_serializable()
+        self.assertEqual(['01', '02'], serialized['changed_chapters'])
+        self.assertIn('Changed frames: 01-02', str(diff))
@@ -0,0 +1,186 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase, skipIf
+from obs.obs_classes import OBS, OBSChapter, OBSEncoder
+from tests.tex_fixtures import preload_json, use_snippets
+
+# the service uses async and await, which do not parse before Python 3.5
+if sys.version_info >= (3, 5):
+    import asyncio
+    from obs.export_service import ExportService
+
+
+@skipIf(sys.version_info < (3, 5), 'The export service requires Python 3.5 or newer')
+class TestExportService(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-service-')
+        self.socket_path = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+        self.service = ExportService(max_concurrent=2, max_queue=10)
+        self.service.lang_names = {'en': 'English'}
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.service.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def start(self, path=None):
+        asyncio.run_coroutine_threadsafe(self.service.start(path=path), self.loop).result(10)
+
+    def request(self, method, path, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        if self.socket_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+        else:
+            sock = socket.create_connection(self.service.address[0:2])
+
+        sock.sendall('{0} {1} HTTP/1.1\r\nContent-Length: {2}\r\n\r\n'.format(method, path, len(body))
+                     .encode('latin-1') + body)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+        sock.close()
+
+        head, content = response.split(b'\r\n\r\n', 1)
+        return int(head.split()[1]), json.loads(content.decode('utf-8'))
+
+    def wait_for(self, job_id):
+        for _ in range(500):
+            status, job = self.request('GET', '/jobs/{0}'.format(job_id))
+            if job['finished']:
+                return job
+            time.sleep(0.01)
+        self.fail('Job {0} did not finish.'.format(job_id))
+
+    @staticmethod
+    def get_obs(frame_text='In the beginning, God created everything.'):
+        obs_obj = OBS()
+        obs_obj.language = 'en'
+        chapter = OBSChapter()
+        chapter.number = '01'
+        chapter.title = '1. The Creation'
+        chapter.ref = 'A Bible story from: Genesis 1-2'
+        chapter.frames = [{'id': '01-{0}'.format(str(x).zfill(2)), 'img': 'x', 'text': frame_text}
+                          for x in range(1, 17)]
+        obs_obj.chapters = [chapter]
+        return obs_obj
+
+    def test_verify_job(self):
+        self.start()
+        file_name = os.path.join(self.temp_dir, 'obs-en.json')
+        with codecs.open(file_name, 'w', encoding='utf-8') as out_file:
+            out_file.write(json.dumps(TestExportService.get_obs(), cls=OBSEncoder))
+
+        status, job = self.request('POST', '/jobs', {'type': 'verify', 'file_name': file_name})
+        self.assertEqual(202, status)
+        self.assertEqual('queued', job['status'])
+
+        job = self.wait_for(job['id'])
+        self.assertEqual('done', job['status'])
+        self.assertTrue(job['result']['verified'])
+        self.assertEqual('English', job['result']['language_name'])
+
+        status, metrics = self.request('GET', '/metrics')
+        self.assertEqual(200, status)
+        self.assertEqual(1, metrics['completed'])
+        self.assertEqual(0, metrics['queue_depth'])
+
+    def test_failed_and_bad_jobs(self):
+        self.start()
+
+        status, job = self.request('POST', '/jobs', {'type': 'verify', 'file_name': '/not/a/file.json'})
+        job = self.wait_for(job['id'])
+        self.assertEqual('failed', job['status'])
+        self.assertIn('was not found', job['error'])
+
+        self.assertEqual(400, self.request('POST', '/jobs', {'type': 'compile'})[0])
+        self.assertEqual(400, self.request('POST', '/jobs', {'type': 'export', 'lang': 'en'})[0])
+        self.assertEqual(400, self.request('POST', '/jobs', ['verify'])[0])
+        self.assertEqual(404, self.request('GET', '/jobs/9999')[0])
+        self.assertEqual(405, self.request('DELETE', '/metrics')[0])
+        self.assertEqual(1, self.request('GET', '/metrics')[1]['failed'])
+
+    def test_base_dir(self):
+        self.service.base_dir = os.path.join(self.temp_dir, 'files')
+        self.start()
+
+        for params in [{'type': 'verify', 'file_name': '/not/a/file.json'},
+                       {'type': 'verify', 'file_name': os.path.join(self.temp_dir, 'files', '..', 'obs-en.json')},
+                       {'type': 'export', 'lang': 'en', 'out_path': os.path.join(self.temp_dir, 'en.tex')},
+                       {'type': 'export', 'lang': 'en', 'out_path': ['en.tex']}]:
+            status, error = self.request('POST', '/jobs', params)
+            self.assertEqual(400, status)
+            self.assertIn('must be a file in', error['error'])
+
+        status, job = self.request('POST', '/jobs', {'type': 'verify',
+                                                     'file_name': os.path.join(self.temp_dir, 'files', 'obs-en.json')})
+        self.assertEqual(202, status)
+        self.assertIn('was not found', self.wait_for(job['id'])['error'])
+
+    def test_unexpected_error(self):
+        def route(method, path, body):
+            raise RuntimeError('broken')
+
+        self.service.route = route
+        self.start()
+        self.assertEqual((500, {'error': 'RuntimeError: broken'}), self.request('GET', '/metrics'))
+
+    def test_export_job_uses_warm_cache(self):
+        use_snippets(self, self.temp_dir)
+
+        # pre-load the fetched JSON so the export runs without network access
+        preload_json(self.service.cache, 'en', TestExportService.get_obs())
+
+        self.start()
+        out_paths = [os.path.join(self.temp_dir, 'out', 'en-{0}.tex'.format(x)) for x in range(3)]
+        jobs = [self.request('POST', '/jobs', {'type': 'export', 'lang': 'en', 'out_path': p})[1] for p in out_paths]
+        jobs = [self.wait_for(job['id']) for job in jobs]
+
+        self.assertEqual(['done'] * 3, [job['status'] for job in jobs])
+        for out_path in out_paths:
+            with codecs.open(out_path, 'r', encoding='utf-8') as in_file:
+                content = in_file.read()
+            self.assertIn('% OBS', content)
+            self.assertIn('FIGURE: en-01-16', content)
+
+        metrics = self.request('GET', '/metrics')[1]
+        self.assertEqual(3, metrics['completed'])
+        self.assertEqual(8, metrics['cached_files'])
+        self.assertEqual(3, metrics['cached_urls'])
+
+        # a preview decodes only the exported chapters, with a chapter index kept in the json dir of the service
+        job = self.request('POST', '/jobs', {'type': 'export', 'lang': 'en', 'max_chapters': 1,
+                                             'out_path': os.path.join(self.temp_dir, 'out', 'en-preview.tex')})[1]
+        job = self.wait_for(job['id'])
+
+        self.assertEqual('done', job['status'])
+        self.assertTrue(os.path.isfile(os.path.join(self.service.json_dir, 'obs-en.json.idx')))
+
+    def test_unix_socket(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            return
+
+        self.socket_path = os.path.join(self.temp_dir, 'service.sock')
+        self.start(path=self.socket_path)
+
+        status, metrics = self.request('GET', '/metrics')
+        self.assertEqual(200, status)
+        self.assertEqual(0, metrics['completed'])
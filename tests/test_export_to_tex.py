@@ -0,0 +1,132 @@
+from __future__ import print_function, unicode_literals
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import timeit
+from unittest import TestCase
+from obs.export_to_tex import OBSExportCache, OBSTexExport
+from tests.tex_fixtures import preload_json, use_snippets
+
+
+class TestOBSTexExportPatterns(TestCase):
+
+    # the original patterns, which are correct but can take cubic time, with their replacements
+    reference_patterns = {
+        'matchHeadingFourLevelPat': (r"(\A|[^=])====+\s*(.*?)\s*===+?([^=]|\Z)", r'\1{H \2}\3',
+                                     r'\g<pre>{H \g<text>}\g<post>'),
+        'matchHeadingThreeLevelPat': (r"(\A|[^=])===+\s*(.*?)\s*==+?([^=]|\Z)", r'\1{H \2}\3',
+                                      r'\g<pre>{H \g<text>}\g<post>'),
+        'matchHeadingTwoLevelPat': (r"(\A|[^=])==+\s*(.*?)\s*==+?([^=]|\Z)", r'\1{H \2}\3',
+                                    r'\g<pre>{H \g<text>}\g<post>'),
+        'matchHeadingOneLevelPat': (r"(\A|[^=])=+\s*(.*?)\s*=+?([^=]|\Z)", r'\1{H \2}\3',
+                                    r'\g<pre>{H \g<text>}\g<post>'),
+        'matchSectionPat': (r"==+\s*(.*?)\s*==+", r'{\1}', r'{\g<text>}'),
+        'matchBoldPat': (r"[*][*]\s*(.*?)\s*[*][*]", r'{\1}', r'{\g<text>}'),
+        'matchItalicPat': (r"(?:\A|[^:])//\s*(.*?)\s*//", r'{\1}', r'{\g<text>}'),
+        'matchUnderLinePat': (r"__\s*(.*?)\s*__", r'{\1}', r'{\g<text>}'),
+        'matchRedPat': (r"<red>\s*(.*?)\s*</red>", r'{\1}', r'{\g<text>}'),
+        'matchURLPat': (r"[(]*\s*[\[][\[]\s*http(s*://[^|\[\]]*?)\s*[|]\s*http(s*[^\[\]]*?)\s*[\]][\]][).,]*",
+                        r'{\1|\2}', r'{\g<url>|\g<url2>}'),
+        'matchURLandTextPat': (r"[(]*\s*[\[][\[]\s*http(s*://[^|\[\]]*?)\s*[|]\s*([^\[\]]*?)\s*[\]][\]][).,]*",
+                               r'{\1|\2}', r'{\g<url>|\g<text>}'),
+        'matchPatLongURL': (r"[(]*http(s*://[/\w\d,.?&_=+-]{41,9999})[).,]*", r'{\1}', r'{\g<url>}'),
+        'matchPatURL': (r"[(]*http(s*://[/\w\d,.?&_=+-]+)[).,]*", r'{\1}', r'{\g<url>}')
+    }
+
+    fuzz_tokens = ['=', '==', '====', ' ', '  ', '\n', 'a', 'x y', '*', '**', '/', '//', ':', '__', '<red>', '</red>',
+                   '[', '[[', ']', ']]', '|', '(', ')', '.', ',', 'http', 's', '://', 'http://example.com/a?b=1',
+                   'http://' + 'a' * 45]
+
+    # each is repeated to the test length, or put before a long run of blanks
+    adversarial_pieces = ['=', '= ', '==x', '==== x ', '[[', '[[http://', '[[http://a|', '[[http://a| ', '*', '** ',
+                          '(', '//', '__', 'http', 'https']
+
+    def test_same_results_as_reference(self):
+        rand = random.Random(1)
+
+        for _ in range(3000):
+            text = ''.join(rand.choice(self.fuzz_tokens) for _ in range(rand.randint(0, 20)))
+
+            for name, (reference, reference_replace, replace) in self.reference_patterns.items():
+                expected = re.sub(reference, reference_replace, text, flags=re.UNICODE)
+                actual = getattr(OBSTexExport, name).sub(replace, text)
+                self.assertEqual(expected, actual, '{0} changed the result for {1!r}'.format(name, text))
+
+    def test_examples(self):
+        self.assertEqual('{\\bf bold} text', OBSTexExport.filter_apply_docuwiki('** bold ** text'))
+        self.assertEqual('{\\bfb Title}', OBSTexExport.filter_apply_docuwiki('== Title =='))
+        self.assertEqual('x{\\bfd A = B}y', OBSTexExport.filter_apply_docuwiki('x==== A = B ====y'))
+        self.assertEqual('({{\\goto{Door43}[url(https://door43.org)]}})',
+                         OBSTexExport.filter_apply_docuwiki_and_links('see ([[https://door43.org | Door43]]).')[4:])
+
+    def test_worst_case_scaling(self):
+
+        def get_seconds(pattern, text):
+            return min(timeit.repeat(lambda: pattern.sub('', text), number=1, repeat=3))
+
+        for name in self.reference_patterns:
+            pattern = getattr(OBSTexExport, name)
+
+            for piece in self.adversarial_pieces:
+                for get_text in (lambda n: piece * (n // len(piece)), lambda n: piece + ' ' * n + 'x'):
+                    short_time = get_seconds(pattern, get_text(2000))
+                    long_time = get_seconds(pattern, get_text(8000))
+
+                    # 4 times the input: linear is 4 times slower, quadratic 16 and cubic 64
+                    self.assertLess(long_time, 8 * short_time + 0.02,
+                                    '{0} is not linear for {1!r}: {2:.4f}s then {3:.4f}s'.format(
+                                        name, get_text(20), short_time, long_time))
+
+
+class TestOBSTexExportRender(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-render-')
+        self.json_dir = os.path.join(self.temp_dir, 'json')
+
+        use_snippets(self, self.temp_dir)
+
+        chapters = [{'number': number, 'title': 'Title {0}'.format(number), 'ref': 'Genesis {0}'.format(number),
+                     'frames': [{'id': '{0}-{1:02d}'.format(number, x), 'img': '', 'text': 'Frame {0}'.format(x)}
+                                for x in range(1, 5)]} for number in ('01', '02')]
+
+        # pre-load the fetched JSON so the export runs without network access
+        self.cache = OBSExportCache()
+        preload_json(self.cache, 'en', {'chapters': chapters, 'language': 'en', 'direction': 'ltr'})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def render(self, max_chapters, json_dir=None):
+        with OBSTexExport('en', os.path.join(self.temp_dir, 'en.tex'), max_chapters, '360px', '1', cache=self.cache,
+                          json_dir=json_dir) as exporter:
+            exporter.fetch()
+            tex = exporter.render()
+            temp_files = os.listdir(exporter.temp_dir)
+
+        return tex, temp_files
+
+    def test_render_whole_file(self):
+        tex, temp_files = self.render(0, self.json_dir)
+
+        self.assertIn('% OBS', tex)
+        self.assertIn('FIGURE: en-02-04', tex)
+        self.assertEqual([], [f for f in temp_files if f.endswith('.idx')])
+        self.assertFalse(os.path.exists(self.json_dir))
+
+    def test_partial_render_keeps_index(self):
+        tex, temp_files = self.render(1, self.json_dir)
+        self.assertIn('FIGURE: en-01-04', tex)
+        self.assertNotIn('en-02-01', tex)
+        self.assertEqual([], [f for f in temp_files if f.endswith('.idx')])
+
+        index_file = os.path.join(self.json_dir, 'obs-en.json.idx')
+        index_mtime = os.stat(index_file).st_mtime
+
+        # the same JSON is fetched again, so the kept file and its index are reused
+        time.sleep(0.01)
+        self.assertEqual(tex, self.render(1, self.json_dir)[0])
+        self.assertEqual(index_mtime, os.stat(index_file).st_mtime)
@@ -0,0 +1,93 @@
+from __future__ import print_function, unicode_literals
+import json
+from unittest import TestCase
+from obs.export_to_tex import OBSTexExport
+from obs.frame_store import OBSFrameStore
+from obs.obs_classes import OBS, OBSChapter, OBSEncoder
+from obs.tex_lint import OBSTexLinter
+
+
+class TestOBSFrameStore(TestCase):
+
+    @staticmethod
+    def get_obs(lang, texts):
+        obs_obj = OBS()
+        obs_obj.language = lang
+        chapter = OBSChapter()
+        chapter.number = '01'
+        chapter.title = '1. The Creation'
+        chapter.ref = 'A Bible story from: Genesis 1-2'
+        # build each text again, so the languages do not already share the objects
+        chapter.frames = [{'id': '01-{0:02d}'.format(i + 1), 'img': '', 'text': ''.join(list(t))}
+                          for i, t in enumerate(texts)]
+        obs_obj.chapters.append(chapter)
+        return obs_obj
+
+    def test_add(self):
+        store = OBSFrameStore()
+        first = store.add('In the beginning')
+        second = store.add(''.join(['In the ', 'beginning']))
+
+        self.assertIs(first, second)
+        self.assertEqual('', store.add(None))
+        self.assertEqual(2, store.counts[first])
+
+        # the store itself takes more memory than one duplicate saves
+        stats = store.get_stats()
+        self.assertGreater(stats['duplicate_memory'], 0)
+        self.assertEqual(store.get_overhead(), stats['overhead'])
+        self.assertEqual(stats['duplicate_memory'] - stats['overhead'], stats['memory_saved'])
+        self.assertLess(stats['memory_saved'], 0)
+
+    def test_add_obs(self):
+        store = OBSFrameStore()
+        fork = TestOBSFrameStore.get_obs('fork', ['Shared **one**', 'Changed', 'Shared three'])
+        fork_json = json.dumps(fork, cls=OBSEncoder, sort_keys=True)
+
+        obs_list = [TestOBSFrameStore.get_obs('main', ['Shared **one**', 'Original', 'Shared three']), fork]
+        for obs_obj in obs_list:
+            store.add_obs(obs_obj)
+
+        # the JSON output is not changed
+        self.assertEqual(fork_json, json.dumps(fork, cls=OBSEncoder, sort_keys=True))
+
+        main_frames, fork_frames = [o.chapters[0].frames for o in obs_list]
+        self.assertIs(main_frames[0]['text'], fork_frames[0]['text'])
+        self.assertIs(main_frames[2]['text'], fork_frames[2]['text'])
+        self.assertIs(obs_list[0].chapters[0].title, fork.chapters[0].title)
+
+        stats = store.get_stats()
+        self.assertEqual(6, stats['unique_texts'])
+        self.assertEqual(10, stats['references'])
+        self.assertAlmostEqual(10.0 / 6, stats['dedup_ratio'])
+        self.assertEqual(stats['total_bytes'] - stats['unique_bytes'], stats['bytes_saved'])
+        self.assertEqual(len('Shared **one**') + len('Shared three') + len('1. The Creation') +
+                         len('A Bible story from: Genesis 1-2'), stats['bytes_saved'])
+
+    def test_memoized_results(self):
+        store = OBSFrameStore()
+        text = '50% **bold** and <red>red</red>'
+
+        self.assertEqual(OBSTexExport.filter_apply_docuwiki(OBSTexLinter.escape(text)), store.tex_filter(text))
+        self.assertEqual(store.tex_filter(text), store.tex_filter(''.join(list(text))))
+        self.assertEqual((2, 1), (store.hits, store.misses))
+
+        self.assertEqual(['Unbalanced ** in frame 01-01'], store.lint('**a', 'frame 01-01'))
+        self.assertEqual(['Unbalanced ** in frame 02-02'], store.lint('**a', 'frame 02-02'))
+        self.assertEqual((3, 2), (store.hits, store.misses))
+
+        chapters = [{'number': '01', 'title': '1. **Title', 'ref': 'Genesis 1', 'frames': [
+                        {'id': '01-01', 'text': 'Bad </red>'}, {'id': '01-02', 'text': 'Bad </red>'}]}]
+        self.assertEqual(OBSTexLinter.get_errors(chapters), OBSTexLinter.get_errors(chapters, store=store))
+        self.assertEqual((4, 5), (store.hits, store.misses))
+
+    def test_results_are_capped(self):
+        store = OBSFrameStore(max_results=3)
+        for number in range(5):
+            self.assertEqual('{0}!'.format(number), store.memoize('bang', lambda t: t + '!', '{0}'.format(number)))
+
+        # cleared when the fourth result was added
+        self.assertEqual(2, len(store.results))
+        self.assertEqual('4!', store.memoize('bang', lambda t: t + '?', '4'))
+        self.assertEqual((1, 5), (store.hits, store.misses))
+        self.assertEqual(2, store.get_stats()['memo_results'])
@@ -0,0 +1,157 @@
+from __future__ import print_function, unicode_literals
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase, skipIf
+from obs.cache_manager import OBSCacheManager
+from obs.obs_classes import OBS
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+# the checker uses async and await, which do not parse before Python 3.5
+if sys.version_info >= (3, 5):
+    from obs.image_checker import ImageChecker
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    missing = ('/obs/jpg/2160px/obs-en-01-02.jpg',)
+
+    def do_HEAD(self):
+        self.server.requests.append(self.path)
+        self.send_response(404 if self.path in ImageRequestHandler.missing else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    # noinspection PyShadowingBuiltins
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@skipIf(sys.version_info < (3, 5), 'The image checker requires Python 3.5 or newer')
+class TestImageChecker(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), ImageRequestHandler)
+        self.server.requests = []
+        self.server.connections = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:{0}/obs/jpg/360px/obs-en-{{0}}.jpg'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def get_obs(self, lang, frame_count):
+        obs_obj = OBS()
+        obs_obj.language = lang
+        frames = []
+        for x in range(1, frame_count + 1):
+            frame_id = '01-{0}'.format(str(x).zfill(2))
+            frames.append({'id': frame_id, 'img': self.base_url.format(frame_id), 'text': 'text'})
+        obs_obj.chapters = [{'number': '01', 'title': 'title', 'ref': 'ref', 'frames': frames}]
+        return obs_obj
+
+    def test_get_image_urls(self):
+        checker = ImageChecker()
+        urls = checker.get_image_urls([self.get_obs('en', 3), self.get_obs('fr', 2)])
+        checker.close()
+
+        # 3 frames in 2 resolutions, shared by both languages
+        self.assertEqual(6, len(urls))
+        url = self.base_url.format('01-01')
+        self.assertEqual([('en', '01-01'), ('fr', '01-01')], urls[url])
+        self.assertIn(url.replace('/360px/', '/2160px/'), urls)
+
+    def test_get_errors(self):
+        checker = ImageChecker(max_concurrent=4, rate=0)
+        obs_list = [self.get_obs('en', 8), self.get_obs('fr', 8), self.get_obs('es', 4)]
+
+        errors = checker.get_errors(obs_list)
+        self.assertEqual(3, len(errors))
+        self.assertTrue(errors[0].startswith('Image not found for frame 01-02 (en): '))
+        self.assertTrue(errors[0].endswith('/2160px/obs-en-01-02.jpg returned 404'))
+
+        # each unique URL is requested once, over reused connections
+        self.assertEqual(16, len(self.server.requests))
+        self.assertEqual(16, len(set(self.server.requests)))
+        self.assertLessEqual(self.server.connections, 4)
+
+        # the second check is answered from the cache
+        self.assertEqual(errors, checker.get_errors(obs_list))
+        self.assertEqual(16, len(self.server.requests))
+
+        # expired results are checked again
+        checker.ttl = 0
+        checker.get_errors([self.get_obs('en', 1)])
+        self.assertEqual(18, len(self.server.requests))
+        checker.close()
+
+    def test_disk_cache(self):
+        cache_dir = tempfile.mkdtemp(prefix='obs-images-')
+        try:
+            obs_list = [self.get_obs('en', 4)]
+            checker = ImageChecker(rate=0, disk_cache=OBSCacheManager(cache_dir))
+            errors = checker.get_errors(obs_list)
+            checker.close()
+            self.assertEqual(8, len(self.server.requests))
+
+            # another checker, like a later run, uses the results saved by the first one
+            checker = ImageChecker(rate=0, disk_cache=OBSCacheManager(cache_dir))
+            self.assertEqual(errors, checker.get_errors(obs_list))
+            checker.close()
+            self.assertEqual(8, len(self.server.requests))
+            self.assertEqual(8, checker.disk_cache.get_stats()['namespaces']['images']['hits'])
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_obs_get_errors(self):
+        checker = ImageChecker(rate=0)
+        obs_obj = self.get_obs('en', 2)
+
+        errors = obs_obj.get_errors(image_checker=checker)
+        checker.close()
+
+        # the chapter is incomplete, and one image is missing
+        self.assertIn('Frame not found: 01-16', errors)
+        self.assertEqual(1, len([e for e in errors if e.startswith('Image not found')]))
+
+    def test_unreachable_server(self):
+        checker = ImageChecker(rate=0, timeout=1)
+        obs_obj = OBS()
+        obs_obj.language = 'en'
+        obs_obj.chapters = [{'frames': [{'id': '01-01', 'img': 'http://127.0.0.1:1/obs/jpg/360px/obs-en-01-01.jpg'}]}]
+
+        errors = checker.get_errors([obs_obj], resolutions=['360px'])
+        checker.close()
+        self.assertEqual(1, len(errors))
+        self.assertTrue(errors[0].endswith('returned no response'))
+        self.assertEqual({}, checker.cache)
+
+    def test_rate_limit(self):
+        checker = ImageChecker(rate=50)
+        obs_obj = self.get_obs('en', 5)
+
+        start = time.time()
+        checker.get_errors([obs_obj], resolutions=['360px'])
+        checker.close()
+
+        # 5 requests at 50 per second take at least 80ms
+        self.assertGreaterEqual(time.time() - start, 0.08)
@@ -0,0 +1,58 @@
+from __future__ import print_function, unicode_literals
+from unittest import TestCase
+from obs.layout_estimator import LayoutEstimator
+
+
+class TestLayoutEstimator(TestCase):
+
+    def test_to_points(self):
+        self.assertAlmostEqual(10.0, LayoutEstimator.to_points('10.0pt'))
+        self.assertAlmostEqual(72.27, LayoutEstimator.to_points('1in'))
+        self.assertAlmostEqual(28.45, LayoutEstimator.to_points('1cm'), places=2)
+        self.assertRaises(ValueError, LayoutEstimator.to_points, 'wide')
+
+    def test_text_height(self):
+        self.assertAlmostEqual(650.0, LayoutEstimator().text_height)
+        self.assertAlmostEqual(630.0, LayoutEstimator.from_body_json({'topspace': '48pt'}).text_height)
+        self.assertAlmostEqual(500.0, LayoutEstimator.from_body_json({'textheight': '500pt'}).text_height)
+
+    def test_count_lines(self):
+        estimator = LayoutEstimator()
+
+        self.assertEqual(0, estimator.count_lines(''))
+        self.assertEqual(1, estimator.count_lines('In the beginning.'))
+
+        # markup does not take any space
+        self.assertEqual(estimator.count_lines('God made the world.'),
+                         estimator.count_lines('**God** made the //world//.'))
+
+        # about 60 characters fit on a 308.9pt line at 10pt
+        self.assertEqual(5, estimator.count_lines(' '.join(['abcdefghi'] * 30)))
+
+        # scripts without spaces are broken anywhere
+        self.assertEqual(3, estimator.count_lines('\u4e00' * 70))
+
+    def test_page_fits(self):
+        estimator = LayoutEstimator.from_body_json({'textwidth': '308.9pt', 'bodysize': '10.0pt',
+                                                    'bodybaseline': '12.0pt'})
+        short_text = 'God created the world.'
+        long_text = ' '.join(['abcdefghi'] * 400)
+
+        self.assertTrue(estimator.page_fits(short_text, short_text, 'A Bible story from: Genesis 1-2'))
+        self.assertFalse(estimator.page_overflows(short_text, short_text))
+
+        self.assertFalse(estimator.page_fits(short_text, long_text))
+        self.assertTrue(estimator.page_overflows(short_text, long_text))
+
+    def test_find_overflows(self):
+        estimator = LayoutEstimator()
+        long_text = ' '.join(['abcdefghi'] * 400)
+        chapters = [{'number': '01', 'ref': 'ref', 'title': 'title',
+                     'frames': [{'id': '01-01', 'text': 'short'},
+                                {'id': '01-02', 'text': 'short'},
+                                {'id': '01-03', 'text': long_text}]},
+                    {'number': '02', 'ref': 'ref', 'title': 'title',
+                     'frames': [{'id': '02-01', 'text': long_text}]}]
+
+        self.assertEqual(['01-03', '02-01'], estimator.find_overflows(chapters))
+        self.assertEqual(['01-03'], estimator.find_overflows(chapters, max_chapters=1))
@@ -0,0 +1,89 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from obs.lazy_obs import LazyOBS
+from obs.obs_classes import OBS, OBSChapter, OBSEncoder
+
+
+class TestLazyOBS(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-lazy-')
+        content_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+
+        obs_obj = OBS()
+        obs_obj.language = 'hu'
+        obs_obj.app_words['chapters'] = 'Fejezetek "[{'
+        obs_obj.chapters = [OBSChapter.from_ts_directory(os.path.join(content_dir, str(x).zfill(2)), x)
+                            for x in range(1, 51)]
+        self.obs_json = json.dumps(obs_obj, sort_keys=True, indent=2, cls=OBSEncoder, ensure_ascii=False)
+
+        self.file_name = os.path.join(self.temp_dir, 'obs-hu.json')
+        with codecs.open(self.file_name, 'w', encoding='utf-8-sig') as out_file:
+            out_file.write(self.obs_json)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lazy_chapters(self):
+        obs_obj = LazyOBS(self.file_name)
+        full_obs = OBS(self.file_name)
+
+        self.assertEqual('hu', obs_obj.language)
+        self.assertEqual('Fejezetek "[{', obs_obj.app_words['chapters'])
+        self.assertEqual(50, len(obs_obj.chapters))
+        self.assertEqual(0, obs_obj.chapters.decoded_count)
+
+        # only the requested chapter is decoded
+        chapter = obs_obj.get_chapter(12)
+        self.assertEqual(full_obs.chapters[11], chapter)
+        self.assertEqual(1, obs_obj.chapters.decoded_count)
+        self.assertIsNone(obs_obj.get_chapter(51))
+
+        # the usual access patterns still work
+        self.assertEqual(full_obs.chapters[0:3], obs_obj.chapters[0:3])
+        self.assertEqual([c['number'] for c in full_obs.chapters], [c['number'] for c in obs_obj.chapters])
+        self.assertEqual([], obs_obj.get_errors())
+        self.assertEqual(json.loads(self.obs_json), json.loads(json.dumps(obs_obj, cls=OBSEncoder)))
+
+    def test_index_file(self):
+        index_file = self.file_name + '.idx'
+        LazyOBS(self.file_name)
+        self.assertTrue(os.path.isfile(index_file))
+
+        # the saved index is used the next time the file is opened
+        # from __dict__, so the staticmethod itself is restored and not an unbound method on Python 2.7
+        saved_build_index = LazyOBS.__dict__['build_index']
+        LazyOBS.build_index = None
+        try:
+            obs_obj = LazyOBS(self.file_name)
+        finally:
+            LazyOBS.build_index = saved_build_index
+        self.assertEqual('01', obs_obj.chapters[0]['number'])
+
+        # the index is rebuilt when the file changes
+        with codecs.open(self.file_name, 'w', encoding='utf-8') as out_file:
+            out_file.write(json.dumps({'language': 'hu', 'chapters': [{'number': '07', 'frames': []}]}))
+        obs_obj = LazyOBS(self.file_name)
+        self.assertEqual(1, len(obs_obj.chapters))
+        self.assertEqual({'number': '07', 'frames': []}, obs_obj.get_chapter('07'))
+
+    @skipIf(not hasattr(os.stat(__file__), 'st_mtime_ns'), 'Requires st_mtime_ns')
+    def test_index_same_size_and_second(self):
+        mtime_ns = 1500000000 * 10 ** 9
+        os.utime(self.file_name, ns=(mtime_ns, mtime_ns))
+        LazyOBS(self.file_name)
+
+        # a rewrite of the same size, one nanosecond later, has the same mtime as a float
+        with codecs.open(self.file_name, 'w', encoding='utf-8-sig') as out_file:
+            out_file.write(self.obs_json.replace('Fejezetek', 'Kapitolok'))
+        os.utime(self.file_name, ns=(mtime_ns + 1, mtime_ns + 1))
+
+        self.assertEqual('Kapitolok "[{', LazyOBS(self.file_name).app_words['chapters'])
+
+    def test_file_not_found(self):
+        self.assertRaises(IOError, LazyOBS, os.path.join(self.temp_dir, 'obs-xx.json'))
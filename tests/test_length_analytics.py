@@ -0,0 +1,76 @@
+from __future__ import print_function, unicode_literals
+from unittest import TestCase
+from obs import chapters_and_frames, length_analytics
+from obs.length_analytics import OBSLengthAnalytics
+from obs.obs_classes import OBS, OBSChapter
+
+
+class TestOBSLengthAnalytics(TestCase):
+
+    @staticmethod
+    def get_obs(lang, get_text):
+        obs_obj = OBS()
+        obs_obj.language = lang
+        for number, frame_ids in zip(chapters_and_frames.chapter_numbers, chapters_and_frames.chapter_frame_ids):
+            chapter = OBSChapter()
+            chapter.number = number
+            chapter.frames = [{'id': f, 'img': '', 'text': get_text(i, f)} for i, f in enumerate(frame_ids)]
+            obs_obj.chapters.append(chapter)
+        return obs_obj
+
+    def get_analytics(self):
+        en = TestOBSLengthAnalytics.get_obs('en', lambda i, f: 'word ' * (10 + i % 5))
+
+        # always a little longer than English, with one frame much longer
+        fr = TestOBSLengthAnalytics.get_obs('fr', lambda i, f: 'mots ' * (12 + i % 5) * (4 if f == '12-05' else 1))
+
+        # only a few frames translated
+        de = TestOBSLengthAnalytics.get_obs('de', lambda i, f: 'Wort ' * 10 if f.startswith('01-') else '')
+
+        return OBSLengthAnalytics([en, fr, de], z_limit=3.0)
+
+    def check_analytics(self, analytics):
+        summaries = dict((s['language'], s) for s in analytics.get_summaries())
+        self.assertEqual(['fr', 'de', 'en'], [s['language'] for s in analytics.get_summaries()])
+
+        self.assertEqual(598, summaries['en']['frames'])
+        self.assertAlmostEqual(1.0, summaries['en']['expansion'])
+        self.assertEqual([], summaries['en']['outliers'])
+        self.assertFalse(summaries['en']['needs_review'])
+
+        self.assertGreater(summaries['fr']['expansion'], 1.0)
+        self.assertEqual(['12-05'], summaries['fr']['outliers'])
+        self.assertIn('12-05', summaries['fr']['long_frames'])
+        self.assertTrue(summaries['fr']['needs_review'])
+        self.assertGreater(analytics.get_z_scores('fr')['12-05'], 3.0)
+
+        self.assertEqual(16, summaries['de']['frames'])
+        self.assertEqual(16, len(analytics.get_z_scores('de')))
+        self.assertNotIn('02-01', analytics.get_z_scores('de'))
+
+        return summaries
+
+    def test_analytics(self):
+        summaries = self.check_analytics(self.get_analytics())
+
+        # the pure Python statistics match
+        numpy = length_analytics.numpy
+        length_analytics.numpy = None
+        try:
+            python_summaries = self.check_analytics(self.get_analytics())
+        finally:
+            length_analytics.numpy = numpy
+
+        for lang in summaries:
+            self.assertEqual(summaries[lang]['outliers'], python_summaries[lang]['outliers'])
+            self.assertAlmostEqual(summaries[lang]['expansion'], python_summaries[lang]['expansion'])
+
+    def test_counts(self):
+        # markup is ignored, combining marks are part of the grapheme before them
+        self.assertEqual((7, 6, 2), OBSLengthAnalytics.get_counts('**e\u0301 abcd**'))
+        self.assertEqual((0, 0, 0), OBSLengthAnalytics.get_counts(None))
+
+    def test_bad_arguments(self):
+        en = TestOBSLengthAnalytics.get_obs('en', lambda i, f: 'word')
+        self.assertRaises(ValueError, OBSLengthAnalytics, [en], 'fr')
+        self.assertRaises(ValueError, OBSLengthAnalytics, [en], 'en', 'pages')
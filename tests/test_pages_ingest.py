@@ -0,0 +1,76 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.obs_classes import OBS
+from obs.pages_ingest import OBSPagesIngester
+
+
+class TestOBSPagesIngester(TestCase):
+
+    chapter_md = '# {0}. Chapter {0} #\n\n' \
+                 '![OBS Image](https://cdn.door43.org/obs/jpg/360px/obs-en-{0}-01.jpg)\n\nFirst frame.\n\n' \
+                 '![OBS Image](https://cdn.door43.org/obs/jpg/360px/obs-en-{0}-02.jpg)\n\nSecond frame.\n\n' \
+                 '_A Bible story from: Genesis {1}_\n'
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-pages-')
+
+        for lang in ['en', 'fr', 'de']:
+            obs_dir = os.path.join(self.temp_dir, lang, 'obs')
+            os.makedirs(obs_dir)
+            for number in ['01', '02']:
+                self.write_file(os.path.join(obs_dir, number + '.md'), self.chapter_md.format(number, int(number)))
+
+        self.write_file(os.path.join(self.temp_dir, 'en', 'obs', 'front-matter.txt'),
+                        '| Open Bible Stories**\n\n**an unrestricted visual mini-Bible in any language**\n\n'
+                        'http://openbiblestories.com')
+        self.write_file(os.path.join(self.temp_dir, 'en', 'obs', 'back-matter.txt'), 'The back matter.')
+
+        # a page with the wrong chapter number
+        self.write_file(os.path.join(self.temp_dir, 'de', 'obs', '03.txt'), self.chapter_md.format('04', 4))
+
+        # not languages
+        os.makedirs(os.path.join(self.temp_dir, 'templates'))
+        self.write_file(os.path.join(self.temp_dir, 'readme.txt'), '')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def write_file(file_name, content):
+        with codecs.open(file_name, 'w', encoding='utf-8') as out_file:
+            out_file.write(content)
+
+    def test_ingest(self):
+        ingester = OBSPagesIngester(self.temp_dir, max_workers=2, today_str='20160101')
+        self.assertEqual(['de', 'en', 'fr'], ingester.get_languages())
+
+        results = dict((r.language, r) for r in ingester.ingest())
+        self.assertEqual(['de', 'en', 'fr'], sorted(results.keys()))
+
+        en = results['en']
+        self.assertEqual([], en.errors)
+        self.assertEqual(['01', '02'], [c.number for c in en.obs.chapters])
+        self.assertEqual('01. Chapter 01', en.obs.chapters[0].title)
+        self.assertEqual(['01-01', '01-02'], [f['id'] for f in en.obs.chapters[0].frames])
+        self.assertEqual('Open Bible Stories', en.front_matter['name'])
+        self.assertEqual('20160101', en.front_matter['date_modified'])
+        self.assertEqual('The back matter.', en.back_matter['back-matter'])
+
+        self.assertEqual('fr', results['fr'].front_matter['language'])
+        # without a front matter page the template is used
+        self.assertEqual(OBS.load_static_json_file('obs-front-matter.json')['front-matter'],
+                         results['fr'].front_matter['front-matter'])
+
+        de = results['de']
+        self.assertEqual(2, len(de.obs.chapters))
+        self.assertEqual(1, len(de.errors))
+        self.assertIn('03.txt', de.errors[0])
+
+    def test_static_json_is_copied(self):
+        front = OBS.load_static_json_file('obs-front-matter.json')
+        front['language'] = 'changed'
+        self.assertNotEqual('changed', OBS.load_static_json_file('obs-front-matter.json').get('language'))
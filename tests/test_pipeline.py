@@ -0,0 +1,158 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import TestCase, skipIf
+from obs.export_to_tex import OBSExportCache
+from tests.tex_fixtures import preload_json, use_snippets
+
+# the async stages use async and await, which do not parse before Python 3.5
+if sys.version_info >= (3, 5):
+    import asyncio
+    from obs.pipeline import OBSPipeline, OBSPipelineStage, OBSTexPipeline
+
+
+def square(number):
+    if number == 3:
+        raise ValueError('three')
+    return number * number
+
+
+def interrupt(number):
+    if number == 2:
+        raise KeyboardInterrupt()
+    return number
+
+
+@skipIf(sys.version_info < (3, 5), 'The pipeline requires Python 3.5 or newer')
+class TestOBSPipeline(TestCase):
+
+    def test_stages(self):
+        pipeline = OBSPipeline([OBSPipelineStage('double', lambda n: n * 2, 3),
+                                OBSPipelineStage('square', square, 2, 'process'),
+                                OBSPipelineStage('add', lambda n: asyncio.sleep(0.001, result=n + 1), 2, 'async')],
+                               max_queue=2)
+        summary = pipeline.run(iter([0, 1, 2, 3, 4, 5]))
+
+        # 3 * 2 is not 3, so this item passes
+        self.assertEqual([1, 5, 17, 37, 65, 101], sorted(summary['results']))
+        self.assertEqual([], summary['failures'])
+
+        metrics = summary['metrics']
+        self.assertEqual(6, metrics['completed'])
+        self.assertEqual(['double', 'square', 'add'], list(metrics['stages']))
+        self.assertEqual(6, metrics['stages']['square']['processed'])
+        self.assertLessEqual(metrics['stages']['add']['max_queue_depth'], 2)
+
+    def test_failures(self):
+        pipeline = OBSPipeline([OBSPipelineStage('square', square, 2),
+                                OBSPipelineStage('exit', lambda n: exit(1) if n == 16 else n)])
+        summary = pipeline.run(range(6))
+
+        self.assertEqual([0, 1, 4, 25], sorted(summary['results']))
+        self.assertEqual([('exit', 16, 'SystemExit: 1'), ('square', 3, 'ValueError: three')],
+                         sorted((f['stage'], f['item'], f['error']) for f in summary['failures']))
+        self.assertEqual(1, summary['metrics']['stages']['square']['failed'])
+        self.assertEqual(1, summary['metrics']['stages']['exit']['failed'])
+
+    def test_interrupt(self):
+        read = []
+
+        def get_items():
+            for number in range(100):
+                read.append(number)
+                yield number
+
+        pipeline = OBSPipeline([OBSPipelineStage('interrupt', interrupt, 2), OBSPipelineStage('copy', lambda n: n)],
+                               max_queue=1)
+
+        # the workers keep going, so run() returns and raises the error instead of hanging
+        self.assertRaises(KeyboardInterrupt, pipeline.run, get_items())
+        self.assertLess(len(read), 100)
+        self.assertEqual([('interrupt', 2, 'KeyboardInterrupt: ')],
+                         [(f['stage'], f['item'], f['error']) for f in pipeline.failures])
+        self.assertIn(0, pipeline.results)
+
+    def test_backpressure(self):
+        read = []
+
+        def get_items():
+            for number in range(20):
+                read.append(time.time())
+                yield number
+
+        def slow(number):
+            time.sleep(0.01)
+            return number
+
+        pipeline = OBSPipeline([OBSPipelineStage('fast', lambda n: n), OBSPipelineStage('slow', slow)], max_queue=1)
+        summary = pipeline.run(get_items())
+
+        self.assertEqual(list(range(20)), summary['results'])
+
+        # the source is read only as fast as the slow stage can take the items
+        self.assertGreater(read[-1] - read[0], 0.1)
+        self.assertGreater(summary['metrics']['stages']['fast']['blocked_seconds'], 0.1)
+        self.assertGreater(summary['metrics']['stages']['slow']['utilization'], 0.5)
+        self.assertLessEqual(summary['metrics']['stages']['slow']['max_queue_depth'], 1)
+
+    def test_bad_stage(self):
+        self.assertRaises(ValueError, OBSPipelineStage, 'x', square, 1, 'fibre')
+        self.assertRaises(ValueError, OBSPipelineStage, 'x', square, 0)
+
+    def test_tex_pipeline(self):
+        cache = OBSExportCache()
+        for lang in ('en', 'fr'):
+            chapters = [{'number': '01', 'title': '1. Title', 'ref': 'Genesis 1', 'frames': [
+                {'id': '01-01', 'img': '', 'text': 'The <red>end'}]}]
+            preload_json(cache, lang, {'chapters': chapters, 'language': lang, 'direction': 'ltr'})
+
+        out_dir = tempfile.mkdtemp(prefix='obs-pipeline-')
+        try:
+            # the fetched files reach the render processes, which refuse the broken markup
+            summary = OBSTexPipeline(out_dir, cache=cache, render_workers=2).run(['en', 'fr'])
+            self.assertEqual([], summary['results'])
+            self.assertEqual([('render', 'en', 'SystemExit: 1'), ('render', 'fr', 'SystemExit: 1')],
+                             sorted((f['stage'], f['item']['lang'], f['error']) for f in summary['failures']))
+            self.assertEqual(2, summary['metrics']['stages']['fetch']['processed'])
+
+            for failure in summary['failures']:
+                self.assertFalse(os.path.exists(failure['item']['temp_dir']))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def test_tex_pipeline_writes_files(self):
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest('The render processes must inherit the test snippets')
+
+        out_dir = tempfile.mkdtemp(prefix='obs-pipeline-')
+        use_snippets(self, out_dir)
+
+        cache = OBSExportCache()
+        for lang in ('en', 'fr'):
+            chapters = [{'number': '01', 'title': '1. Title', 'ref': 'Genesis 1', 'frames': [
+                {'id': '01-0{0}'.format(x), 'img': '', 'text': 'Frame {0}'.format(x)} for x in (1, 2)]}]
+            preload_json(cache, lang, {'chapters': chapters, 'language': lang, 'direction': 'ltr'},
+                         front_matter='unfoldingWord | OBS {0}**'.format(lang))
+
+        # the output directory does not exist yet, it is created before the writers start
+        summary = OBSTexPipeline(os.path.join(out_dir, 'tex', 'out'), cache=cache, render_workers=2).run(['en', 'fr'])
+
+        try:
+            self.assertEqual([], summary['failures'])
+            self.assertEqual(['en', 'fr'], sorted(r['lang'] for r in summary['results']))
+            self.assertEqual(2, summary['metrics']['stages']['write']['processed'])
+
+            for result in summary['results']:
+                self.assertEqual(os.path.join(out_dir, 'tex', 'out', 'obs-{0}.tex'.format(result['lang'])),
+                                 result['out_path'])
+                with codecs.open(result['out_path'], 'r', encoding='utf-8') as in_file:
+                    tex = in_file.read()
+                self.assertIn('% OBS {0}'.format(result['lang']), tex)
+                self.assertIn('FIGURE: {0}-01-02'.format(result['lang']), tex)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
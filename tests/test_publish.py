@@ -0,0 +1,78 @@
+from __future__ import print_function, unicode_literals
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from general_tools.file_utils import load_json_object
+from obs.obs_classes import OBS, OBSManifest, OBSManifestEncoder
+from obs.publish import OBSPublisher
+
+
+class TestOBSPublisher(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-publish-')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_publish(self):
+        publisher = OBSPublisher(self.temp_dir, use_brotli=False)
+        obs_obj = OBS()
+        obs_obj.language = 'en'
+
+        self.assertTrue(publisher.publish_json('obs-en.json', obs_obj))
+        self.assertTrue(publisher.publish_json('manifest.json', OBSManifest(), cls=OBSManifestEncoder))
+        publisher.save()
+
+        file_name = os.path.join(self.temp_dir, 'obs-en.json')
+        with open(file_name, 'rb') as in_file:
+            content = in_file.read()
+        with gzip.open(file_name + '.gz', 'rb') as in_file:
+            self.assertEqual(content, in_file.read())
+
+        manifest = load_json_object(os.path.join(self.temp_dir, OBSPublisher.manifest_file_name))
+        self.assertEqual(hashlib.sha256(content).hexdigest(), manifest['obs-en.json']['hash'])
+        self.assertEqual(len(content), manifest['obs-en.json']['size'])
+        self.assertIn('gz', manifest['manifest.json'])
+
+        # the next build skips the unchanged artifact
+        publisher = OBSPublisher(self.temp_dir, use_brotli=False)
+        mtime = os.path.getmtime(file_name + '.gz')
+        self.assertFalse(publisher.publish_json('obs-en.json', obs_obj))
+        self.assertEqual(mtime, os.path.getmtime(file_name + '.gz'))
+
+        obs_obj.direction = 'rtl'
+        self.assertTrue(publisher.publish_json('obs-en.json', obs_obj))
+        self.assertEqual(['obs-en.json'], publisher.written)
+        self.assertEqual(['obs-en.json'], publisher.skipped)
+
+    def test_missing_variant_is_rewritten(self):
+        publisher = OBSPublisher(self.temp_dir, use_brotli=False)
+        publisher.publish('obs-en.tex', '\\starttext\n\\stoptext\n')
+        os.remove(os.path.join(self.temp_dir, 'obs-en.tex.gz'))
+
+        self.assertTrue(publisher.publish('obs-en.tex', '\\starttext\n\\stoptext\n'))
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'obs-en.tex.gz')))
+
+    def test_gzip_is_deterministic(self):
+        self.assertEqual(OBSPublisher.gzip_bytes(b'OBS'), OBSPublisher.gzip_bytes(b'OBS'))
+
+    def test_write_atomic(self):
+        file_name = os.path.join(self.temp_dir, 'new', 'obs-en.tex')
+        contents = [chr(ord('a') + x).encode('ascii') * 100000 for x in range(8)]
+
+        # writers of the same file, in a directory that does not exist yet
+        threads = [threading.Thread(target=OBSPublisher.write_atomic, args=(file_name, c)) for c in contents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(file_name, 'rb') as in_file:
+            self.assertIn(in_file.read(), contents)
+        self.assertEqual(['obs-en.tex'], os.listdir(os.path.dirname(file_name)))
+        self.assertEqual(0o644, os.stat(file_name).st_mode & 0o777)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+import os
+from unittest import TestCase
+from obs.obs_classes import OBS, OBSChapter
+from obs.search import OBSSearchIndex
+
+
+class TestOBSSearchIndex(TestCase):
+
+    @staticmethod
+    def get_obs(lang, texts):
+        obs_obj = OBS()
+        obs_obj.language = lang
+        chapter = OBSChapter()
+        chapter.number = '12'
+        chapter.frames = [{'id': frame_id, 'img': '', 'text': text} for frame_id, text in sorted(texts.items())]
+        obs_obj.chapters = [chapter]
+        return obs_obj
+
+    def test_tokenize(self):
+        self.assertEqual(['god', 'créa', 'le', 'monde'], OBSSearchIndex.tokenize('God CRÉA le monde.'))
+        self.assertEqual(['हिन्दी', 'भाषा'], OBSSearchIndex.tokenize('हिन्दी भाषा'))
+        self.assertEqual(['fine'], OBSSearchIndex.tokenize('ﬁne'))
+        self.assertEqual(['上', '帝', 'god'], OBSSearchIndex.tokenize('上帝God'))
+
+    def test_search(self):
+        index = OBSSearchIndex()
+        index.update_language(TestOBSSearchIndex.get_obs('en', {
+            '12-04': 'Moses told the people, "Do not be afraid!"',
+            '12-05': 'Moses raised his hand and God parted the sea.'}))
+        index.update_language(TestOBSSearchIndex.get_obs('fr', {
+            '12-05': 'Moïse leva la main et Dieu sépara la mer.'}))
+        index.update_language(TestOBSSearchIndex.get_obs('zh', {
+            '12-05': '摩西举起手，上帝分开了海。'}))
+
+        self.assertEqual(['en', 'fr', 'zh'], index.languages)
+        self.assertEqual([('en', '12-04'), ('en', '12-05')], index.search('moses'))
+        self.assertEqual([('en', '12-05')], index.search('moses sea'))
+        self.assertEqual([('en', '12-05')], index.search('"parted the sea"'))
+        self.assertEqual([], index.search('"the parted sea"'))
+        self.assertEqual([('fr', '12-05')], index.search('MOÏSE'))
+        self.assertEqual([('zh', '12-05')], index.search('上帝'))
+        self.assertEqual([], index.search('帝上'))
+        self.assertEqual([('en', '12-05')], index.search('moses', frame_ids=['12-05']))
+        self.assertEqual([], index.search('moses', langs=['fr']))
+        self.assertEqual([], index.search('pharaoh'))
+
+    def test_incremental_update(self):
+        index = OBSSearchIndex()
+        index.update_language(TestOBSSearchIndex.get_obs('en', {'12-01': 'The sea.', '12-02': 'The desert.'}))
+        index.update_language(TestOBSSearchIndex.get_obs('fr', {'12-01': 'La mer.'}))
+
+        # only the changed frame is re-indexed, and the removed frame is forgotten
+        updated = index.update_language(TestOBSSearchIndex.get_obs('en', {'12-01': 'The sea.', '12-03': 'A cloud.'}))
+        self.assertEqual(1, updated)
+        self.assertEqual([], index.search('desert'))
+        self.assertEqual([('en', '12-03')], index.search('cloud'))
+        self.assertEqual([('en', '12-01')], index.search('sea'))
+
+        index.remove_language('en')
+        self.assertEqual(['fr'], index.languages)
+        self.assertEqual([], index.search('the'))
+        self.assertNotIn('the', index.postings)
+
+    def test_ts_resources(self):
+        content_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+        obs_obj = OBS()
+        obs_obj.language = 'hu'
+        obs_obj.chapters = [OBSChapter.from_ts_directory(os.path.join(content_dir, str(x).zfill(2)), x)
+                            for x in range(1, 51)]
+
+        index = OBSSearchIndex()
+        self.assertEqual(598, index.update_language(obs_obj))
+        self.assertIn(('hu', '01-01'), index.search('"a kezdete"'))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.obs_classes import OBS, OBSChapter
+from obs.shards import OBSShards
+
+
+class TestOBSShards(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-shards-')
+        content_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+
+        self.obs_obj = OBS()
+        self.obs_obj.language = 'hu'
+        self.obs_obj.chapters = [OBSChapter.from_ts_directory(os.path.join(content_dir, str(x).zfill(2)), x)
+                                 for x in range(1, 51)]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_write_shards(self):
+        index = OBSShards.write(self.obs_obj, self.temp_dir)
+
+        self.assertEqual(51, len(os.listdir(self.temp_dir)))
+        self.assertEqual(index, OBSShards.load_index(self.temp_dir))
+        self.assertEqual('hu', index['language'])
+        self.assertEqual('ltr', index['direction'])
+        self.assertEqual(50, len(index['chapters']))
+
+        entry = index['chapters'][0]
+        self.assertEqual('01', entry['number'])
+        self.assertEqual('1. A Teremtés', entry['title'])
+        self.assertEqual(16, entry['frames'])
+        self.assertEqual(16, entry['expected_frames'])
+
+        # the hash and size describe the bytes of the chapter file
+        with open(os.path.join(self.temp_dir, entry['file']), 'rb') as in_file:
+            content = in_file.read()
+        self.assertEqual(entry['size'], len(content))
+        self.assertEqual(entry['hash'], hashlib.sha256(content).hexdigest())
+
+        chapter = OBSShards.load_chapter(self.temp_dir, 1)
+        self.assertEqual(self.obs_obj.chapters[0].__dict__, chapter)
+
+    def test_hash_changes_only_for_changed_chapters(self):
+        first = OBSShards.write(self.obs_obj, self.temp_dir)
+        self.obs_obj.chapters[4].frames[0]['text'] += ' Updated.'
+        second = OBSShards.write(self.obs_obj, self.temp_dir)
+
+        changed = [a['number'] for a, b in zip(first['chapters'], second['chapters']) if a['hash'] != b['hash']]
+        self.assertEqual(['05'], changed)
+
+    def test_removed_chapters(self):
+        OBSShards.write(self.obs_obj, self.temp_dir)
+        self.obs_obj.chapters = self.obs_obj.chapters[0:3]
+        index = OBSShards.write(self.obs_obj, self.temp_dir)
+
+        # no temporary files are left, and the files of the removed chapters are gone
+        self.assertEqual(['01.json', '02.json', '03.json', 'index.json'], sorted(os.listdir(self.temp_dir)))
+        self.assertEqual(index, OBSShards.load_index(self.temp_dir))
+        self.assertIsNone(OBSShards.load_chapter(self.temp_dir, 4))
@@ -0,0 +1,76 @@
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.export_to_tex import OBSExportCache, OBSTexExport
+from obs.tex_lint import OBSTexLinter
+from tests.tex_fixtures import preload_json
+
+
+class TestOBSTexLinter(TestCase):
+
+    def test_escape(self):
+        text, errors = OBSTexLinter.lint('50% of $5 & #1 {x} \\o/', 'frame 01-01')
+        self.assertEqual('50\\% of \\$5 \\& \\#1 \\{x\\} \\textbackslash{}o/', text)
+        self.assertEqual([], errors)
+
+        # links are left for the link patterns of the exporter
+        text = OBSTexLinter.escape('see http://example.com/a&b & more', links=True)
+        self.assertEqual('see http://example.com/a&b \\& more', text)
+
+        tex = OBSTexExport.filter_apply_docuwiki_and_links(text)
+        self.assertIn('[url(http://example.com/a&b)]', tex)
+        self.assertTrue(tex.endswith(' \\& more'))
+
+    def test_escape_frame_url(self):
+        # the frame text is not searched for links, so the & in a link has to be escaped like any other
+        text, errors = OBSTexLinter.lint('see http://example.com/?a=1&b=2 & more', 'frame 01-01')
+        self.assertEqual('see http://example.com/?a=1\\&b=2 \\& more', text)
+        self.assertEqual([], errors)
+
+        chapters = [{'number': '01', 'title': 'One', 'ref': 'Ref', 'frames': [
+            {'id': '01-01', 'text': 'see http://example.com/a&b', 'img': ''}]}]
+        self.assertEqual([], OBSTexLinter.get_errors(chapters))
+        self.assertEqual('see http://example.com/a\\&b',
+                         OBSTexExport.filter_apply_docuwiki(OBSTexLinter.escape(chapters[0]['frames'][0]['text'])))
+
+    def test_markup(self):
+        self.assertEqual([], OBSTexLinter.lint("**a** //b// __c__ ''d'' <red><sub>e</sub></red> <magenta>f</mag>",
+                                               'frame 01-01')[1])
+
+        errors = OBSTexLinter.lint('**a //b <bold>c</bold> <red><blue>d</red>', 'frame 02-03')[1]
+        self.assertEqual(['Unknown tag <bold> in frame 02-03',
+                          'Unknown tag </bold> in frame 02-03',
+                          'Closing tag </red> does not match an open tag in frame 02-03',
+                          'Unbalanced ** in frame 02-03',
+                          'Unbalanced // in frame 02-03',
+                          'Tag <red> is not closed in frame 02-03',
+                          'Tag <blue> is not closed in frame 02-03'], errors)
+
+    def test_get_errors(self):
+        chapters = [{'number': '01', 'title': '1. **Title', 'ref': 'Genesis 1', 'frames': [
+                        {'id': '01-01', 'text': 'Good.'}, {'id': '01-02', 'text': 'Bad </red>'}]},
+                    {'number': '02', 'title': '2. Title', 'ref': 'Genesis 3//', 'frames': []}]
+
+        self.assertEqual(['Unbalanced ** in title 01',
+                          'Closing tag </red> does not match an open tag in frame 01-02',
+                          'Unbalanced // in ref 02'], OBSTexLinter.get_errors(chapters))
+        self.assertEqual(2, len(OBSTexLinter.get_errors(chapters, max_chapters=1)))
+
+    def test_export_refuses_broken_markup(self):
+        chapters = [{'number': '01', 'title': '1. Title', 'ref': 'Genesis 1', 'frames': [
+            {'id': '01-01', 'img': '', 'text': 'The <red>end'}]}]
+
+        # pre-load the fetched JSON so the export runs without network access
+        cache = OBSExportCache()
+        preload_json(cache, 'en', {'chapters': chapters, 'language': 'en', 'direction': 'ltr'})
+
+        out_dir = tempfile.mkdtemp(prefix='obs-lint-')
+        try:
+            with OBSTexExport('en', os.path.join(out_dir, 'en.tex'), 0, '360px', '1', cache=cache) as exporter:
+                self.assertRaises(SystemExit, exporter.run)
+                self.assertEqual(['Tag <red> is not closed in frame 01-01'], exporter.lint_errors)
+                self.assertFalse(os.path.exists(os.path.join(out_dir, 'en.tex')))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
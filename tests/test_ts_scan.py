@@ -0,0 +1,74 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from obs.obs_classes import OBSManifestEncoder
+from obs.ts_scan import TSCompletenessScanner
+
+
+class TestTSCompletenessScanner(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-scan-')
+        self.root_dir = os.path.join(self.temp_dir, 'repos')
+        self.state_file = os.path.join(self.temp_dir, 'state.json')
+        resources_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+        for name in ('hu_obs', 'fr_obs'):
+            shutil.copytree(resources_dir, os.path.join(self.root_dir, name))
+        os.makedirs(os.path.join(self.root_dir, 'not_a_repo'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_scan(self):
+        fr_dir = os.path.join(self.root_dir, 'fr_obs')
+        os.remove(os.path.join(fr_dir, '01', '03.txt'))
+        with codecs.open(os.path.join(fr_dir, '02', '04.txt'), 'w', encoding='utf-8-sig') as out_file:
+            out_file.write('')
+        # short, but not empty
+        with codecs.open(os.path.join(fr_dir, '02', '05.txt'), 'w', encoding='utf-8') as out_file:
+            out_file.write('Oui')
+        with codecs.open(os.path.join(fr_dir, '03', 'title.txt'), 'w', encoding='utf-8') as out_file:
+            out_file.write('')
+        shutil.rmtree(os.path.join(fr_dir, '50'))
+
+        scanner = TSCompletenessScanner(self.state_file)
+        repos = TSCompletenessScanner.get_repositories(self.root_dir)
+        self.assertEqual([os.path.join(self.root_dir, 'fr_obs'), os.path.join(self.root_dir, 'hu_obs')], repos)
+
+        fr, hu = scanner.scan(repos)
+        self.assertTrue(hu['complete'])
+        self.assertEqual(598, hu['finished'])
+        self.assertEqual(50, len(hu['changed']))
+
+        self.assertFalse(fr['complete'])
+        self.assertEqual(598 - 1 - 1 - 17, fr['finished'])
+        self.assertEqual((18, 1), (fr['missing'], fr['empty']))
+        self.assertEqual(['01-03'], fr['chapters'][0]['missing'])
+        self.assertEqual(['02-04'], fr['chapters'][1]['empty'])
+        self.assertTrue(fr['chapters'][1]['title'])
+        self.assertFalse(fr['chapters'][2]['title'])
+        self.assertFalse(fr['chapters'][49]['title'])
+        self.assertTrue(fr['book_title'])
+
+        manifest = TSCompletenessScanner.fill_manifest(fr)
+        self.assertEqual(50, len(manifest.chunk_status))
+        self.assertNotIn('signature', manifest.chunk_status[0])
+        self.assertIn('"missing": ["01-03"]', json.dumps(manifest, cls=OBSManifestEncoder))
+
+    def test_changes(self):
+        TSCompletenessScanner(self.state_file).scan(TSCompletenessScanner.get_repositories(self.root_dir))
+
+        hu_dir = os.path.join(self.root_dir, 'hu_obs')
+        with codecs.open(os.path.join(hu_dir, '07', '02.txt'), 'a', encoding='utf-8') as out_file:
+            out_file.write(' more')
+        os.remove(os.path.join(hu_dir, '09', '01.txt'))
+
+        # a new scanner, so the signatures come from the state file
+        fr, hu = TSCompletenessScanner(self.state_file).scan(TSCompletenessScanner.get_repositories(self.root_dir))
+        self.assertEqual([], fr['changed'])
+        self.assertEqual(['07', '09'], hu['changed'])
+        self.assertEqual(['09-01'], hu['chapters'][8]['missing'])
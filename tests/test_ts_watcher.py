@@ -0,0 +1,93 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from general_tools.file_utils import load_json_object
+from obs.obs_classes import OBSChapter
+from obs.ts_watcher import TSWatcher
+
+
+class TestTSWatcher(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='obs-watch-')
+        self.ts_dir = os.path.join(self.temp_dir, 'ts')
+        resources_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'resources', 'ts')
+        shutil.copytree(resources_dir, self.ts_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_from_ts_directory(self):
+        chapter = OBSChapter.from_ts_directory(os.path.join(self.ts_dir, '01'), 1)
+
+        self.assertEqual('01', chapter.number)
+        self.assertEqual('1. A Teremt\u00e9s', chapter.title)
+        self.assertEqual(16, len(chapter.frames))
+        self.assertEqual('01-16', chapter.frames[15]['id'])
+        self.assertEqual([], chapter.get_errors())
+
+    def test_only_changed_chapters_are_processed(self):
+        processed = []
+        output_dir = os.path.join(self.temp_dir, 'out')
+        watcher = TSWatcher(self.ts_dir, debounce=0, output_dir=output_dir,
+                            on_chapter=lambda c, e: processed.append(c.number))
+
+        # the first check validates every chapter
+        results = watcher.check()
+        self.assertEqual(50, len(results))
+        self.assertTrue(all(len(errors) == 0 for errors in results.values()))
+        self.assertEqual(50, len(processed))
+
+        # nothing changed
+        self.assertEqual({}, watcher.check())
+
+        # change one frame and remove another
+        with codecs.open(os.path.join(self.ts_dir, '02', '01.txt'), 'a', encoding='utf-8') as out_file:
+            out_file.write(' More text.')
+        os.remove(os.path.join(self.ts_dir, '03', '16.txt'))
+
+        results = watcher.check()
+        self.assertEqual(['02', '03'], sorted(results.keys()))
+        self.assertEqual([], results['02'])
+        self.assertEqual(['Frame not found: 03-16'], results['03'])
+        self.assertTrue(watcher.chapters['02'].frames[0]['text'].endswith('More text.'))
+
+        chapter_json = load_json_object(os.path.join(output_dir, '02.json'))
+        self.assertTrue(chapter_json['frames'][0]['text'].endswith('More text.'))
+
+    def test_invalid_utf8(self):
+        watcher = TSWatcher(self.ts_dir, debounce=0)
+        watcher.check()
+
+        with open(os.path.join(self.ts_dir, '05', '01.txt'), 'wb') as out_file:
+            out_file.write(b'Abram \xff\xfe')
+
+        results = watcher.check()
+        self.assertEqual(['05'], list(results.keys()))
+        self.assertTrue(results['05'][0].startswith('Chapter 05 is not valid UTF-8'))
+        self.assertEqual(results['05'], watcher.errors['05'])
+        self.assertNotIn('05', watcher.chapters)
+
+    def test_debounce(self):
+        watcher = TSWatcher(self.ts_dir, debounce=0)
+        watcher.check()
+        watcher.debounce = 60
+
+        with codecs.open(os.path.join(self.ts_dir, '04', 'title.txt'), 'w', encoding='utf-8') as out_file:
+            out_file.write('4. New title')
+
+        # the change is seen, but waits until the chapter has been quiet long enough
+        self.assertEqual({}, watcher.check())
+        self.assertEqual(['04'], list(watcher.pending.keys()))
+
+        watcher.debounce = 0
+        self.assertEqual(['04'], list(watcher.check().keys()))
+        self.assertEqual('4. New title', watcher.chapters['04'].title)
+
+    def test_run_stops(self):
+        watcher = TSWatcher(self.ts_dir, interval=0.01, debounce=0)
+        watcher.run(max_cycles=2)
+        self.assertEqual(50, len(watcher.chapters))
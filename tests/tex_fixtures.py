@@ -0,0 +1,61 @@
+"""
+Stand-in TeX snippets and pre-fetched JSON, so OBSTexExport renders in the tests without the real snippets or network
+access
+"""
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import os
+import time
+from obs.export_to_tex import OBSTexExport
+from obs.obs_classes import OBSEncoder
+
+snippet_names = ['calculate-vertical-need', 'calculate-leftover', 'begin-adjust-loop', 'adjust-spacing',
+                 'end-adjust-loop', 'verify-vertical-space']
+
+
+def write_snippets(snippets_dir):
+    """
+    Writes a one line snippet for each snippet file, and a main template with only the title and the chapters
+    :param str|unicode snippets_dir: Created if it does not exist
+    """
+    if not os.path.isdir(snippets_dir):
+        os.makedirs(snippets_dir)
+
+    files = [(name, '% -*- coding: utf-8 -*-\n\\relax % $fid\n') for name in snippet_names]
+    files.append(('place-reference', '% -*- coding: utf-8 -*-\n\\relax % $thetext\n'))
+    files.append(('main_template', '% <<<[toctitle]>>>\n===CHAPTERS===\n'))
+
+    for name, content in files:
+        with codecs.open(os.path.join(snippets_dir, name + '.tex'), 'w', encoding='utf-8') as out_file:
+            out_file.write(content)
+
+
+def use_snippets(test_case, temp_dir):
+    """
+    Writes the snippets to <temp_dir>/tex and uses them until the test finishes
+    :param unittest.TestCase test_case:
+    :param str|unicode temp_dir:
+    """
+    snippets_dir = os.path.join(temp_dir, 'tex')
+    write_snippets(snippets_dir)
+
+    test_case.addCleanup(setattr, OBSTexExport, 'snippets_dir', OBSTexExport.snippets_dir)
+    OBSTexExport.snippets_dir = snippets_dir
+
+
+def preload_json(cache, lang, body, front_matter='unfoldingWord | OBS**', back_matter='The end'):
+    """
+    Puts the front matter, back matter and body of a language in the cache, as if they were just fetched
+    :param OBSExportCache cache:
+    :param str|unicode lang:
+    :param dict|OBS body: Like the obs-{lang}.json of the API
+    :param str|unicode front_matter:
+    :param str|unicode back_matter:
+    """
+    now = time.time()
+    base_url = '/'.join([OBSTexExport.api_url_txt, lang, ''])
+    cache.urls[base_url + 'obs-{0}-front-matter.json'.format(lang)] = (json.dumps({'front-matter': front_matter}),
+                                                                       now)
+    cache.urls[base_url + 'obs-{0}-back-matter.json'.format(lang)] = (json.dumps({'back-matter': back_matter}), now)
+    cache.urls[base_url + 'obs-{0}.json'.format(lang)] = (json.dumps(body, cls=OBSEncoder), now)